@@ -0,0 +1,261 @@
+"""
+Benchmark the generation of clients from synthetic openapi documents.
+
+Run with ``python -m benchmarks.run`` from the repository root. Per-phase timings and
+peak memory are printed and saved as json, which can be compared against a previous run
+with ``--baseline``.
+"""
+
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import typer
+import yaml
+
+from benchmarks.synthetic import create_spec
+from openapi_fastapi_client import __version__
+from openapi_fastapi_client.api import Api
+from openapi_fastapi_client.formatting import Formatter
+from openapi_fastapi_client.helpers import get_module_name
+from openapi_fastapi_client.loader import SpecLoader
+from openapi_fastapi_client.main import app as cli_app
+from openapi_fastapi_client.operations import OperationIndex
+from openapi_fastapi_client.runtime import Runtime
+from openapi_fastapi_client.schema import Schema
+
+PHASES = ("yaml_load", "schema_build", "api_build", "formatting", "write")
+# pydantic is imported before the clock starts, only the generated models are timed. On
+# linux ru_maxrss keeps the peak of the forking benchmark, the high water mark does not.
+IMPORT_CODE = """
+import resource, time
+import pydantic
+start = time.perf_counter()
+import schema
+seconds = time.perf_counter() - start
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open("/proc/self/status") as file:
+        peak_rss = next(int(obj.split()[1]) for obj in file if obj.startswith("VmHWM:"))
+except OSError:
+    pass
+print(seconds, peak_rss)
+"""
+
+app = typer.Typer()
+
+
+def get_peak_rss(peak_rss: int | None = None) -> int:
+    if peak_rss is None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def measure_import(client_path: Path, repeat: int = 3) -> dict:
+    """
+    The best wall time and the peak rss of importing the ``schema.py`` of a generated
+    client in a fresh interpreter.
+    """
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE],
+            cwd=client_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        seconds, peak_rss = result.stdout.split()
+        runs.append({"seconds": float(seconds), "peak_rss": get_peak_rss(int(peak_rss))})
+    return min(runs, key=lambda obj: obj["seconds"])
+
+
+@contextmanager
+def measure(phases: dict, name: str, trace_memory: bool = False):
+    """
+    Record the wall time and the process peak rss after the phase.
+
+    With ``trace_memory`` the peak of the python allocations during the phase is traced
+    as well, which slows down the phase noticeably.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = {"seconds": time.perf_counter() - start, "peak_rss": get_peak_rss()}
+        if trace_memory:
+            phases[name]["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def run_benchmark(
+    size: int,
+    work_dir: Path,
+    trace_memory: bool = False,
+    cli: bool = False,
+    import_time: bool = False,
+) -> dict:
+    spec_file = work_dir / Path(f"openapi_{size}.yaml")
+    with spec_file.open("w") as file:
+        yaml.dump(create_spec(size), file, Dumper=yaml.CDumper)
+    output_path = work_dir / Path(f"client_{size}")
+    output_path.mkdir()
+
+    phases = {}
+    with measure(phases, "yaml_load", trace_memory):
+        yaml_data = SpecLoader().load(spec_file)
+
+    with measure(phases, "schema_build", trace_memory):
+        schema = Schema(yaml_data["components"]["schemas"])
+        schema.generate_schemas()
+
+    with measure(phases, "api_build", trace_memory):
+        operation_index = OperationIndex(yaml_data["paths"])
+        modules = {}
+        query_schema_params = []
+        for tag in operation_index.tags:
+            api = Api(
+                yaml_data["paths"],
+                yaml_data["servers"][0]["url"],
+                tag,
+                operation_index=operation_index,
+            )
+            api.generate_apis(schema_path="schema")
+            modules[get_module_name(tag)] = api.render()
+            query_schema_params.extend(api.query_param_schemas)
+        modules["schema.py"] = schema.render(query_schema_params)
+        runtime = Runtime("sync")
+        runtime.generate_runtime()
+
+    with measure(phases, "formatting", trace_memory):
+        # the api and schema modules are rendered formatted, only the runtime goes through black
+        modules["runtime.py"] = Formatter(output_path).format_str(runtime.render())
+
+    with measure(phases, "write", trace_memory):
+        for name, text in modules.items():
+            (output_path / Path(name)).write_text(text)
+
+    if cli:
+        with measure(phases, "cli", trace_memory):
+            cli_app(
+                [str(spec_file), str(work_dir / Path(f"cli_{size}")), "--cache-dir", str(work_dir)],
+                standalone_mode=False,
+            )
+
+    if import_time:
+        # the import of the generated models, built on import and deferred to first use
+        for name, options in (("import", []), ("import_deferred", ["--defer-build"])):
+            client_path = work_dir / Path(f"{name}_{size}")
+            cli_app(
+                [str(spec_file), str(client_path), "--no-format", *options],
+                standalone_mode=False,
+            )
+            phases[name] = measure_import(client_path)
+
+    return {
+        "size": size,
+        "operations": sum(len(val) for val in yaml_data["paths"].values()),
+        "components": len(yaml_data["components"]["schemas"]),
+        "tags": len(operation_index.tags),
+        "phases": phases,
+        "total_seconds": sum(phases[name]["seconds"] for name in PHASES),
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], max_regression: float) -> bool:
+    baseline_by_size = {obj["size"]: obj for obj in baseline}
+    passed = True
+    for result in results:
+        if (base := baseline_by_size.get(result["size"])) is None:
+            continue
+        for name, phase in result["phases"].items():
+            if (base_phase := base["phases"].get(name)) is None:
+                continue
+            ratio = phase["seconds"] / max(base_phase["seconds"], 1e-9)
+            marker = ""
+            if ratio > max_regression:
+                marker = "  REGRESSION"
+                passed = False
+            typer.echo(
+                f"{result['size']:>7} {name:<14} {base_phase['seconds']:>10.3f}s "
+                f"-> {phase['seconds']:>10.3f}s  x{ratio:.2f}{marker}"
+            )
+    return passed
+
+
+def print_results(results: list[dict]):
+    typer.echo(f"{'size':>7} {'phase':<14} {'seconds':>11} {'peak rss':>11} {'peak traced':>11}")
+    for result in results:
+        for name, phase in result["phases"].items():
+            peak_memory = ""
+            if "peak_memory" in phase:
+                peak_memory = f"{phase['peak_memory'] / 1024 ** 2:>8.1f} MB"
+            typer.echo(
+                f"{result['size']:>7} {name:<14} {phase['seconds']:>10.3f}s "
+                f"{phase['peak_rss'] / 1024 ** 2:>8.1f} MB {peak_memory}"
+            )
+
+
+@app.command()
+def main(
+    sizes: list[int] = typer.Option([100, 1000, 10000], "--size", help="Number of operations."),
+    output: Path = typer.Option(Path("bench_output.json"), "--output", "-o"),
+    baseline: Optional[Path] = typer.Option(None, "--baseline", help="Json of a previous run."),
+    max_regression: float = typer.Option(
+        1.25, "--max-regression", help="Allowed slowdown factor per phase against the baseline."
+    ),
+    trace_memory: bool = typer.Option(
+        False, "--trace-memory", help="Trace the peak python allocations of every phase."
+    ),
+    cli: bool = typer.Option(False, "--cli", help="Also time a complete run of the cli."),
+    import_time: bool = typer.Option(
+        False,
+        "--import-time",
+        help="Also time the import of the generated models, with and without --defer-build.",
+    ),
+):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            results.append(
+                run_benchmark(
+                    size,
+                    Path(tmp_dir),
+                    trace_memory=trace_memory,
+                    cli=cli,
+                    import_time=import_time,
+                )
+            )
+
+    print_results(results)
+    output.write_text(
+        json.dumps(
+            {
+                "version": __version__,
+                "python": sys.version,
+                "platform": platform.platform(),
+                "results": results,
+            },
+            indent=2,
+        )
+        + "\n"
+    )
+
+    if baseline is not None:
+        if not compare(results, json.loads(baseline.read_text())["results"], max_regression):
+            raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
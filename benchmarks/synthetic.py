@@ -0,0 +1,116 @@
+"""
+Builders for synthetic openapi documents of arbitrary size.
+
+The documents use the constructs the generator supports: ``$ref`` chains between
+components, list properties and bodies, large string enums, constrained fields and
+operations with path, query and header parameters spread over many tags.
+"""
+
+METHODS = ("get", "post", "put", "delete")
+
+
+def create_component(idx: int, ref_depth: int, enum_size: int) -> dict:
+    properties = {
+        "id": {"type": "integer", "format": "int64"},
+        "name": {"type": "string", "maxLength": 100},
+        "created": {"type": "string", "format": "date-time"},
+        "price": {"type": "number", "minimum": 1, "maximum": 10000},
+        "active": {"type": "boolean"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    }
+    if enum_size and idx % 10 == 0:
+        properties["status"] = {
+            "type": "string",
+            "enum": [f"value {num}" for num in range(enum_size)],
+        }
+    # components build chains of ``ref_depth`` models referencing their predecessor
+    if ref_depth and idx % ref_depth:
+        properties["parent"] = {"allOf": [{"$ref": f"#/components/schemas/Model{idx - 1}"}]}
+        properties["children"] = {
+            "type": "array",
+            "items": {"$ref": f"#/components/schemas/Model{idx - 1}"},
+        }
+    return {
+        "type": "object",
+        "required": ["id", "name"],
+        "properties": properties,
+    }
+
+
+def create_operation(idx: int, tag: str, components: int) -> tuple[str, str, dict]:
+    method = METHODS[idx % len(METHODS)]
+    model_ref = f"#/components/schemas/Model{idx % components}"
+    operation = {
+        "tags": [tag],
+        "summary": f"Operation {idx}",
+        "operationId": f"{method}Resource{idx}",
+        "parameters": [
+            {"name": "itemId", "in": "path", "required": True, "schema": {"type": "integer"}},
+            {
+                "name": "X-Request-Id",
+                "in": "header",
+                "required": False,
+                "schema": {"type": "string"},
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": "Successful operation",
+                "content": {"application/json": {"schema": {"$ref": model_ref}}},
+            },
+            "404": {"description": "Not found"},
+        },
+    }
+    if method == "get":
+        operation["parameters"].extend(
+            [
+                {"name": "limit", "in": "query", "required": False, "schema": {"type": "integer"}},
+                {"name": "offset", "in": "query", "required": False, "schema": {"type": "integer"}},
+                {"name": "filter", "in": "query", "required": True, "schema": {"type": "string"}},
+            ]
+        )
+        operation["responses"]["200"]["content"]["application/json"]["schema"] = {
+            "type": "array",
+            "items": {"$ref": model_ref},
+        }
+    elif method in ("post", "put"):
+        schema = {"$ref": model_ref}
+        if idx % 3 == 0:
+            schema = {"type": "array", "items": {"$ref": model_ref}}
+        operation["requestBody"] = {"content": {"application/json": {"schema": schema}}}
+    return f"/{tag}/resource{idx}/{{itemId}}", method, operation
+
+
+def create_spec(
+    operations: int,
+    components: int | None = None,
+    tags: int | None = None,
+    ref_depth: int = 10,
+    enum_size: int = 50,
+) -> dict:
+    """
+    Create an openapi document with ``operations`` operations and ``components`` schemas.
+
+    By default there are as many components as operations and one tag per 20 operations.
+    """
+    components = components or operations
+    tags = tags or max(operations // 20, 1)
+
+    paths = {}
+    for idx in range(operations):
+        url, method, operation = create_operation(idx, f"tag{idx % tags}", components)
+        paths.setdefault(url, {})[method] = operation
+
+    return {
+        "openapi": "3.0.3",
+        "info": {"title": f"Synthetic api with {operations} operations", "version": "1.0.0"},
+        "servers": [{"url": "http://localhost:8080/api"}],
+        "tags": [{"name": f"tag{idx}"} for idx in range(tags)],
+        "paths": paths,
+        "components": {
+            "schemas": {
+                f"Model{idx}": create_component(idx, ref_depth, enum_size)
+                for idx in range(components)
+            }
+        },
+    }
@@ -1,449 +1,542 @@
 from pathlib import Path
-from string import Template
 from typing import Literal
 
-import black
-import isort
-
-from openapi_fastapi_client.helpers import TYPE_CONVERTION, operation_id_to_function_name
-
-
-def get_function_info_dict():
-    return {
-        "url": "",
-        "method": "",
-        "function_name": "",
-        "path_parameters": set(),
-        "query_parameters": "",
-        "request_obj": "",
-        "application_type": "application/json",
-        "response_obj": "",
-        "is_list": False,
-        "docstring": "",
-    }
+from openapi_fastapi_client.codegen import (
+    Block,
+    Bracket,
+    Class,
+    Function,
+    Imports,
+    Module,
+    string_literal,
+)
+from openapi_fastapi_client.formatting import Formatter
+from openapi_fastapi_client.helpers import create_import, get_module_name
+from openapi_fastapi_client.operations import OperationIndex, get_component_obj_name
+from openapi_fastapi_client.schema import get_model_bases
 
 
 class Api:
-    __slots__ = ("data", "paths", "schema_imports", "query_param_schemas", "base_url", "only_tag")
-
-    def __init__(self, paths: dict, base_url: str, only_tag: str):
+    __slots__ = (
+        "data",
+        "schema_imports",
+        "query_param_schemas",
+        "base_url",
+        "only_tag",
+        "operation_index",
+        "model_backend",
+        "defer_build",
+    )
+
+    def __init__(
+        self,
+        paths: dict,
+        base_url: str,
+        only_tag: str,
+        operation_index: OperationIndex | None = None,
+        model_backend: str = "pydantic",
+        defer_build: bool = False,
+    ):
         self.data = []
-        self.paths = paths
+        self.model_backend = model_backend
+        self.defer_build = defer_build
         self.schema_imports = set()
         self.query_param_schemas = []
         self.only_tag = only_tag
+        if operation_index is None:
+            operation_index = OperationIndex(paths)
+        self.operation_index = operation_index
         if base_url.endswith("/"):
             self.base_url = base_url[:-1]
         else:
             self.base_url = base_url
 
-    def generate_base_imports(self, client_kind: Literal["sync", "async"] = "sync"):
+    @property
+    def paths(self) -> dict:
+        return self.operation_index.paths
+
+    def generate_base_imports(
+        self,
+        client_kind: Literal["sync", "async"] = "sync",
+        streaming: bool = False,
+        sync_concurrency: bool = False,
+    ):
+        imports = Imports({"typing": {"Any", "Optional"}})
         if client_kind == "sync":
-            self.data.append("import requests")
+            imports.add("requests")
         else:
-            self.data.append("import aiohttp")
-        self.data.extend(
-            ["from typing import Any, Optional", "\n", f"BASE_URL = '{self.base_url}'"]
-        )
+            imports.add("aiohttp")
+            imports.add("typing", "AsyncIterator", "Iterable")
+        if client_kind == "sync" and (streaming or sync_concurrency):
+            imports.add("typing", "Iterable", "Iterator")
+        self.data.extend([imports, f"BASE_URL = {string_literal(self.base_url)}"])
 
     def get_component_obj_name(self, data: dict) -> str | None:
-        if json_body := data["content"].get("application/json"):
-            if "items" in json_body["schema"]:
-                return json_body["schema"]["items"].get("$ref", "Any")
-            elif "$ref" in json_body["schema"]:
-                return json_body["schema"]["$ref"]
-        return None
+        return get_component_obj_name(data)
 
-    def create_query_param_typedict(self, func_name: str, params: set) -> tuple[str, str]:
+    def create_query_param_typedict(self, func_name: str, params: list) -> tuple[str, str]:
         cls_name = func_name.title().replace("_", "").replace(" ", "") + "Query"
-        request_str = Template(
-            """class $cls_name(BaseModel):
-        $params"""
-        )
-        return request_str.substitute(cls_name=cls_name, params="\n\t".join(params)), cls_name
+        bases = get_model_bases(self.model_backend, self.defer_build)
+        return "\n".join(Class(cls_name, bases, params).render()), cls_name
 
     def generate_obj_imports(self) -> None:
-        for level_0 in self.paths.values():
-            for val in level_0.values():
-                tag_name = val["tags"][0].replace(" ", "")
-                if tag_name != self.only_tag:
-                    continue
-
-                if response := val.get("responses"):
-                    for resp_key, resp_val in response.items():
-                        if "content" in resp_val:
-                            component_ref = self.get_component_obj_name(resp_val)
-                            if component_ref:
-                                self.schema_imports.add(component_ref.split("/")[-1])
-
-                if request_body := val.get("requestBody"):
-                    component_ref = self.get_component_obj_name(request_body)
-                    if component_ref:
-                        self.schema_imports.add(component_ref.split("/")[-1])
-
-    def generate_request_functions(self, client_kind: Literal["sync", "async"] = "sync"):
-        for url, val in self.paths.items():
-            function_info = get_function_info_dict()
-            function_info["url"] = url
-
-            for key, val_obj in val.items():
-                tag_name = val_obj["tags"][0].replace(" ", "")
-                if tag_name != self.only_tag:
-                    continue
-
-                function_info["method"] = key
-                function_info["function_name"] = (
-                    f"{tag_name}_"
-                    f"{key}_"
-                    f"{operation_id_to_function_name(val_obj['operationId'])}"
+        self.schema_imports.update(self.operation_index.get_schema_imports(self.only_tag))
+
+    def generate_request_functions(
+        self,
+        client_kind: Literal["sync", "async"] = "sync",
+        streaming: bool = False,
+        sync_concurrency: bool = False,
+        response_cache: bool = False,
+        single_flight: bool = False,
+    ):
+        for operation in self.operation_index.get_operations(self.only_tag):
+            function_info = {**operation}
+            if query_params := operation["query_params"]:
+                query_param_schema, param_schema_name = self.create_query_param_typedict(
+                    function_info["function_name"], query_params
+                )
+                self.schema_imports.add(param_schema_name)
+                self.query_param_schemas.append(query_param_schema)
+                function_info["query_parameters"] = param_schema_name
+            self.data.append(
+                self.create_request_function_str(
+                    function_info, client_kind, response_cache, single_flight
                 )
-                function_info["function_name"] = function_info["function_name"].lower()
-
-                if req_body := val_obj.get("requestBody"):
-                    if json_data := req_body["content"].get("application/json"):
-                        if "items" in json_data["schema"]:
-                            obj_name = json_data["schema"]["items"]["$ref"].split("/")[-1]
-                            function_info["request_obj"] = f"list[{obj_name}]"
-                        else:
-                            function_info["request_obj"] = (
-                                json_data["schema"].get("$ref", "Any").split("/")[-1]
-                            )
-
-                if parameters := val_obj.get("parameters"):
-                    query_params = set()
-                    for obj in parameters:
-                        if obj["in"] == "path":
-                            param_name = operation_id_to_function_name(obj["name"])
-                            param_type = obj["schema"]["type"]
-                            url = url.replace(obj["name"], param_name)
-                            function_info["url"] = url
-                            function_info["path_parameters"].add(
-                                f"{param_name}: {TYPE_CONVERTION[param_type]}"
-                            )
-                        elif obj["in"] == "query":
-                            if obj.get("required"):
-                                type_info = TYPE_CONVERTION[obj["schema"]["type"]]
-                            else:
-                                type_info = (
-                                    f"Optional[{TYPE_CONVERTION[obj['schema']['type']]}] = None"
-                                )
-
-                            query_params.add(f"{obj['name']}: {type_info}")
-                        elif obj["in"] == "header":
-                            optional_ = "" if obj["required"] else ", optional"
-                            header_info = f"{obj['name']} : {TYPE_CONVERTION[obj['schema']['type']]}{optional_}"
-                            function_info["docstring"] += f"\n{header_info}"
-
-                    if query_params:
-                        query_param_schema, param_schema_name = self.create_query_param_typedict(
-                            function_info["function_name"], query_params
-                        )
-                        self.schema_imports.add(param_schema_name)
-                        self.query_param_schemas.append(query_param_schema)
-                        function_info["query_parameters"] = param_schema_name
-
-                if responses := val_obj.get("responses"):
-                    for key, content in responses.items():
-                        if key != 200:
-                            continue
-                        if resp_content := content.get("content"):
-                            if "items" in resp_content["application/json"]["schema"]:
-                                resp_ref = resp_content["application/json"]["schema"]["items"].get(
-                                    "$ref", "Any"
-                                )
-                                function_info["is_list"] = True
-                            elif "$ref" in resp_content["application/json"]["schema"]:
-                                resp_ref = resp_content["application/json"]["schema"]["$ref"]
-                            elif (
-                                "additionalProperties" in resp_content["application/json"]["schema"]
-                            ):
-                                resp_ref = TYPE_CONVERTION[
-                                    resp_content["application/json"]["schema"][
-                                        "additionalProperties"
-                                    ]["type"]
-                                ]
-                            else:
-                                try:
-                                    resp_ref = TYPE_CONVERTION[
-                                        resp_content["application/json"]["schema"]["type"]
-                                    ]
-                                except KeyError:
-                                    continue
-
-                            if resp_ref_ := resp_ref.split("/")[-1] in ("NoneType", "Metaclass"):
-                                function_info["response_obj"] = None
-                            else:
-                                function_info["response_obj"] = resp_ref.split("/")[-1]
-                self.data.append(self.create_request_function_str(function_info, client_kind))
-
-    def create_async_request(self, data: dict):
-        if data["query_parameters"] and not data["path_parameters"]:
-            function_str = Template(
-                """async def $function_name($function_params)$response_type:
-    $docstring_info
-    
-    headers_ = headers if headers is not None else {}
-    proxies_ = proxies if proxies is not None else {}
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(f"{BASE_URL}$url", params=params.dict(exclude_unset=True), $call_params) as resp:
-    
-            if resp.ok:
-                $return_response
-            else:
-                return None
-            """
-            )
-        elif data["path_parameters"] and not data["query_parameters"]:
-            function_str = Template(
-                """async def $function_name($function_params)$response_type:
-    $docstring_info
-    
-    url = f"{BASE_URL}$url"
-    headers_ = headers if headers is not None else {}
-    proxies_ = proxies if proxies is not None else {}
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url=url, $call_params) as resp:
-    
-            if resp.ok:
-                $return_response
-            else:
-                return None
-            """
-            )
-        elif data["path_parameters"] and data["query_parameters"]:
-            function_str = Template(
-                """async def $function_name($function_params)$response_type:
-    $docstring_info
-    
-    url = f"{BASE_URL}$url"
-    
-    headers_ = headers if headers is not None else {}
-    proxies_ = proxies if proxies is not None else {}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url=url, params=params.dict(exclude_unset=True), $call_params) as resp:
-    
-            if resp.ok:
-                $return_response
-            else:
-                return None
-            """
-            )
-        else:
-            function_str = Template(
-                """async def $function_name($function_params)$response_type:
-    $docstring_info
-    
-    headers_ = headers if headers is not None else {}
-    proxies_ = proxies if proxies is not None else {}
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url=f"{BASE_URL}$url", $call_params) as resp:
-    
-            if resp.ok:
-                $return_response
-            else:
-                return None
-                """
-            )
-        return function_str
-
-    def create_sync_request(self, data: dict):
-        if data["query_parameters"] and not data["path_parameters"]:
-            function_str = Template(
-                """def $function_name($function_params)$response_type:
-            $docstring_info
-
-            headers_ = headers if headers is not None else {}
-            proxies_ = proxies if proxies is not None else {}
-            
-            response_obj = requests.$method(url=f"{BASE_URL}$url", params=params.dict(exclude_unset=True), $call_params)
-            
-            if response_obj.ok:
-                return $return_response
-            return None
-            """
-            )
-        elif data["path_parameters"] and not data["query_parameters"]:
-            function_str = Template(
-                """def $function_name($function_params)$response_type:
-            $docstring_info
-            
-            url = f"{BASE_URL}$url"
-            headers_ = headers if headers is not None else {}
-            proxies_ = proxies if proxies is not None else {}
-            
-            response_obj = requests.$method(url=url, $call_params)
-            
-            if response_obj.ok:
-                return $return_response
-            return None
-            """
-            )
-        elif data["path_parameters"] and data["query_parameters"]:
-            function_str = Template(
-                """def $function_name($function_params)$response_type:
-            $docstring_info
-            
-            url = f"{BASE_URL}$url"
-            
-            headers_ = headers if headers is not None else {}
-            proxies_ = proxies if proxies is not None else {}
-            
-            response_obj = requests.$method(url=url, params=params.dict(exclude_unset=True), $call_params)
-            
-            if response_obj.ok:
-                return $return_response
-            return None
-            """
-            )
-        else:
-            function_str = Template(
-                """def $function_name($function_params)$response_type:
-            $docstring_info
-            
-            headers_ = headers if headers is not None else {}
-            proxies_ = proxies if proxies is not None else {}
-            
-            response_obj = requests.$method(url=f"{BASE_URL}$url", $call_params)
-            
-            if response_obj.ok:
-                return $return_response
-            return None
-                """
             )
-        return function_str
-
-    def create_request_function_str(
+            if client_kind == "async" or sync_concurrency:
+                self.data.append(self.create_many_function_str(function_info, client_kind))
+            if streaming and function_info["is_list"] and function_info["response_obj"]:
+                self.data.append(self.create_streaming_function_str(function_info, client_kind))
+                if function_info["pagination"] and function_info["query_parameters"]:
+                    self.data.append(
+                        self.create_pagination_function_str(function_info, client_kind)
+                    )
+
+    def create_async_request(self, data: dict, call_params: list, return_response: list) -> list:
+        request = Bracket("async with send_request", call_params, " as resp:")
+        return [Block(request, [Block("if resp.ok:", return_response), "return None"])]
+
+    def create_sync_request(self, data: dict, call_params: list, return_response: list) -> list:
+        return [
+            Bracket("response_obj = send_request", call_params),
+            "",
+            Block("if response_obj.ok:", return_response),
+            "return None",
+        ]
+
+    def create_function_params(
         self, data: dict, client_kind: Literal["sync", "async"] = "sync"
-    ) -> str:
-        path_parameters = ", ".join(data["path_parameters"])
-
+    ) -> tuple[list[str], list]:
         function_head_list = []
         request_call_params = []
 
-        if data["request_obj"]:
-            function_head_list.extend([f'req_data: {data["request_obj"]}', "/"])
-            if data["is_list"]:
+        headers_param = "headers=headers_"
+        if request_obj := data["request_obj"]:
+            function_head_list.extend([f"req_data: {request_obj}", "/"])
+            # bodies are serialized to json bytes by pydantic-core and sent pre-encoded
+            if self.model_backend == "pydantic":
                 request_call_params.append(
-                    "json=[obj.dict(exclude_unset=True) for obj in req_data]"
+                    Bracket("data=dump_json", [request_obj, "req_data", "exclude_unset=True"])
                 )
             else:
-                request_call_params.append("json=req_data.dict(exclude_unset=True)")
+                # structs omit the fields left at their default
+                request_call_params.append(Bracket("data=dump_json", [request_obj, "req_data"]))
+            content_type = (
+                f"{string_literal('Content-Type')}: {string_literal(data['application_type'])}"
+            )
+            headers_param = Bracket("headers=", [content_type, "**headers_"], brackets="{}")
 
-        if path_parameters:
-            function_head_list.append(path_parameters)
+        function_head_list.extend(data["path_parameters"])
         function_head_list.append("*")
 
         if query_param := data["query_parameters"]:
             function_head_list.append(f"params: {query_param}")
         function_head_list.extend(
-            ["headers: Optional[dict] = None", "proxies: Optional[dict] = None", "**kwargs: dict"]
+            ["headers: Optional[dict] = None", "proxies: Optional[dict] = None"]
         )
-        request_call_params.extend(["headers=headers_, proxies=proxies_, **kwargs"])
+        if client_kind == "sync":
+            function_head_list.append("session: Optional[requests.Session] = None")
+        else:
+            function_head_list.append("session: Optional[aiohttp.ClientSession] = None")
+        request_call_params.extend(["session=session", f"tag={string_literal(self.only_tag)}"])
+        # encodings declared on the operation override the defaults of the runtime
+        if data["request_obj"] and (request_encoding := data["request_encoding"]):
+            request_call_params.append(f"content_encoding={string_literal(request_encoding)}")
+        if accept_encoding := data["accept_encoding"]:
+            request_call_params.append(f"accept_encoding={string_literal(accept_encoding)}")
+        function_head_list.append("**kwargs: dict")
+        request_call_params.extend([headers_param, "proxies=proxies_", "**kwargs"])
+        return function_head_list, request_call_params
+
+    def get_url(self, data: dict) -> str:
+        return f'f"{{BASE_URL}}{data["url"]}"'
+
+    def get_query_params(self, data: dict) -> list[str]:
+        if not data["query_parameters"]:
+            return []
+        if self.model_backend == "msgspec":
+            return ["params=dump_params(params)"]
+        return ['params=params.model_dump(exclude_unset=True, mode="json")']
+
+    def create_decoded_request(
+        self,
+        data: dict,
+        call_params: list,
+        decoder: str | Bracket,
+        client_kind: Literal["sync", "async"] = "sync",
+        sender: str = "send_cached",
+    ) -> list:
+        await_ = "await " if client_kind == "async" else ""
+        if not self.has_validate_switch(data):
+            call_params = [
+                string_literal(data["method"]),
+                self.get_url(data),
+                decoder,
+                *self.get_query_params(data),
+                *call_params,
+            ]
+            return [Bracket(f"return {await_}{sender}", call_params)]
 
+        if isinstance(decoder, Bracket):
+            validated = Bracket(f"decode = {decoder.head}", decoder.args, decoder.tail)
+        else:
+            validated = f"decode = {decoder}"
+        constructed = Bracket("decode = get_constructor", [self.get_response_type(data)])
+        call_params = [
+            string_literal(data["method"]),
+            self.get_url(data),
+            "decode",
+            *self.get_query_params(data),
+            "validate=validate",
+            *call_params,
+        ]
+        return [
+            Block("if validate:", [validated], Block("else:", [constructed])),
+            Bracket(f"return {await_}{sender}", call_params),
+        ]
+
+    def get_decoder(self, data: dict) -> str | Bracket:
+        if self.model_backend == "msgspec":
+            # decoders are created once per type and reused by the runtime
+            if data["is_list"] and (response_obj := data["response_obj"]):
+                return Bracket("get_decoder", [f"list[{response_obj}]"], ".decode")
+            return Bracket("get_decoder", [data["response_obj"] or "Any"], ".decode")
+        if not (response_obj := data["response_obj"]):
+            return Bracket("get_type_adapter", ["Any"], ".validate_json")
+        elif data["is_list"]:
+            return Bracket("get_type_adapter", [f"list[{response_obj}]"], ".validate_json")
+        elif data["response_is_model"]:
+            return f"{response_obj}.model_validate_json"
+        return Bracket("get_type_adapter", [response_obj], ".validate_json")
+
+    def get_return_response(
+        self, data: dict, client_kind: Literal["sync", "async"] = "sync"
+    ) -> list:
         if client_kind == "sync":
-            function_str = self.create_sync_request(data)
+            content, statements = "response_obj.content", []
+        else:
+            content, statements = "data", ["data = await resp.read()"]
+
+        # bytes are passed straight to pydantic-core, which parses and validates in one go
+        if not (response_obj := data["response_obj"]):
+            if client_kind == "sync":
+                return ["return response_obj.json()"]
+            return ["data = await resp.json()", "return data"]
+        elif data["is_list"]:
+            decode = Bracket("return validate_json", [f"list[{response_obj}]", content])
+        elif data["response_is_model"] and self.model_backend == "pydantic":
+            decode = Bracket(f"return {response_obj}.model_validate_json", [content])
         else:
-            function_str = self.create_async_request(data)
+            decode = Bracket("return validate_json", [response_obj, content])
+        if self.has_validate_switch(data):
+            construct = Bracket("return construct_json", [self.get_response_type(data), content])
+            statements.append(Block("if not validate:", [construct]))
+        return [*statements, decode]
+
+    def has_validate_switch(self, data: dict) -> bool:
+        # structs are decoded by msgspec without python validators, there is nothing to skip
+        return self.model_backend == "pydantic" and bool(data["response_obj"])
+
+    def get_response_type(self, data: dict) -> str:
+        if data["is_list"]:
+            return f"list[{data['response_obj']}]"
+        return data["response_obj"]
+
+    def get_docstring(self, data: dict) -> str | None:
+        if docstring := data["docstring"]:
+            return f"Headers\n-------{docstring}"
+        return None
+
+    def create_request_function_str(
+        self,
+        data: dict,
+        client_kind: Literal["sync", "async"] = "sync",
+        response_cache: bool = False,
+        single_flight: bool = False,
+    ) -> Function:
+        function_head_list, request_call_params = self.create_function_params(data, client_kind)
+        if self.has_validate_switch(data):
+            function_head_list.insert(-1, "validate: bool = True")
 
         if response_obj := data["response_obj"]:
             if data["is_list"]:
-                response_type = f"-> Optional[list[{response_obj}]]"
+                response_type = f"Optional[list[{response_obj}]]"
             else:
-                response_type = f"-> Optional[{response_obj}]"
+                response_type = f"Optional[{response_obj}]"
         else:
-            response_type = "-> Any"
+            response_type = "Any"
+
+        call_params = [
+            string_literal(data["method"]),
+            f"url={self.get_url(data)}",
+            *self.get_query_params(data),
+            *request_call_params,
+        ]
+        if single_flight and client_kind == "async" and data["method"] == "get":
+            request = self.create_decoded_request(
+                data, request_call_params, self.get_decoder(data), client_kind, "send_shared"
+            )
+        elif response_cache and data["method"] == "get":
+            request = self.create_decoded_request(
+                data, request_call_params, self.get_decoder(data), client_kind, "send_cached"
+            )
+        elif client_kind == "sync":
+            request = self.create_sync_request(
+                data, call_params, self.get_return_response(data, client_kind)
+            )
+        else:
+            request = self.create_async_request(
+                data, call_params, self.get_return_response(data, client_kind)
+            )
 
-        if response_obj := data["response_obj"]:
-            if client_kind == "sync":
-                if data["is_list"]:
-                    return_response = f"[{response_obj}(**obj) for obj in response_obj.json()]"
-                else:
-                    return_response = f"{response_obj}(**response_obj.json())"
-            else:
-                if data["is_list"]:
-                    return_response = Template(
-                        """
-                        data = await resp.json()
-                        return [$resp_obj(**obj) for obj in data]
-                    """
-                    ).substitute(resp_obj=response_obj)
-                else:
-                    return_response = Template(
-                        """
-                        data = await resp.json()
-                        return $resp_obj(**data)
-                    """
-                    ).substitute(resp_obj=response_obj)
+        return Function(
+            data["function_name"],
+            function_head_list,
+            [
+                "headers_ = headers if headers is not None else {}",
+                "proxies_ = proxies if proxies is not None else {}",
+                "",
+                *request,
+            ],
+            returns=response_type,
+            is_async=client_kind == "async",
+            docstring=self.get_docstring(data),
+        )
+
+    def create_streaming_function_str(
+        self, data: dict, client_kind: Literal["sync", "async"] = "sync"
+    ) -> Function:
+        function_head_list, request_call_params = self.create_function_params(data, client_kind)
+        function_head_list.insert(-1, "chunk_size: int = 65536")
+        request_call_params = [*self.get_query_params(data), *request_call_params]
+        method = string_literal(data["method"])
+        response_obj = data["response_obj"]
+
+        if client_kind == "sync":
+            request = Block(
+                Bracket(
+                    "with send_request",
+                    [method, f"url={self.get_url(data)}", "stream=True", *request_call_params],
+                    " as response_obj:",
+                ),
+                [
+                    Block(
+                        "if response_obj.ok:",
+                        [
+                            Bracket(
+                                "yield from iter_json",
+                                [response_obj, "response_obj.iter_content(chunk_size)"],
+                            )
+                        ],
+                    )
+                ],
+            )
+            returns = f"Iterator[{response_obj}]"
+        else:
+            items = Bracket(
+                "async for obj in aiter_json",
+                [response_obj, "resp.content.iter_chunked(chunk_size)"],
+                ":",
+            )
+            request = Block(
+                Bracket(
+                    "async with send_request",
+                    [method, self.get_url(data), *request_call_params],
+                    " as resp:",
+                ),
+                [Block("if resp.ok:", [Block(items, ["yield obj"])])],
+            )
+            returns = f"AsyncIterator[{response_obj}]"
+
+        return Function(
+            f"{data['function_name']}_iter",
+            function_head_list,
+            [
+                "headers_ = headers if headers is not None else {}",
+                "proxies_ = proxies if proxies is not None else {}",
+                "",
+                request,
+            ],
+            returns=returns,
+            is_async=client_kind == "async",
+            docstring="Stream the response and yield its items one at a time.",
+        )
+
+    def create_many_function_str(
+        self, data: dict, client_kind: Literal["sync", "async"] = "sync"
+    ) -> Function:
+        function_name = data["function_name"]
+        if client_kind == "sync":
+            limit = "max_workers"
+            returns = "Iterator[BatchResult]"
+            docstring = f"""
+Call ``{function_name}`` for every item of ``calls`` in a pool of ``max_workers``
+threads, an item is a dict of keyword arguments, a tuple of positional arguments or
+a single positional argument. ``kwargs`` are passed to every call.
+
+Yields a ``BatchResult`` per call, in the order of ``calls`` or as completed.
+"""
         else:
+            limit = "max_concurrency"
+            returns = "AsyncIterator[BatchResult]"
+            docstring = f"""
+Call ``{function_name}`` for every item of ``calls`` with at most ``max_concurrency``
+requests at a time, an item is a dict of keyword arguments, a tuple of positional
+arguments or a single positional argument. ``kwargs`` are passed to every call.
+
+Yields a ``BatchResult`` per call, in the order of ``calls`` or as completed.
+"""
+        return Function(
+            f"{function_name}_many",
+            [
+                "calls: Iterable[Any]",
+                "*",
+                f"{limit}: int = 10",
+                "ordered: bool = True",
+                "**kwargs: Any",
+            ],
+            [Bracket("return run_many", [function_name, "calls", limit, "ordered", "**kwargs"])],
+            returns=returns,
+            docstring=docstring,
+        )
+
+    def create_pagination_function_str(
+        self, data: dict, client_kind: Literal["sync", "async"] = "sync"
+    ) -> Function:
+        function_head_list, _ = self.create_function_params(data, client_kind)
+        function_head_list.insert(-1, "chunk_size: int = 65536")
+        page_call_params = []
+        if data["request_obj"]:
+            page_call_params.append("req_data")
+        page_call_params.extend(obj.split(":")[0] for obj in data["path_parameters"])
+        page_call_params.extend(
+            [
+                "params=page_params",
+                "headers=headers",
+                "proxies=proxies",
+                "session=session",
+                "chunk_size=chunk_size",
+                "**kwargs",
+            ]
+        )
+        pages = [
+            Bracket(f"lambda page_params: {data['function_name']}_iter", page_call_params),
+            "params",
+            string_literal(data["pagination"]),
+        ]
+
+        if client_kind == "sync":
+            body = [Bracket("yield from iter_pages", pages)]
+            returns = f"Iterator[{data['response_obj']}]"
+        else:
+            body = [Block(Bracket("async for obj in aiter_pages", pages, ":"), ["yield obj"])]
+            returns = f"AsyncIterator[{data['response_obj']}]"
+        return Function(
+            f"{data['function_name']}_paginate",
+            function_head_list,
+            body,
+            returns=returns,
+            is_async=client_kind == "async",
+            docstring=f"""
+Stream all pages and yield their items one at a time, the ``{data["pagination"]}`` query param
+is advanced after every page.
+""",
+        )
+
+    def generate_runtime_imports(
+        self,
+        runtime_path: str,
+        client_kind: Literal["sync", "async"] = "sync",
+        streaming: bool = False,
+        sync_concurrency: bool = False,
+        response_cache: bool = False,
+        single_flight: bool = False,
+    ):
+        runtime_imports = ["dump_json", "send_request", "validate_json"]
+        if self.model_backend == "msgspec":
+            runtime_imports.append("dump_params")
+        else:
+            runtime_imports.append("construct_json")
+        if response_cache or (single_flight and client_kind == "async"):
+            if self.model_backend == "msgspec":
+                runtime_imports.append("get_decoder")
+            else:
+                runtime_imports.extend(["get_constructor", "get_type_adapter"])
+        if response_cache:
+            runtime_imports.append("send_cached")
+        if single_flight and client_kind == "async":
+            runtime_imports.append("send_shared")
+        if client_kind == "async" or sync_concurrency:
+            runtime_imports.extend(["BatchResult", "run_many"])
+        if streaming:
             if client_kind == "sync":
-                return_response = f"response_obj.json()"
+                runtime_imports.extend(["iter_json", "iter_pages"])
             else:
-                return_response = Template(
-                    """
-                data = await resp.json()
-                return data
-                """
-                ).substitute()
-
-        docstring_txt = ""
-        if txt := data["docstring"] and client_kind == "sync":
-            docstring_txt = Template(
-                '''
-            """
-Headers
--------$docstring
-            """
-                '''
-            ).substitute(docstring=txt)
-        if txt := data["docstring"] and client_kind == "async":
-            docstring_txt = Template(
-                '''
-    """
-Headers
--------$docstring
-    """
-                '''
-            ).substitute(docstring=txt)
-
-        return function_str.substitute(
-            url=data["url"],
-            method=data["method"],
-            function_name=data["function_name"],
-            function_params=", ".join(function_head_list),
-            call_params=", ".join(request_call_params),
-            resp_obj=data["response_obj"],
-            return_response=return_response,
-            response_type=response_type,
-            docstring_info=docstring_txt,
-        )
+                runtime_imports.extend(["aiter_json", "aiter_pages"])
+        self.data.append(create_import(runtime_path, sorted(runtime_imports)))
 
     def generate_apis(
-        self, schema_path: str, client_kind: Literal["sync", "async"] = "sync"
+        self,
+        schema_path: str,
+        client_kind: Literal["sync", "async"] = "sync",
+        runtime_path: str | None = None,
+        streaming: bool = False,
+        sync_concurrency: bool = False,
+        response_cache: bool = False,
+        single_flight: bool = False,
     ) -> None:
-        self.generate_base_imports(client_kind)
+        if runtime_path is None:
+            # the runtime module is placed next to the schema module
+            package, _, _ = schema_path.rpartition(".")
+            runtime_path = f"{package}.runtime" if package else "runtime"
+        self.generate_base_imports(client_kind, streaming, sync_concurrency)
+        library_imports, base_url = self.data[:-1], self.data[-1:]
+        self.data = []
         self.generate_obj_imports()
-        self.generate_request_functions(client_kind)
-        objs_str = ",\n".join(
-            [
-                obj
-                for obj in self.schema_imports
-                if obj not in ("AnyType", "Metaclass", "NoneType", "Any")
-            ]
+        self.generate_request_functions(
+            client_kind, streaming, sync_concurrency, response_cache, single_flight
+        )
+        functions, self.data = self.data, []
+
+        self.generate_runtime_imports(
+            runtime_path, client_kind, streaming, sync_concurrency, response_cache, single_flight
         )
-        if objs_str:
-            data = [
-                f"from {schema_path} import ({objs_str})",
-                "\n",
-            ] + self.data
-            data.append("\n")
-            self.data = data
-
-    def write_api(self, folder_path: Path):
-        text = black.format_str("\n".join(self.data), mode=black.Mode())
-        file = folder_path / Path(f"{self.only_tag.lower()}.py")
-        file.write_text(text)
-        isort.api.sort_file(file)
+        objs = [
+            obj
+            for obj in sorted(self.schema_imports)
+            if obj not in ("AnyType", "Metaclass", "NoneType", "Any")
+        ]
+        if objs:
+            self.data.append(create_import(schema_path, objs))
+        # the imports of the sibling modules follow the library imports
+        self.data = [*library_imports, *self.data, *base_url, *functions]
+
+    def render(self) -> str:
+        return Module(self.data).render()
+
+    def write_api(self, folder_path: Path, formatter: Formatter | None = None):
+        if formatter is None:
+            formatter = Formatter(folder_path)
+        file = folder_path / Path(get_module_name(self.only_tag))
+        formatter.write(file, self.render(), preformatted=True)
@@ -0,0 +1,283 @@
+"""
+A small code model for the generated modules.
+
+The nodes render themselves the way black would format them, so the generated code does
+not have to go through black. Only the constructs the generator emits are supported:
+calls, signatures, imports and literals are wrapped at their brackets, everything else
+is kept on one line.
+"""
+
+import sys
+
+LINE_LENGTH = 88
+INDENT = "    "
+
+
+def string_literal(value: str) -> str:
+    """
+    The literal of ``value`` with the quotes black prefers.
+    """
+    literal = repr(value)
+    if literal.startswith("'") and '"' not in value:
+        literal = f'"{literal[1:-1]}"'.replace("\\'", "'")
+    return literal
+
+
+def flat(node) -> str:
+    return node if isinstance(node, str) else node.flat()
+
+
+class Bracket:
+    """
+    An expression ``head(args)tail``, e.g. a call, a signature or an import.
+
+    When it does not fit into a line the arguments go onto one line of their own, and
+    if they do not fit either onto one line each with a trailing comma. Arguments are
+    strings or nested ``Bracket``.
+    """
+
+    __slots__ = ("head", "args", "tail", "brackets", "kind")
+
+    def __init__(
+        self,
+        head: str,
+        args: list,
+        tail: str = "",
+        brackets: str = "()",
+        kind: str = "call",
+    ):
+        self.head = head
+        self.args = args
+        self.tail = tail
+        self.brackets = brackets
+        self.kind = kind
+
+    def flat(self) -> str:
+        args = ", ".join(flat(obj) for obj in self.args)
+        if self.kind == "import":
+            return f"{self.head}{args}{self.tail}"
+        return f"{self.head}{self.brackets[0]}{args}{self.brackets[1]}{self.tail}"
+
+    def render(self, depth: int = 0, end: str = "") -> list[str]:
+        """
+        ``end`` follows the expression on its last line, e.g. the comma of an argument.
+        """
+        indent = INDENT * depth
+        line = f"{self.flat()}{end}"
+        if len(indent) + len(line) <= LINE_LENGTH or not self.args:
+            return [f"{indent}{line}"]
+
+        lines = self.split(depth, end)
+        if self.head.startswith("return ") and len(lines[0]) > LINE_LENGTH:
+            # black wraps the returned value into parentheses if the call alone fits better
+            value = Bracket(
+                self.head.removeprefix("return "), self.args, self.tail, self.brackets, self.kind
+            )
+            wrapped = [f"{indent}return (", *value.render(depth + 1), f"{indent}){end}"]
+            if all(len(obj) <= LINE_LENGTH for obj in wrapped):
+                return wrapped
+        return lines
+
+    def split(self, depth: int, end: str = "") -> list[str]:
+        indent = INDENT * depth
+
+        head = f"{indent}{self.head}{self.brackets[0]}"
+        tail = f"{indent}{self.brackets[1]}{self.tail}{end}"
+        # split imports, dict and list literals and signatures of a single argument always
+        # get an argument per line and a trailing comma
+        explode = (
+            self.kind == "import"
+            or self.brackets != "()"
+            or (self.kind == "def" and len(self.args) == 1)
+        )
+        body = ", ".join(flat(obj) for obj in self.args)
+        if not explode and len(indent) + len(INDENT) + len(body) <= LINE_LENGTH:
+            return [head, f"{indent}{INDENT}{body}", tail]
+
+        lines = [head]
+        for obj in self.args:
+            if isinstance(obj, str):
+                lines.append(f"{indent}{INDENT}{obj},")
+            else:
+                lines.extend(obj.render(depth + 1, ","))
+        lines.append(tail)
+        return lines
+
+
+class Block:
+    """
+    A compound statement, ``header`` is a line or a ``Bracket`` ending with a colon.
+
+    The body holds statements, nested nodes and empty strings for blank lines. Further
+    ``clauses`` like ``else`` follow the body directly.
+    """
+
+    __slots__ = ("header", "body", "clauses")
+
+    def __init__(self, header, body: list, *clauses: "Block"):
+        self.header = header
+        self.body = body
+        self.clauses = clauses
+
+    def render(self, depth: int = 0) -> list[str]:
+        lines = [*render_node(self.header, depth), *render_body(self.body, depth + 1)]
+        for clause in self.clauses:
+            lines.extend(clause.render(depth))
+        return lines
+
+
+class Docstring:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def render(self, depth: int = 0) -> list[str]:
+        indent = INDENT * depth
+        lines = [f"{indent}{obj}".rstrip() for obj in self.text.strip().splitlines()]
+        return [f'{indent}"""', *lines, f'{indent}"""']
+
+
+class Function:
+    __slots__ = ("name", "params", "returns", "body", "is_async", "decorators", "docstring")
+
+    def __init__(
+        self,
+        name: str,
+        params: list,
+        body: list,
+        returns: str | None = None,
+        is_async: bool = False,
+        decorators: list[str] = (),
+        docstring: str | None = None,
+    ):
+        self.name = name
+        self.params = params
+        self.returns = returns
+        self.body = body
+        self.is_async = is_async
+        self.decorators = decorators
+        self.docstring = docstring
+
+    def render(self, depth: int = 0) -> list[str]:
+        indent = INDENT * depth
+        head = f"{'async ' if self.is_async else ''}def {self.name}"
+        tail = f" -> {self.returns}:" if self.returns else ":"
+        signature = Bracket(head, self.params, tail, kind="def")
+        body = [Docstring(self.docstring), *self.body] if self.docstring else self.body
+        return [
+            *(f"{indent}@{obj}" for obj in self.decorators),
+            *signature.render(depth),
+            *render_body(body, depth + 1),
+        ]
+
+
+class Class:
+    __slots__ = ("name", "bases", "body")
+
+    def __init__(self, name: str, bases: list[str], body: list):
+        self.name = name
+        self.bases = bases
+        self.body = body
+
+    def render(self, depth: int = 0) -> list[str]:
+        if self.bases:
+            header = Bracket(f"class {self.name}", self.bases, ":").render(depth)
+        else:
+            header = [f"{INDENT * depth}class {self.name}:"]
+        return [*header, *render_body(self.body or ["pass"], depth + 1)]
+
+
+class Imports:
+    """
+    ``from module import name`` statements, grouped into standard library and third party
+    imports and sorted within the groups like isort.
+    """
+
+    __slots__ = ("modules",)
+
+    def __init__(self, modules: dict[str, set[str]] | None = None):
+        self.modules = {}
+        for module, names in (modules or {}).items():
+            self.add(module, *names)
+
+    def add(self, module: str, *names: str):
+        self.modules.setdefault(module, set()).update(names)
+
+    def render(self, depth: int = 0) -> list[str]:
+        groups = ([], [])
+        # like isort, plain imports come before the from imports of a group
+        for module in sorted(self.modules, key=lambda obj: (bool(self.modules[obj]), obj)):
+            is_stdlib = module.split(".")[0] in sys.stdlib_module_names
+            groups[0 if is_stdlib else 1].append(module)
+
+        lines = []
+        for group in groups:
+            if lines and group:
+                lines.append("")
+            for module in group:
+                lines.extend(import_lines(module, sorted(self.modules[module]), depth))
+        return lines
+
+
+def import_lines(module: str, names: list[str], depth: int = 0) -> list[str]:
+    if not names:
+        return [f"{INDENT * depth}import {module}"]
+    return Bracket(f"from {module} import ", names, kind="import").render(depth)
+
+
+def render_node(node, depth: int = 0) -> list[str]:
+    if isinstance(node, str):
+        indent = INDENT * depth
+        return [f"{indent}{obj}" if obj else "" for obj in node.splitlines()] or [""]
+    return node.render(depth)
+
+
+def is_definition(node) -> bool:
+    return isinstance(node, (Function, Class)) or (
+        isinstance(node, str) and node.startswith(("def ", "async def ", "class ", "@"))
+    )
+
+
+def render_body(body: list, depth: int = 0) -> list[str]:
+    lines = []
+    previous = None
+    for node in body:
+        # methods are separated from the statements before them by a blank line
+        if is_definition(node) and previous is not None and previous != "":
+            if not (isinstance(previous, str) and previous.startswith("@")):
+                lines.append("")
+        lines.extend(render_node(node, depth))
+        previous = node
+    return lines
+
+
+class Module:
+    """
+    The nodes of a module, definitions are separated by two blank lines, statements by
+    a single one.
+    """
+
+    __slots__ = ("body",)
+
+    def __init__(self, body: list):
+        self.body = body
+
+    def render(self) -> str:
+        lines = []
+        previous = None
+        for node in body_nodes(self.body):
+            if previous is not None:
+                blank_lines = 1
+                if is_definition(node) or is_definition(previous):
+                    blank_lines = 2
+                elif isinstance(previous, Imports) and not isinstance(node, Imports):
+                    blank_lines = 2
+                lines.extend([""] * blank_lines)
+            lines.extend(render_node(node))
+            previous = node
+        return "\n".join(lines) + "\n"
+
+
+def body_nodes(body: list) -> list:
+    return [obj for obj in body if obj != "" and obj is not None]
@@ -0,0 +1,100 @@
+import hashlib
+import os
+from pathlib import Path
+
+import black
+import isort
+
+from openapi_fastapi_client.profiling import phase
+
+
+def get_default_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / Path(".cache")
+    return Path(cache_home) / Path("openapi-fastapi-client")
+
+
+def config_fingerprint(config: isort.Config) -> str:
+    # the default source is the same for every run, only the found settings are of interest
+    settings = []
+    for source in config.sources[1:]:
+        for key, val in sorted(source.items()):
+            if isinstance(val, (set, frozenset)):
+                val = sorted(val)
+            settings.append(f"{key}={val!r}")
+    return "\n".join(settings)
+
+
+class Formatter:
+    """
+    Formats generated code in memory with black and isort.
+
+    Modules rendered by the code model (``codegen``) are already formatted the way black
+    would format them and are written as they are, with ``verify`` black checks them
+    instead. Only isort runs on them, when the output folder has its own isort settings.
+    Formatted results are stored in ``cache_dir`` keyed by a hash of the unformatted text,
+    the formatter versions and the isort settings, so identical code is only formatted once
+    across runs.
+    """
+
+    __slots__ = ("enabled", "verify", "cache_dir", "isort_config", "isort_settings", "fingerprint")
+
+    def __init__(
+        self,
+        folder_path: Path,
+        cache_dir: Path | None = None,
+        enabled: bool = True,
+        verify: bool = False,
+    ):
+        self.enabled = enabled
+        self.verify = verify
+        self.cache_dir = cache_dir / Path("format") if cache_dir is not None else None
+        self.isort_config = isort.Config(settings_path=str(folder_path.resolve()))
+        self.isort_settings = config_fingerprint(self.isort_config)
+        self.fingerprint = "\n".join([black.__version__, isort.__version__, self.isort_settings])
+
+    def get_cache_file(self, text: str) -> Path:
+        digest = hashlib.sha256(f"{self.fingerprint}\n{text}".encode("utf-8")).hexdigest()
+        return self.cache_dir / Path(digest[:2]) / Path(f"{digest}.py")
+
+    def format_str(self, text: str) -> str:
+        if not self.enabled:
+            return text
+
+        if self.cache_dir is None:
+            return self.run_formatters(text)
+
+        cache_file = self.get_cache_file(text)
+        try:
+            return cache_file.read_text()
+        except FileNotFoundError:
+            pass
+
+        formatted_text = self.run_formatters(text)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(formatted_text)
+        tmp_file.replace(cache_file)
+        return formatted_text
+
+    def run_formatters(self, text: str) -> str:
+        with phase("black"):
+            text = black.format_str(text, mode=black.Mode())
+        with phase("isort"):
+            return isort.code(text, config=self.isort_config)
+
+    def verify_str(self, file: Path, text: str):
+        with phase("verify", file=file.name):
+            if black.format_str(text, mode=black.Mode()) != text:
+                raise ValueError(f"The generated {file.name} is not formatted like black.")
+
+    def write(self, file: Path, text: str, preformatted: bool = False):
+        if not preformatted:
+            text = self.format_str(text)
+        else:
+            if self.verify:
+                self.verify_str(file, text)
+            if self.enabled and self.isort_settings:
+                with phase("isort", file=file.name):
+                    text = isort.code(text, config=self.isort_config)
+        with phase("write", file=file.name):
+            file.write_text(text)
@@ -1,5 +1,6 @@
 import re
-from string import Template
+
+from openapi_fastapi_client.codegen import Block, Function, Imports, string_literal
 
 
 def operation_id_to_function_name(operation_id: str) -> str:
@@ -47,7 +48,7 @@ def string_constraints(type_info: dict) -> str:
         params.append(f"max_length={max_}")
 
     if params:
-        return ",".join(params)
+        return ", ".join(params)
     return ""
 
 
@@ -63,34 +64,106 @@ def number_constraints(type_info: dict) -> str:
         params.append(f"multiple_of={multiple_of}")
 
     if params:
-        return ",".join(params)
+        return ", ".join(params)
     return ""
 
 
-def create_validator(field_name: str, field_type: str):
+def create_validator(field_name: str, field_type: str) -> Function:
     function_name = f"optional_{operation_id_to_function_name(field_name)}"
-    return Template(
-        """
-    @classmethod
-    @field_validator("$field_name")
-    def $function_name(cls, val: $field_type) -> $field_type:
-        if val is not None:
-            return val
-        else:
-            raise ValueError("$field_name may not be None")
-        """
-    ).substitute(field_name=field_name, function_name=function_name, field_type=field_type)
+    message = string_literal(f"{field_name} may not be None")
+    return Function(
+        function_name,
+        ["cls", f"val: {field_type}"],
+        [
+            Block(
+                "if val is not None:",
+                ["return val"],
+                Block("else:", [f"raise ValueError({message})"]),
+            )
+        ],
+        returns=field_type,
+        # pydantic only registers the validator when field_validator wraps the classmethod
+        decorators=[f"field_validator({string_literal(field_name)})", "classmethod"],
+    )
 
 
-def get_all_tags(paths: dict) -> set:
-    return set(
-        [
-            val_obj["tags"][0].replace(" ", "")
-            for url, val in paths.items()
-            for key, val_obj in val.items()
-        ]
+def create_import(module_path: str, names: list[str]) -> Imports | Block:
+    """
+    Import ``names`` from a generated module.
+
+    A plain module name is imported relative to the package when the client is imported
+    as a package and absolute when its folder is on ``sys.path``.
+    """
+    if "." in module_path:
+        return Imports({module_path: set(names)})
+    return Block(
+        "if __package__:",
+        [Imports({f".{module_path}": set(names)})],
+        Block("else:", [Imports({module_path: set(names)})]),
     )
 
 
+def get_module_name(tag: str) -> str:
+    return f"{tag.lower()}.py"
+
+
+def get_schema_module_name(class_name: str) -> str:
+    return f"schema_{operation_id_to_function_name(class_name).lstrip('_')}.py"
+
+
+def get_class_name(class_str: str) -> str:
+    return re.match(r"\s*class (\w+)", class_str).group(1)
+
+
+def strongly_connected_components(graph: dict[str, set[str]]) -> list[list[str]]:
+    """
+    Tarjan's algorithm, iterative so long reference chains do not hit the recursion limit.
+
+    ``graph`` maps every node to the nodes it depends on. The components are returned
+    in dependency order, a component only depends on itself and the ones before it.
+    """
+    order = {node: idx for idx, node in enumerate(graph)}
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, dependencies = work[-1]
+            for dependency in dependencies:
+                if dependency not in index:
+                    index[dependency] = lowlink[dependency] = len(index)
+                    stack.append(dependency)
+                    on_stack.add(dependency)
+                    work.append((dependency, iter(sorted(graph[dependency]))))
+                    break
+                if dependency in on_stack:
+                    lowlink[node] = min(lowlink[node], index[dependency])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    # keep the order of the graph within a component
+                    components.append(sorted(component, key=order.get))
+    return components
+
+
 if __name__ == "__main__":
     print(function_like_name_to_class_name("salutation"))
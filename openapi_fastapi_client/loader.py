@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional extra
+    orjson = None
+
+from openapi_fastapi_client.manifest import get_generator_version
+from openapi_fastapi_client.profiling import phase
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def is_json(text: bytes) -> bool:
+    return text.lstrip()[:1] in (b"{", b"[")
+
+
+def parse_json(text: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def normalize(obj: Any) -> Any:
+    """
+    Yaml parses unquoted keys like status codes to ``int`` or ``bool``, json keys are
+    always ``str``. Both formats are normalized to ``str`` keys, so they give the same
+    documents.
+    """
+    if isinstance(obj, dict):
+        return {str(key): normalize(val) for key, val in obj.items()}
+    if isinstance(obj, list):
+        return [normalize(val) for val in obj]
+    return obj
+
+
+def parse_spec(text: bytes) -> Any:
+    if is_json(text):
+        try:
+            return normalize(parse_json(text))
+        except ValueError:
+            # json is a subset of yaml, e.g. for documents with comments
+            pass
+    return normalize(yaml.load(text, Loader=YAML_LOADER))
+
+
+class SpecLoader:
+    """
+    Loads openapi files, json with orjson (if installed) and yaml with the C safe loader.
+
+    With a ``cache_dir`` the parsed and normalized documents are pickled, keyed by a hash
+    of the file content, so an unchanged file is only parsed once across runs. A single
+    loader can be shared by all files of a run.
+    """
+
+    __slots__ = ("cache_dir",)
+
+    def __init__(self, cache_dir: Path | None = None):
+        self.cache_dir = cache_dir / Path("specs") if cache_dir is not None else None
+
+    def get_cache_file(self, text: bytes) -> Path:
+        hasher = hashlib.sha256(
+            f"{get_generator_version()}\n{pickle.HIGHEST_PROTOCOL}\n".encode("utf-8")
+        )
+        hasher.update(text)
+        digest = hasher.hexdigest()
+        return self.cache_dir / Path(digest[:2]) / Path(f"{digest}.pickle")
+
+    def load(self, file: Path) -> Any:
+        text = file.read_bytes()
+        if self.cache_dir is None:
+            with phase("spec_parse", file=file.name):
+                return parse_spec(text)
+
+        cache_file = self.get_cache_file(text)
+        try:
+            with phase("spec_cache", file=file.name):
+                return pickle.loads(cache_file.read_bytes())
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # a partial file or one pickled against other versions of the libraries
+            cache_file.unlink(missing_ok=True)
+
+        with phase("spec_parse", file=file.name):
+            data = parse_spec(text)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_bytes(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp_file.replace(cache_file)
+        return data
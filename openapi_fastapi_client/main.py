@@ -1,55 +1,423 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
+import click
 import typer
-import yaml
 
 from openapi_fastapi_client.api import Api
-from openapi_fastapi_client.helpers import get_all_tags
-from openapi_fastapi_client.schema import Schema
+from openapi_fastapi_client.formatting import Formatter, get_default_cache_dir
+from openapi_fastapi_client.helpers import get_class_name, get_module_name
+from openapi_fastapi_client.loader import SpecLoader
+from openapi_fastapi_client.manifest import Manifest, hash_data
+from openapi_fastapi_client.operations import OperationIndex
+from openapi_fastapi_client.package import PackageInit, is_generated_init
+from openapi_fastapi_client.profiling import Profiler, get_profiler, phase
+from openapi_fastapi_client.refs import RefResolver
+from openapi_fastapi_client.runtime import Runtime
+from openapi_fastapi_client.schema import MODEL_BACKENDS, SCHEMA_LAYOUTS, Schema
 
 app = typer.Typer()
 
+_WORKER_STATE = {}
 
-@app.command()
-def main(
+
+def init_worker(
+    paths: dict,
+    base_url: str,
+    operation_index: OperationIndex,
+    client_kind: Literal["sync", "async"],
+    folder_path: Path,
+    formatter: Formatter,
+    streaming: bool = False,
+    sync_concurrency: bool = False,
+    response_cache: bool = False,
+    single_flight: bool = False,
+    model_backend: str = "pydantic",
+    defer_build: bool = False,
+    profile: bool = False,
+    trace_memory: bool = False,
+):
+    _WORKER_STATE.update(
+        paths=paths,
+        base_url=base_url,
+        operation_index=operation_index,
+        client_kind=client_kind,
+        folder_path=folder_path,
+        formatter=formatter,
+        streaming=streaming,
+        sync_concurrency=sync_concurrency,
+        response_cache=response_cache,
+        single_flight=single_flight,
+        model_backend=model_backend,
+        defer_build=defer_build,
+        profile=profile,
+        trace_memory=trace_memory,
+    )
+
+
+def write_tag_module(tag: str) -> tuple[list[str], list[dict]]:
+    """
+    Render, format and write the api module of a single tag.
+
+    Uses the state set up by ``init_worker`` so that it can run inside a worker
+    process and returns the query param schemas which belong into the ``schema.py``
+    together with the profiling records of the worker.
+    """
+    profiler = Profiler(
+        enabled=_WORKER_STATE["profile"], trace_memory=_WORKER_STATE["trace_memory"]
+    )
+    with profiler:
+        api = Api(
+            _WORKER_STATE["paths"],
+            base_url=_WORKER_STATE["base_url"],
+            only_tag=tag,
+            operation_index=_WORKER_STATE["operation_index"],
+            model_backend=_WORKER_STATE["model_backend"],
+            defer_build=_WORKER_STATE["defer_build"],
+        )
+        with phase("generate_apis", tag=tag):
+            api.generate_apis(
+                schema_path="schema",
+                client_kind=_WORKER_STATE["client_kind"],
+                streaming=_WORKER_STATE["streaming"],
+                sync_concurrency=_WORKER_STATE["sync_concurrency"],
+                response_cache=_WORKER_STATE["response_cache"],
+                single_flight=_WORKER_STATE["single_flight"],
+            )
+        api.write_api(_WORKER_STATE["folder_path"], _WORKER_STATE["formatter"])
+    return api.query_param_schemas, profiler.records
+
+
+def generate(
     openapi_file: Path,
     output_path: Path,
-    sync_req: Optional[bool] = typer.Option(
-        True, "--sync", help="All requests to the client are synchronous."
-    ),
-    async_req: Optional[bool] = typer.Option(
-        False, "--async", help="All requests to the client are asynchronous with aiohttp."
-    ),
+    client_kind: Literal["sync", "async"] = "sync",
+    jobs: int = 1,
+    force: bool = False,
+    no_format: bool = False,
+    cache_dir: Path | None = None,
+    streaming: bool = False,
+    sync_concurrency: bool = False,
+    response_cache: bool = False,
+    single_flight: bool = False,
+    accept_encoding: str | None = None,
+    request_encoding: str | None = None,
+    compress_threshold: int = 1024,
+    max_retries: int = 0,
+    schema_layout: Literal["single", "model", "tag"] = "single",
+    verify_format: bool = False,
+    model_backend: Literal["pydantic", "msgspec"] = "pydantic",
+    defer_build: bool = False,
 ):
+    """
+    Generate the client for ``openapi_file`` into ``output_path``.
+
+    Wrap the call into a ``Profiler`` to record the time and allocations of every phase.
+    """
     if not openapi_file.exists():
         raise FileNotFoundError(f"{openapi_file} does not exists.")
 
-    with openapi_file.open("r") as yaml_file:
-        yaml_data = yaml.load(yaml_file, Loader=yaml.CFullLoader)
+    if cache_dir is None:
+        cache_dir = get_default_cache_dir()
+    loader = SpecLoader(cache_dir)
+    with phase("yaml_load"):
+        yaml_data = loader.load(openapi_file)
 
     folder_path = output_path
     if not folder_path.exists():
         folder_path.mkdir(parents=True, exist_ok=True)
-        folder_path.cwd()
-        with (folder_path / Path("__init__.py")).open("w") as file:
-            file.write("\n")
 
-    schema = Schema(yaml_data["components"]["schemas"])
-    schema.generate_schemas()
+    with phase("operation_index"):
+        resolver = RefResolver(yaml_data, openapi_file, loader)
+        operation_index = OperationIndex(yaml_data["paths"], resolver)
+    base_url = yaml_data.get("servers", [{"url": "http://localhost:8080"}])[0]["url"]
+    # encodings declared for the whole spec apply unless given as options
+    if accept_encoding is None:
+        accept_encoding = yaml_data.get("x-accept-encoding")
+    if request_encoding is None:
+        request_encoding = yaml_data.get("x-request-encoding")
+
+    formatter = Formatter(
+        folder_path, cache_dir=cache_dir, enabled=not no_format, verify=verify_format
+    )
+
+    manifest = Manifest(
+        folder_path,
+        options={
+            "base_url": base_url,
+            "client_kind": client_kind,
+            "format": not no_format,
+            "streaming": streaming,
+            "sync_concurrency": sync_concurrency,
+            "response_cache": response_cache,
+            "single_flight": single_flight,
+            "accept_encoding": accept_encoding,
+            "request_encoding": request_encoding,
+            "compress_threshold": compress_threshold,
+            "max_retries": max_retries,
+            "schema_layout": schema_layout,
+            "model_backend": model_backend,
+            "defer_build": defer_build,
+        },
+    )
+    if force:
+        manifest.previous = {}
+
+    tags = operation_index.tags
+    tag_digests = {tag: hash_data(operation_index.get_raw_operations(tag)) for tag in tags}
+    outdated_tags = [
+        tag for tag in tags if manifest.is_outdated(get_module_name(tag), tag_digests[tag])
+    ]
+    worker_state = (
+        yaml_data["paths"],
+        base_url,
+        operation_index,
+        client_kind,
+        folder_path,
+        formatter,
+        streaming,
+        sync_concurrency,
+        response_cache,
+        single_flight,
+        model_backend,
+        defer_build,
+    )
+
+    if jobs > 1 and len(outdated_tags) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(outdated_tags)),
+            initializer=init_worker,
+            initargs=(*worker_state, get_profiler().enabled, get_profiler().trace_memory),
+        ) as executor:
+            # map keeps the order of the tags, so the merged schemas are deterministic
+            tag_results = list(executor.map(write_tag_module, outdated_tags))
+    else:
+        # phases are recorded directly by the profiler of this process
+        init_worker(*worker_state)
+        tag_results = [write_tag_module(tag) for tag in outdated_tags]
+
+    rendered_tags = {}
+    for tag, (params, records) in zip(outdated_tags, tag_results):
+        rendered_tags[tag] = params
+        get_profiler().add_records(records)
 
     query_schema_params = []
-    for tag in get_all_tags(yaml_data["paths"]):
-        api = Api(
-            yaml_data["paths"],
-            base_url=yaml_data.get("servers", [{"url": "http://localhost:8080"}])[0]["url"],
-            only_tag=tag,
+    # the schemas used by every tag, to group them with the tag layout
+    tag_schemas = {}
+    for tag in tags:
+        module_name = get_module_name(tag)
+        if tag in rendered_tags:
+            params = rendered_tags[tag]
+        else:
+            params = manifest.get_previous_module(module_name)["query_param_schemas"]
+        manifest.add_module(module_name, tag_digests[tag], params)
+        query_schema_params.extend(params)
+        tag_schemas[tag] = sorted(
+            {*operation_index.get_schema_imports(tag), *map(get_class_name, params)}
         )
 
-        client_kind = "sync" if sync_req and not async_req else "async"
-        api.generate_apis(schema_path="schema", client_kind=client_kind)  # type: ignore
-        query_schema_params.extend(api.query_param_schemas)
+    runtime = Runtime(
+        client_kind,
+        streaming=streaming,
+        sync_concurrency=sync_concurrency,
+        response_cache=response_cache,
+        single_flight=single_flight,
+        accept_encoding=accept_encoding,
+        request_encoding=request_encoding,
+        compress_threshold=compress_threshold,
+        max_retries=max_retries,
+        model_backend=model_backend,
+    )
+    runtime.generate_runtime()
+    runtime_digest = hash_data(runtime.render())
+    if manifest.is_outdated("runtime.py", runtime_digest):
+        runtime.write_runtime(folder_path, formatter)
+    manifest.add_module("runtime.py", runtime_digest)
+
+    # schemas of other files are generated together with the ones of the document
+    components = resolver.merge_schemas(yaml_data["components"]["schemas"])
+    schema_digest = hash_data(
+        {
+            "components": manifest.add_components(components),
+            "query_param_schemas": query_schema_params,
+            "tag_schemas": tag_schemas if schema_layout == "tag" else {},
+        }
+    )
+    if manifest.is_outdated("schema.py", schema_digest):
+        schema = Schema(components, resolver, model_backend, defer_build)
+        with phase("schema_build"):
+            schema.generate_schemas()
+        modules = schema.render_modules(query_schema_params, schema_layout, tag_schemas)
+        formatter.write(
+            folder_path / Path("schema.py"), modules.pop("schema.py"), preformatted=True
+        )
+        # only the modules whose classes changed are formatted and written again
+        schema_modules = {key: hash_data(val) for key, val in modules.items()}
+        for module_name, text in modules.items():
+            if manifest.is_outdated(module_name, schema_modules[module_name]):
+                formatter.write(folder_path / Path(module_name), text, preformatted=True)
+    else:
+        schema_modules = {
+            module_name: manifest.get_previous_module(module_name)["hash"]
+            for module_name in manifest.get_previous_module("schema.py")["modules"]
+        }
+    manifest.add_module("schema.py", schema_digest, modules=sorted(schema_modules))
+    for module_name, digest in schema_modules.items():
+        manifest.add_module(module_name, digest)
+
+    package_init = PackageInit([*map(get_module_name, tags), "runtime.py", "schema.py"])
+    init_digest = hash_data(package_init.render())
+    if is_generated_init(folder_path / Path("__init__.py")) and manifest.is_outdated(
+        "__init__.py", init_digest
+    ):
+        package_init.write_init(folder_path, formatter)
+    manifest.add_module("__init__.py", init_digest)
+
+    for module_name in manifest.stale_modules():
+        (folder_path / Path(module_name)).unlink(missing_ok=True)
+    manifest.write()
 
-        api.write_api(folder_path)
 
-    schema.write_to_file(folder_path, query_schema_params)
+@app.command()
+def main(
+    openapi_files: list[Path] = typer.Argument(
+        ..., help="Openapi files in yaml or json, several are generated side by side."
+    ),
+    output_path: Path = typer.Argument(
+        ..., help="Folder of the client, of one sub folder per openapi file with several."
+    ),
+    sync_req: Optional[bool] = typer.Option(
+        True, "--sync", help="All requests to the client are synchronous."
+    ),
+    async_req: Optional[bool] = typer.Option(
+        False, "--async", help="All requests to the client are asynchronous with aiohttp."
+    ),
+    jobs: int = typer.Option(
+        1, "--jobs", "-j", min=1, help="Number of processes used to generate the api modules."
+    ),
+    force: Optional[bool] = typer.Option(
+        False, "--force", help="Regenerate all modules, even if their spec did not change."
+    ),
+    no_format: Optional[bool] = typer.Option(
+        False, "--no-format", help="Write the generated code without black and isort."
+    ),
+    verify_format: Optional[bool] = typer.Option(
+        False,
+        "--verify-format",
+        help="Check with black that the generated modules are formatted like black would.",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache-dir",
+        help="Folder to cache formatted code in. [default: ~/.cache/openapi-fastapi-client]",
+    ),
+    streaming: Optional[bool] = typer.Option(
+        False,
+        "--streaming",
+        help="Also generate functions streaming list responses item by item, and paginating "
+        "ones for offset or page query params.",
+    ),
+    sync_concurrency: Optional[bool] = typer.Option(
+        False,
+        "--sync-concurrency",
+        help="Also generate synchronous *_many functions running calls in a thread pool.",
+    ),
+    response_cache: Optional[bool] = typer.Option(
+        False,
+        "--response-cache",
+        help="Cache the responses of GET functions, revalidated with ETag/Last-Modified.",
+    ),
+    single_flight: Optional[bool] = typer.Option(
+        False,
+        "--single-flight",
+        help="Concurrent identical GET calls of the async client share one request.",
+    ),
+    accept_encoding: Optional[str] = typer.Option(
+        None,
+        "--accept-encoding",
+        help="Accept-Encoding sent with every request, e.g. 'zstd, br, gzip'.",
+    ),
+    request_encoding: Optional[str] = typer.Option(
+        None,
+        "--request-encoding",
+        help="Compress request bodies with gzip, deflate, br or zstd.",
+    ),
+    compress_threshold: int = typer.Option(
+        1024, "--compress-threshold", min=0, help="Minimum body size in bytes to compress."
+    ),
+    max_retries: int = typer.Option(
+        0,
+        "--max-retries",
+        min=0,
+        help="Retry throttled requests and idempotent ones answered with 502, 503 or 504 "
+        "up to N times.",
+    ),
+    schema_layout: str = typer.Option(
+        "single",
+        "--schema-layout",
+        click_type=click.Choice(SCHEMA_LAYOUTS),
+        help="Write the models into a single schema.py, into a module per model (cycles "
+        "share one) or into a module per tag, imported on first use through the schema.py.",
+    ),
+    model_backend: str = typer.Option(
+        "pydantic",
+        "--model-backend",
+        click_type=click.Choice(MODEL_BACKENDS),
+        help="Generate pydantic models or msgspec structs, which decode faster but need "
+        "msgspec installed for the client.",
+    ),
+    defer_build: Optional[bool] = typer.Option(
+        False,
+        "--defer-build",
+        help="Build the validators of the pydantic models on first use instead of on import, "
+        "schema.warmup() builds them in a background thread.",
+    ),
+    profile: Optional[bool] = typer.Option(
+        False, "--profile", help="Print the time and allocations of every generation phase."
+    ),
+    profile_output: Optional[Path] = typer.Option(
+        None,
+        "--profile-output",
+        help="Write a Chrome trace (*.json) or a cProfile dump (any other suffix) of the run.",
+    ),
+):
+    client_kind = "sync" if sync_req and not async_req else "async"
+    if len({obj.stem for obj in openapi_files}) != len(openapi_files):
+        raise typer.BadParameter("The names of the openapi files must differ.")
+    profile = profile or profile_output is not None
+    profiler = Profiler(
+        enabled=profile,
+        cprofile=profile_output is not None and profile_output.suffix != ".json",
+    )
+    with profiler:
+        for openapi_file in openapi_files:
+            generate(
+                openapi_file,
+                output_path / Path(openapi_file.stem) if len(openapi_files) > 1 else output_path,
+                client_kind=client_kind,
+                jobs=jobs,
+                force=force,
+                no_format=no_format,
+                cache_dir=cache_dir,
+                streaming=streaming,
+                sync_concurrency=sync_concurrency,
+                response_cache=response_cache,
+                single_flight=single_flight,
+                accept_encoding=accept_encoding,
+                request_encoding=request_encoding,
+                compress_threshold=compress_threshold,
+                max_retries=max_retries,
+                schema_layout=schema_layout,
+                verify_format=verify_format,
+                model_backend=model_backend,
+                defer_build=defer_build,
+            )
+
+    if profile:
+        typer.echo(profiler.summary())
+    if profile_output is not None:
+        if profile_output.suffix == ".json":
+            profiler.write_chrome_trace(profile_output)
+        else:
+            profiler.dump_stats(profile_output)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from openapi_fastapi_client import __version__
+
+MANIFEST_FILE = ".openapi-fastapi-client.json"
+
+
+def hash_data(data) -> str:
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def get_generator_version() -> str:
+    """
+    The package version and a hash of the generator sources, so that the output of a
+    changed generator is not taken for up to date, even without a new release.
+    """
+    hasher = hashlib.sha256()
+    for file in sorted(Path(__file__).parent.glob("*.py")):
+        hasher.update(file.name.encode("utf-8"))
+        hasher.update(file.read_bytes())
+    return f"{__version__}+{hasher.hexdigest()[:16]}"
+
+
+def get_files(modules: dict) -> set[str]:
+    files = set(modules)
+    for val in modules.values():
+        files.update(val.get("modules", []))
+    return files
+
+
+class Manifest:
+    """
+    Keeps track of the content hashes of every generated module in the output folder.
+
+    A module only needs to be generated again when the hash of the spec parts it was
+    generated from changed, when the file is missing, or when the generator version or
+    the generation options are different from the previous run.
+    """
+
+    __slots__ = ("folder_path", "options", "previous", "previous_files", "modules", "components")
+
+    def __init__(self, folder_path: Path, options: dict):
+        self.folder_path = folder_path
+        self.options = options
+        self.modules = {}
+        self.components = {}
+        self.previous_files = set()
+        self.previous = self.load()
+
+    @property
+    def file(self) -> Path:
+        return self.folder_path / Path(MANIFEST_FILE)
+
+    def load(self) -> dict:
+        try:
+            data = json.loads(self.file.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # files of a previous run are cleaned up even if the options changed
+        self.previous_files = get_files(data.get("modules", {}))
+        if data.get("version") != get_generator_version() or data.get("options") != self.options:
+            return {}
+        return data
+
+    def get_previous_module(self, module_name: str) -> dict:
+        return self.previous.get("modules", {}).get(module_name, {})
+
+    def is_outdated(self, module_name: str, digest: str) -> bool:
+        previous_module = self.get_previous_module(module_name)
+        for file in (module_name, *previous_module.get("modules", [])):
+            if not (self.folder_path / Path(file)).exists():
+                return True
+        return previous_module.get("hash") != digest
+
+    def add_module(
+        self,
+        module_name: str,
+        digest: str,
+        query_param_schemas: list[str] = None,
+        modules: list[str] = None,
+    ):
+        """
+        ``modules`` are further files generated together with ``module_name``.
+        """
+        self.modules[module_name] = {
+            "hash": digest,
+            "query_param_schemas": query_param_schemas or [],
+            "modules": modules or [],
+        }
+
+    def add_components(self, components: dict) -> dict:
+        self.components = {key: hash_data(val) for key, val in components.items()}
+        return self.components
+
+    def stale_modules(self) -> list[str]:
+        return sorted(self.previous_files - get_files(self.modules))
+
+    def write(self):
+        data = {
+            "version": get_generator_version(),
+            "options": self.options,
+            "modules": self.modules,
+            "components": self.components,
+        }
+        self.file.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
@@ -0,0 +1,234 @@
+from pathlib import Path
+
+from openapi_fastapi_client.helpers import TYPE_CONVERTION, operation_id_to_function_name
+from openapi_fastapi_client.refs import RefResolver
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+def get_function_info_dict():
+    return {
+        "url": "",
+        "method": "",
+        "function_name": "",
+        "path_parameters": [],
+        "query_parameters": "",
+        "query_params": [],
+        "request_obj": "",
+        "request_is_model": False,
+        "application_type": "application/json",
+        "response_obj": "",
+        "is_list": False,
+        "response_is_model": False,
+        "pagination": None,
+        "request_encoding": None,
+        "accept_encoding": None,
+        "docstring": "",
+    }
+
+
+def get_component_obj_name(data: dict) -> str | None:
+    if json_body := data["content"].get("application/json"):
+        if "items" in json_body["schema"]:
+            return json_body["schema"]["items"].get("$ref")
+        elif "$ref" in json_body["schema"]:
+            return json_body["schema"]["$ref"]
+    return None
+
+
+class OperationIndex:
+    """
+    Groups all operations of an openapi ``paths`` object by their first tag.
+
+    The index is built in a single pass over the paths, resolving the schema imports
+    and parameters of every operation once, so that each ``Api`` only has to look up
+    the operations of its own tag. References to parameters, request bodies and
+    responses are resolved with the ``resolver`` of the whole document, the schema
+    references inside them relative to the file they were found in.
+    """
+
+    __slots__ = ("paths", "resolver", "operations", "schema_imports", "raw_operations", "files")
+
+    def __init__(self, paths: dict, resolver: RefResolver | None = None):
+        self.paths = paths
+        if resolver is None:
+            resolver = RefResolver({"paths": paths})
+        self.resolver = resolver
+        self.operations = {}
+        self.schema_imports = {}
+        self.raw_operations = {}
+        # the files of the resolved request bodies and responses by their id
+        self.files = {}
+        self.build()
+
+    @property
+    def tags(self) -> list[str]:
+        return sorted(self.operations)
+
+    def get_operations(self, tag: str) -> list[dict]:
+        return self.operations.get(tag, [])
+
+    def get_schema_imports(self, tag: str) -> set:
+        return self.schema_imports.get(tag, set())
+
+    def get_raw_operations(self, tag: str) -> list[dict]:
+        return self.raw_operations.get(tag, [])
+
+    def get_file(self, obj: dict) -> Path:
+        return self.files.get(id(obj), self.resolver.base_file)
+
+    def deref(self, obj: dict, base_file: Path) -> dict:
+        file, obj = self.resolver.deref_file(obj, base_file)
+        self.files[id(obj)] = file
+        return obj
+
+    def is_model(self, ref: str, base_file: Path) -> bool:
+        """
+        Whether ``ref`` points to an object schema, which is generated as a model. Enums,
+        other components and references that cannot be resolved here are decoded with a
+        ``TypeAdapter``, which handles models as well.
+        """
+        try:
+            _, schema = self.resolver.resolve(ref, base_file)
+        except ValueError:
+            return False
+        return isinstance(schema, dict) and "properties" in schema
+
+    def resolve_operation(self, path_item: dict, val_obj: dict, base_file: Path) -> dict:
+        """
+        Copy of the operation with all referenced parameters, bodies and responses.
+
+        The parameters of the path item apply to all of its operations, unless an
+        operation overrides them by name and location.
+        """
+        parameters = {}
+        for obj in (*path_item.get("parameters", []), *val_obj.get("parameters", [])):
+            obj = self.resolver.deref(obj, base_file)
+            parameters[(obj["name"], obj["in"])] = obj
+        operation = {**val_obj, "parameters": list(parameters.values())}
+        if request_body := val_obj.get("requestBody"):
+            operation["requestBody"] = self.deref(request_body, base_file)
+        if responses := val_obj.get("responses"):
+            operation["responses"] = {
+                key: self.deref(val, base_file) for key, val in responses.items()
+            }
+        return operation
+
+    def build(self) -> None:
+        for url, path_item in self.paths.items():
+            path_file, path_item = self.resolver.deref_file(path_item)
+            for method in HTTP_METHODS:
+                if (val_obj := path_item.get(method)) is None:
+                    continue
+                val_obj = self.resolve_operation(path_item, val_obj, path_file)
+                tag_name = val_obj["tags"][0].replace(" ", "")
+                schema_imports = self.schema_imports.setdefault(tag_name, set())
+                schema_imports.update(self.collect_obj_imports(val_obj))
+                self.raw_operations.setdefault(tag_name, []).append(
+                    {"url": url, "method": method, "operation": val_obj}
+                )
+                self.operations.setdefault(tag_name, []).append(
+                    self.create_function_info(url, method, tag_name, val_obj)
+                )
+
+    def collect_obj_imports(self, val_obj: dict) -> set:
+        obj_imports = set()
+        if response := val_obj.get("responses"):
+            for resp_val in response.values():
+                if "content" in resp_val:
+                    component_ref = get_component_obj_name(resp_val)
+                    if component_ref:
+                        obj_imports.add(
+                            self.resolver.get_schema_name(component_ref, self.get_file(resp_val))
+                        )
+
+        if request_body := val_obj.get("requestBody"):
+            component_ref = get_component_obj_name(request_body)
+            if component_ref:
+                obj_imports.add(
+                    self.resolver.get_schema_name(component_ref, self.get_file(request_body))
+                )
+        return obj_imports
+
+    def create_function_info(self, url: str, method: str, tag_name: str, val_obj: dict) -> dict:
+        function_info = get_function_info_dict()
+        function_info["url"] = url
+        function_info["method"] = method
+        function_name = operation_id_to_function_name(val_obj["operationId"])
+        function_info["function_name"] = f"{tag_name}_{method}_{function_name}".lower()
+        function_info["request_encoding"] = val_obj.get("x-request-encoding")
+        function_info["accept_encoding"] = val_obj.get("x-accept-encoding")
+
+        if req_body := val_obj.get("requestBody"):
+            base_file = self.get_file(req_body)
+            if json_data := req_body["content"].get("application/json"):
+                if "items" in json_data["schema"]:
+                    obj_name = self.resolver.get_schema_name(
+                        json_data["schema"]["items"]["$ref"], base_file
+                    )
+                    function_info["request_obj"] = f"list[{obj_name}]"
+                elif req_ref := json_data["schema"].get("$ref"):
+                    function_info["request_obj"] = self.resolver.get_schema_name(req_ref, base_file)
+                    function_info["request_is_model"] = True
+                else:
+                    function_info["request_obj"] = "Any"
+
+        for obj in val_obj.get("parameters", []):
+            if obj["in"] == "path":
+                param_name = operation_id_to_function_name(obj["name"])
+                param_type = obj["schema"]["type"]
+                function_info["url"] = function_info["url"].replace(obj["name"], param_name)
+                path_param = f"{param_name}: {TYPE_CONVERTION[param_type]}"
+                if path_param not in function_info["path_parameters"]:
+                    function_info["path_parameters"].append(path_param)
+            elif obj["in"] == "query":
+                if obj.get("required"):
+                    type_info = TYPE_CONVERTION[obj["schema"]["type"]]
+                else:
+                    type_info = f"Optional[{TYPE_CONVERTION[obj['schema']['type']]}] = None"
+                if obj["name"] in ("offset", "page"):
+                    function_info["pagination"] = obj["name"]
+                query_param = f"{obj['name']}: {type_info}"
+                if query_param not in function_info["query_params"]:
+                    function_info["query_params"].append(query_param)
+            elif obj["in"] == "header":
+                optional_ = "" if obj["required"] else ", optional"
+                header_info = f"{obj['name']} : {TYPE_CONVERTION[obj['schema']['type']]}{optional_}"
+                function_info["docstring"] += f"\n{header_info}"
+
+        if responses := val_obj.get("responses"):
+            for key, content in responses.items():
+                # unquoted status codes are parsed as int
+                if str(key) != "200":
+                    continue
+                if json_content := content.get("content", {}).get("application/json"):
+                    base_file = self.get_file(content)
+                    json_schema = json_content["schema"]
+                    is_model = False
+                    if "items" in json_schema:
+                        resp_ref = "Any"
+                        if item_ref := json_schema["items"].get("$ref"):
+                            resp_ref = self.resolver.get_schema_name(item_ref, base_file)
+                            is_model = self.is_model(item_ref, base_file)
+                        function_info["is_list"] = True
+                    elif "$ref" in json_schema:
+                        resp_ref = self.resolver.get_schema_name(json_schema["$ref"], base_file)
+                        is_model = self.is_model(json_schema["$ref"], base_file)
+                    elif "additionalProperties" in json_schema:
+                        additional = json_schema["additionalProperties"]
+                        value_type = "Any"
+                        if isinstance(additional, dict):
+                            value_type = TYPE_CONVERTION.get(additional.get("type"), "Any")
+                        resp_ref = f"dict[str, {value_type}]"
+                    else:
+                        try:
+                            resp_ref = TYPE_CONVERTION[json_schema["type"]]
+                        except KeyError:
+                            continue
+
+                    if resp_ref in ("NoneType", "Metaclass"):
+                        function_info["response_obj"] = None
+                    else:
+                        function_info["response_obj"] = resp_ref
+                        function_info["response_is_model"] = is_model
+        return function_info
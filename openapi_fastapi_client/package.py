@@ -0,0 +1,69 @@
+from pathlib import Path
+from string import Template
+
+from openapi_fastapi_client.codegen import Bracket, string_literal
+from openapi_fastapi_client.formatting import Formatter
+
+PACKAGE_MARKER = "Generated by openapi-fastapi-client."
+
+PACKAGE_INIT = Template(
+    '''"""
+$marker
+
+The modules of the client are imported on first access, importing the package alone
+does not import requests, aiohttp or pydantic.
+"""
+
+import importlib
+
+$modules
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f".{name}", __name__)
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_MODULES})
+'''
+)
+
+
+def is_generated_init(file: Path) -> bool:
+    """
+    The ``__init__.py`` is only (re)written if it is missing, empty or was generated.
+    """
+    try:
+        text = file.read_text()
+    except FileNotFoundError:
+        return True
+    return not text.strip() or PACKAGE_MARKER in text
+
+
+class PackageInit:
+    """
+    Renders the ``__init__.py`` of the client, which imports its modules lazily (PEP 562).
+    """
+
+    __slots__ = ("modules",)
+
+    def __init__(self, modules: list[str]):
+        self.modules = sorted(obj.removesuffix(".py") for obj in modules)
+
+    def render(self) -> str:
+        modules = [string_literal(obj) for obj in self.modules]
+        if len(modules) == 1:
+            # a tuple of a single module keeps its comma
+            modules = f"_MODULES = ({modules[0]},)"
+        else:
+            modules = "\n".join(Bracket("_MODULES = ", modules).render())
+        return PACKAGE_INIT.substitute(marker=PACKAGE_MARKER, modules=modules)
+
+    def write_init(self, folder_path: Path, formatter: Formatter | None = None):
+        if formatter is None:
+            formatter = Formatter(folder_path)
+        formatter.write(folder_path / Path("__init__.py"), self.render(), preformatted=True)
@@ -0,0 +1,156 @@
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from operator import itemgetter
+from pathlib import Path
+
+_PROFILERS = []
+
+
+class Profiler:
+    """
+    Records the wall time and memory allocations of the generation phases.
+
+    Use it as a context manager, every ``phase`` entered while it is active is recorded::
+
+        with Profiler() as profiler:
+            main(...)
+        print(profiler.summary())
+
+    With ``trace_memory`` the net allocations and the allocation peak of every phase are
+    traced with tracemalloc, with ``cprofile`` a cProfile of the whole run is collected.
+    """
+
+    __slots__ = ("enabled", "trace_memory", "records", "cprofile", "peak_stack", "owns_tracemalloc")
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True, cprofile: bool = False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.peak_stack = []
+        self.owns_tracemalloc = False
+
+    def __enter__(self):
+        if self.enabled:
+            _PROFILERS.append(self)
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.owns_tracemalloc = True
+            if self.cprofile is not None:
+                self.cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.enabled:
+            if self.cprofile is not None:
+                self.cprofile.disable()
+            if self.owns_tracemalloc:
+                tracemalloc.stop()
+                self.owns_tracemalloc = False
+            _PROFILERS.remove(self)
+
+    @contextmanager
+    def phase(self, name: str, **args):
+        if not self.enabled:
+            yield
+            return
+
+        trace_memory = self.trace_memory and tracemalloc.is_tracing()
+        if trace_memory:
+            if self.peak_stack:
+                self.peak_stack[-1] = max(self.peak_stack[-1], tracemalloc.get_traced_memory()[1])
+            self.peak_stack.append(0)
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                "name": name,
+                "start": start,
+                "seconds": time.perf_counter() - start,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+            if trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(self.peak_stack.pop(), peak) - memory_before
+                if self.peak_stack:
+                    self.peak_stack[-1] = max(self.peak_stack[-1], peak + memory_before)
+                tracemalloc.reset_peak()
+                record["allocated"] = current - memory_before
+                record["peak"] = peak
+            self.records.append(record)
+
+    def add_records(self, records: list[dict]):
+        self.records.extend(records)
+
+    def summary(self) -> str:
+        phases = {}
+        for record in self.records:
+            phase = phases.setdefault(
+                record["name"], {"calls": 0, "seconds": 0.0, "allocated": 0, "peak": 0}
+            )
+            phase["calls"] += 1
+            phase["seconds"] += record["seconds"]
+            phase["allocated"] += record.get("allocated", 0)
+            phase["peak"] = max(phase["peak"], record.get("peak", 0))
+
+        lines = [f"{'phase':<20} {'calls':>6} {'seconds':>10} {'allocated':>12} {'peak':>12}"]
+        for name, phase in sorted(phases.items(), key=lambda obj: -obj[1]["seconds"]):
+            lines.append(
+                f"{name:<20} {phase['calls']:>6} {phase['seconds']:>10.3f} "
+                f"{phase['allocated'] / 1024 ** 2:>9.2f} MB {phase['peak'] / 1024 ** 2:>9.2f} MB"
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        events = []
+        # perf_counter is system wide, so records of worker processes share the same clock
+        started_at = min((record["start"] for record in self.records), default=0)
+        for record in sorted(self.records, key=itemgetter("start")):
+            args = dict(record["args"])
+            for key in ("allocated", "peak"):
+                if key in record:
+                    args[key] = record[key]
+            events.append(
+                {
+                    "name": record["name"],
+                    "ph": "X",
+                    "ts": (record["start"] - started_at) * 1_000_000,
+                    "dur": record["seconds"] * 1_000_000,
+                    "pid": record["pid"],
+                    "tid": record["tid"],
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, file: Path):
+        file.write_text(json.dumps(self.chrome_trace()))
+
+    def dump_stats(self, file: Path):
+        if self.cprofile is None:
+            raise ValueError("The profiler was created without cprofile.")
+        self.cprofile.dump_stats(file)
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    return _PROFILERS[-1] if _PROFILERS else NULL_PROFILER
+
+
+@contextmanager
+def phase(name: str, **args):
+    with get_profiler().phase(name, **args):
+        yield
@@ -0,0 +1,183 @@
+from pathlib import Path
+from typing import Any
+
+from openapi_fastapi_client.loader import SpecLoader
+
+
+class RefCycleError(ValueError):
+    pass
+
+
+def unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+class RefResolver:
+    """
+    Resolves the ``$ref`` of an openapi document and of the files it references.
+
+    A reference is a file path relative to the referencing document and a JSON pointer,
+    both optional: ``#/components/parameters/limit``, ``models.yaml#/Pet`` or
+    ``common.yaml``. Every referenced file is loaded once and every reference is resolved
+    once, following chains of references to their final target::
+
+        resolver = RefResolver(yaml_data, Path("openapi.yaml"))
+        parameter = resolver.deref({"$ref": "#/components/parameters/limit"})
+
+    References inside a resolved object are relative to the file it was found in, which
+    ``deref_file`` returns together with the object.
+
+    Schemas of other files are collected in ``external_schemas`` and their files in
+    ``schema_files``, so they can be generated together with the ``components`` of the
+    document.
+    """
+
+    __slots__ = (
+        "base_file",
+        "loader",
+        "documents",
+        "resolved",
+        "external_schemas",
+        "schema_files",
+    )
+
+    def __init__(
+        self, document: dict, base_file: Path | None = None, loader: SpecLoader | None = None
+    ):
+        if base_file is None:
+            base_file = Path("openapi.yaml")
+        self.base_file = base_file.resolve()
+        self.loader = SpecLoader() if loader is None else loader
+        self.documents = {self.base_file: document}
+        self.resolved = {}
+        self.external_schemas = {}
+        self.schema_files = {}
+
+    def split_ref(self, ref: str, base_file: Path | None = None) -> tuple[Path, str]:
+        base_file = self.base_file if base_file is None else base_file
+        file, _, pointer = ref.partition("#")
+        if not file:
+            return base_file, pointer
+        return (base_file.parent / Path(file)).resolve(), pointer
+
+    def load(self, file: Path) -> Any:
+        try:
+            return self.documents[file]
+        except KeyError:
+            pass
+        if not file.exists():
+            raise FileNotFoundError(f"{file} referenced by the openapi file does not exists.")
+        document = self.documents[file] = self.loader.load(file)
+        return document
+
+    def lookup(self, file: Path, pointer: str) -> Any:
+        obj = self.load(file)
+        for token in filter(None, pointer.split("/")):
+            token = unescape(token)
+            try:
+                obj = obj[int(token)] if isinstance(obj, list) else obj[token]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise ValueError(f"Unresolvable reference {file.name}#{pointer}") from None
+        return obj
+
+    def resolve(self, ref: str, base_file: Path | None = None) -> tuple[Path, Any]:
+        """
+        Return the file and the target of ``ref``, following chained references.
+        """
+        key = self.split_ref(ref, base_file)
+        chain = [key]
+        while (target := self.resolved.get(key)) is None:
+            obj = self.lookup(*key)
+            if not (isinstance(obj, dict) and "$ref" in obj):
+                target = (key[0], obj)
+                break
+            key = self.split_ref(obj["$ref"], key[0])
+            if key in chain:
+                cycle = " -> ".join(f"{file.name}#{pointer}" for file, pointer in (*chain, key))
+                raise RefCycleError(f"Cyclic reference {cycle}")
+            chain.append(key)
+
+        for obj in chain:
+            self.resolved[obj] = target
+        return target
+
+    def deref_file(self, obj: Any, base_file: Path | None = None) -> tuple[Path, Any]:
+        """
+        Return the file the references inside the resolved ``obj`` are relative to and
+        the resolved object.
+        """
+        if isinstance(obj, dict) and "$ref" in obj:
+            return self.resolve(obj["$ref"], base_file)
+        return self.base_file if base_file is None else base_file, obj
+
+    def deref(self, obj: Any, base_file: Path | None = None) -> Any:
+        return self.deref_file(obj, base_file)[1]
+
+    def get_schema_file(self, name: str) -> Path:
+        """
+        The file of the schema ``name``, schemas of other files are relative to their file.
+        """
+        return self.schema_files.get(name, self.base_file)
+
+    def get_display_name(self, file: Path) -> str:
+        try:
+            return file.relative_to(self.base_file.parent).as_posix()
+        except ValueError:
+            return str(file)
+
+    def get_schema_name(self, ref: str, base_file: Path | None = None) -> str:
+        """
+        The class name of a schema reference, schemas of other files are collected.
+
+        Two different schemas of the same name in other files would become one class, such
+        a clash is an error.
+        """
+        file, pointer = self.split_ref(ref, base_file)
+        name = unescape(pointer.rsplit("/", 1)[-1]) or file.stem
+        if file == self.base_file:
+            return name
+
+        schema_file, schema = self.resolve(ref, base_file)
+        if (known := self.external_schemas.get(name)) is None:
+            self.external_schemas[name] = schema
+            self.schema_files[name] = schema_file
+            self.collect_schemas(schema, schema_file)
+        elif known is not schema:
+            raise ValueError(
+                f"The schema {name} of {self.get_display_name(schema_file)} clashes with the "
+                f"schema {name} of {self.get_display_name(self.schema_files[name])}"
+            )
+        return name
+
+    def collect_schemas(self, obj: Any, base_file: Path | None = None):
+        """
+        Collect the schemas of other files referenced anywhere inside ``obj``.
+        """
+        if isinstance(obj, dict):
+            for key, val in obj.items():
+                if key == "$ref" and isinstance(val, str):
+                    self.get_schema_name(val, base_file)
+                else:
+                    self.collect_schemas(val, base_file)
+        elif isinstance(obj, list):
+            for val in obj:
+                self.collect_schemas(val, base_file)
+
+    def merge_schemas(self, components: dict) -> dict:
+        """
+        The ``components`` of the document together with the schemas of other files.
+
+        A component which is a reference to the schema of another file is replaced by the
+        schema, any other component of the same name as such a schema is a clash.
+        """
+        self.collect_schemas(components)
+        schemas = dict(self.external_schemas)
+        for name, component in components.items():
+            if (schema := schemas.get(name)) is None:
+                schemas[name] = component
+            elif self.deref(component) is not schema:
+                raise ValueError(
+                    f"The schema {name} of {self.get_display_name(self.schema_files[name])} "
+                    f"clashes with the component {name} of {self.base_file.name}"
+                )
+        return schemas
@@ -0,0 +1,1490 @@
+from pathlib import Path
+from string import Template
+from typing import Literal
+
+from openapi_fastapi_client.formatting import Formatter
+
+SYNC_SESSION = Template(
+    '''
+DEFAULT_POOL_CONNECTIONS = $pool_connections
+DEFAULT_POOL_MAXSIZE = $pool_maxsize
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def create_session(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    max_retries: int = 0,
+    pool_block: bool = False,
+) -> requests.Session:
+    """
+    Create a session whose connection pools keep the connections alive between calls.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=max_retries,
+        pool_block=pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def configure_session(
+    session: Optional[requests.Session] = None, **adapter_options: Any
+) -> requests.Session:
+    """
+    Replace the session shared by all api functions.
+
+    Either with the given ``session`` or with a new one created from ``adapter_options``
+    (see ``create_session``). The previous shared session is closed.
+    """
+    global _session
+    with _session_lock:
+        previous, _session = _session, session or create_session(**adapter_options)
+    if previous is not None and previous is not _session:
+        previous.close()
+    return _session
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def close_session() -> None:
+    global _session
+    with _session_lock:
+        previous, _session = _session, None
+    if previous is not None:
+        previous.close()
+
+
+def send_request(
+    method: str,
+    url: str,
+    *,
+    session: Optional[requests.Session] = None,
+    tag: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Send the request within the rate limits of its host and ``tag`` and retry it with
+    backoff while the retry policy allows it.
+
+    ``content_encoding`` and ``accept_encoding`` override the compression defaults.
+    """
+    kwargs = prepare_encoding(kwargs, content_encoding, accept_encoding)
+    session_ = session if session is not None else get_session()
+    buckets = get_buckets(url, tag)
+    attempt = 0
+    while True:
+        if delay := reserve_tokens(buckets):
+            time.sleep(delay)
+        response = session_.request(method, url, **kwargs)
+        if (delay := get_retry_delay(method, response.status_code, response.headers, attempt)) is None:
+            return response
+        penalize_buckets(buckets, delay)
+        response.close()
+        time.sleep(delay)
+        attempt += 1
+'''
+)
+
+ASYNC_SESSION = Template(
+    '''
+DEFAULT_LIMIT = $limit
+DEFAULT_LIMIT_PER_HOST = $limit_per_host
+DEFAULT_TTL_DNS_CACHE = $ttl_dns_cache
+
+
+async def close_with_loop(session: aiohttp.ClientSession) -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        await session.close()
+
+
+class AsyncClient:
+    """
+    Owns the ``aiohttp.ClientSession`` shared by all api functions.
+
+    The session and its ``TCPConnector`` are created on first use inside the running
+    event loop, so connections and dns lookups are reused between calls. Close the client
+    with ``await client.close()`` or use it as an async context manager.
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        ttl_dns_cache: Optional[int] = DEFAULT_TTL_DNS_CACHE,
+        session: Optional[aiohttp.ClientSession] = None,
+        **session_options: Any,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.session_options = session_options
+        self._session = session
+        self._loop = None
+        self._closer = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop not in (None, loop):
+            self.release_session()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, **self.session_options)
+            self._loop = loop
+            # asyncio.run closes the async generators of its loop before the loop itself,
+            # which closes the session together with the loop
+            self._closer = close_with_loop(self._session)
+            asyncio.ensure_future(self._closer.__anext__())
+        return self._session
+
+    def release_session(self) -> None:
+        """
+        Let go of the session of another event loop, it cannot be closed from this one.
+        """
+        session, loop = self._session, self._loop
+        self._session = None
+        if session.closed:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif (connector := session.connector) is not None:
+            # the loop is gone without closing the session and cannot run the callbacks
+            # closing the sockets of its connections anymore, they are called here instead
+            protocols = [proto for conns in connector._conns.values() for proto, _ in conns]
+            protocols.extend(connector._acquired)
+            session.detach()
+            connector._close()
+            for proto in protocols:
+                if proto.transport is not None:
+                    proto.transport._call_connection_lost(None)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+
+_client: Optional[AsyncClient] = None
+
+
+def configure_client(client: Optional[AsyncClient] = None, **options: Any) -> AsyncClient:
+    """
+    Replace the client shared by all api functions.
+
+    Either with the given ``client`` or with a new one created from ``options`` (see
+    ``AsyncClient``). Close the previous client with ``await close_client()`` before
+    configuring a new one.
+    """
+    global _client
+    _client = client or AsyncClient(**options)
+    return _client
+
+
+def get_client() -> AsyncClient:
+    global _client
+    if _client is None:
+        _client = AsyncClient()
+    return _client
+
+
+async def close_client() -> None:
+    if _client is not None:
+        await _client.close()
+
+
+class RequestContext:
+    """
+    Async context manager sending a request within the rate limits of its host and ``tag``
+    and retrying it with backoff while the retry policy allows it.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        session: Optional[aiohttp.ClientSession],
+        tag: Optional[str],
+        kwargs: dict,
+    ):
+        self.method = method
+        self.url = url
+        self.session = session
+        self.tag = tag
+        self.kwargs = kwargs
+        self.response = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        session = self.session if self.session is not None else get_client().session
+        buckets = get_buckets(self.url, self.tag)
+        attempt = 0
+        while True:
+            if delay := reserve_tokens(buckets):
+                await asyncio.sleep(delay)
+            self.response = await session.request(self.method, self.url, **self.kwargs)
+            delay = get_retry_delay(
+                self.method, self.response.status, self.response.headers, attempt
+            )
+            if delay is None:
+                return self.response
+            penalize_buckets(buckets, delay)
+            self.response.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self.response is not None:
+            self.response.release()
+
+
+def send_request(
+    method: str,
+    url: str,
+    *,
+    session: Optional[aiohttp.ClientSession] = None,
+    tag: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    **kwargs: Any,
+) -> RequestContext:
+    """
+    Return the request context manager for ``session`` or the shared client.
+
+    ``proxies`` in the style of requests are translated to the ``proxy`` of aiohttp,
+    ``content_encoding`` and ``accept_encoding`` override the compression defaults.
+    """
+    kwargs = prepare_encoding(kwargs, content_encoding, accept_encoding)
+    if proxies := kwargs.pop("proxies", None):
+        kwargs.setdefault("proxy", proxies.get(url.split(":", 1)[0]))
+    return RequestContext(method, url, session, tag, kwargs)
+'''
+)
+
+RATE_LIMITS = Template(
+    '''
+
+class TokenBucket:
+    """
+    Allows ``rate`` requests per second on average and bursts of up to ``burst`` requests.
+
+    The bucket is thread-safe and shared by sync and async calls, ``reserve`` takes a token
+    and returns how long to wait before it may be used.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def penalize(self, delay: float):
+        """
+        Hold back all requests of the bucket for ``delay`` seconds, e.g. after a 429.
+        """
+        with self.lock:
+            self.tokens = min(self.tokens, -delay * self.rate)
+
+
+class RetryPolicy:
+    """
+    Retries requests answered with one of ``statuses`` up to ``max_retries`` times.
+
+    The delay is the ``Retry-After`` of the response or an exponential backoff with full
+    jitter, both capped at ``max_backoff`` seconds. Except for ``429 Too Many Requests``,
+    which was not processed, only idempotent ``methods`` are retried.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        statuses: Iterable[int] = (429, 502, 503, 504),
+        methods: Iterable[str] = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE"),
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(method.upper() for method in methods)
+
+    def should_retry(self, method: str, status: int, attempt: int) -> bool:
+        if attempt >= self.max_retries or status not in self.statuses:
+            return False
+        return status == 429 or method.upper() in self.methods
+
+    def get_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2**attempt))
+
+
+_rate_limits: dict = {}
+_retry_policy: Optional[RetryPolicy] = $retry_policy
+
+
+def configure_rate_limit(
+    rate: Optional[float],
+    burst: Optional[float] = None,
+    *,
+    tag: Optional[str] = None,
+    host: Optional[str] = None,
+) -> Optional[TokenBucket]:
+    """
+    Limit the requests of an operation ``tag`` or of a ``host`` (e.g. ``api.example.com``)
+    to ``rate`` per second, ``rate=None`` removes the limit.
+    """
+    if (tag is None) == (host is None):
+        raise ValueError("Either a tag or a host is required.")
+    key = ("tag", tag) if tag is not None else ("host", host)
+    if rate is None:
+        _rate_limits.pop(key, None)
+        return None
+    _rate_limits[key] = TokenBucket(rate, burst)
+    return _rate_limits[key]
+
+
+def configure_retries(policy: Optional[RetryPolicy] = None, **options: Any) -> Optional[RetryPolicy]:
+    """
+    Replace the retry policy, either with ``policy`` or a new one created from ``options``
+    (see ``RetryPolicy``). ``configure_retries(None)`` without options disables retries.
+    """
+    global _retry_policy
+    _retry_policy = policy if policy is not None or not options else RetryPolicy(**options)
+    return _retry_policy
+
+
+def get_buckets(url: str, tag: Optional[str]) -> list[TokenBucket]:
+    if not _rate_limits:
+        return []
+    keys = (("host", urlsplit(url).netloc), ("tag", tag))
+    return [bucket for key in keys if (bucket := _rate_limits.get(key)) is not None]
+
+
+def reserve_tokens(buckets: list[TokenBucket]) -> float:
+    return max((bucket.reserve() for bucket in buckets), default=0.0)
+
+
+def penalize_buckets(buckets: list[TokenBucket], delay: float):
+    for bucket in buckets:
+        bucket.penalize(delay)
+
+
+def get_retry_delay(method: str, status: int, headers: Any, attempt: int) -> Optional[float]:
+    """
+    The delay before the next attempt or None if the response is final.
+    """
+    if _retry_policy is None or not _retry_policy.should_retry(method, status, attempt):
+        return None
+    return _retry_policy.get_delay(attempt, headers.get("Retry-After"))
+'''
+)
+
+COMPRESSION = Template(
+    '''
+DEFAULT_ACCEPT_ENCODING: Optional[str] = $accept_encoding
+DEFAULT_REQUEST_ENCODING: Optional[str] = $request_encoding
+COMPRESS_THRESHOLD = $compress_threshold
+
+
+def compress_gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=6)
+
+
+def compress_deflate(data: bytes) -> bytes:
+    return zlib.compress(data)
+
+
+def get_compressors() -> dict:
+    compressors = {"gzip": compress_gzip, "deflate": compress_deflate}
+    try:
+        import brotli
+
+        compressors["br"] = brotli.compress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        compressors["zstd"] = zstandard.ZstdCompressor().compress
+    except ImportError:
+        pass
+    return compressors
+
+
+COMPRESSORS = get_compressors()
+
+
+def filter_accept_encoding(accept_encoding: str) -> str:
+    """
+    Drop the codecs the http library cannot decode from an ``Accept-Encoding`` value.
+    """
+    codecs = [obj.strip() for obj in accept_encoding.split(",")]
+    return ", ".join(
+        obj for obj in codecs if obj.split(";")[0].strip() in DECODABLE_ENCODINGS | {"identity"}
+    )
+
+
+def prepare_encoding(
+    kwargs: dict, content_encoding: Optional[str], accept_encoding: Optional[str]
+) -> dict:
+    """
+    Advertise the accepted encodings and compress a ``data`` body of at least
+    ``COMPRESS_THRESHOLD`` bytes, ``str`` bodies are encoded to utf-8 first.
+    """
+    headers = dict(kwargs.get("headers") or {})
+    header_names = {name.lower() for name in headers}
+    accept_encoding = accept_encoding or DEFAULT_ACCEPT_ENCODING
+    if accept_encoding and "accept-encoding" not in header_names:
+        if accept_encoding := filter_accept_encoding(accept_encoding):
+            headers["Accept-Encoding"] = accept_encoding
+
+    content_encoding = content_encoding or DEFAULT_REQUEST_ENCODING
+    data = kwargs.get("data")
+    if isinstance(data, str) and content_encoding in COMPRESSORS:
+        data = data.encode("utf-8")
+    if (
+        content_encoding in COMPRESSORS
+        and isinstance(data, bytes)
+        and len(data) >= COMPRESS_THRESHOLD
+        and "content-encoding" not in header_names
+    ):
+        kwargs["data"] = COMPRESSORS[content_encoding](data)
+        headers["Content-Encoding"] = content_encoding
+    kwargs["headers"] = headers
+    return kwargs
+'''
+)
+
+SYNC_DECODABLE = """
+
+DECODABLE_ENCODINGS = {obj.strip() for obj in URLLIB3_ACCEPT_ENCODING.split(",")}
+"""
+
+ASYNC_DECODABLE = """
+
+def get_decodable_encodings() -> set:
+    encodings = {"gzip", "deflate"}
+    try:
+        from aiohttp import compression_utils
+    except ImportError:
+        return encodings
+    if getattr(compression_utils, "HAS_BROTLI", False):
+        encodings.add("br")
+    if getattr(compression_utils, "HAS_ZSTD", False):
+        encodings.add("zstd")
+    return encodings
+
+
+DECODABLE_ENCODINGS = get_decodable_encodings()
+"""
+
+DECODING = '''
+
+@lru_cache(maxsize=None)
+def get_type_adapter(type_: Any) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def validate_json(type_: Any, data: Union[str, bytes]) -> Any:
+    """
+    Parse and validate json ``data`` as ``type_`` in one pass with a cached ``TypeAdapter``.
+    """
+    return get_type_adapter(type_).validate_json(data)
+
+
+def dump_json(type_: Any, obj: Any, **options: Any) -> bytes:
+    """
+    Serialize ``obj`` as ``type_`` to json bytes, e.g. a whole ``list[Model]`` in one call.
+    """
+    return get_type_adapter(type_).dump_json(obj, **options)
+
+
+def get_validator(type_: Any) -> Callable[[Union[str, bytes]], Any]:
+    return get_type_adapter(type_).validate_json
+
+
+def copy_params(params: Any, **update: Any) -> Any:
+    return params.model_copy(update=update)
+
+
+def keep(obj: Any) -> Any:
+    return obj
+
+
+def build_model(model: type[BaseModel]) -> Callable[[Any], Any]:
+    builders = None
+
+    def build(obj: Any) -> Any:
+        nonlocal builders
+        if obj is None:
+            return None
+        if builders is None:
+            # deferred models resolve their forward references on the first build
+            if not model.__pydantic_complete__:
+                model.model_rebuild()
+            builders = {}
+            for name, field in model.model_fields.items():
+                if (build_field := get_builder(field.annotation)) is not keep:
+                    builders[field.alias or name] = build_field
+        values = dict(obj)
+        for key, build_field in builders.items():
+            if key in values:
+                values[key] = build_field(values[key])
+        return model.model_construct(**values)
+
+    return build
+
+
+@lru_cache(maxsize=None)
+def get_builder(type_: Any) -> Callable[[Any], Any]:
+    """
+    Return a function building ``type_`` from decoded json without validation. Models are
+    created with ``model_construct``, enums from their value, any other value is kept as
+    decoded.
+    """
+    origin, args = get_origin(type_), get_args(type_)
+    if origin is Union:
+        types = [obj for obj in args if obj is not type(None)]
+        return get_builder(types[0]) if len(types) == 1 else keep
+    if origin is list and args:
+        if (build_item := get_builder(args[0])) is keep:
+            return keep
+        return lambda obj: None if obj is None else [build_item(item) for item in obj]
+    if origin is dict and len(args) == 2:
+        if (build_value := get_builder(args[1])) is keep:
+            return keep
+        return lambda obj: None if obj is None else {k: build_value(v) for k, v in obj.items()}
+    if isinstance(type_, type) and issubclass(type_, Enum):
+        return lambda obj: None if obj is None else type_(obj)
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return build_model(type_)
+    return keep
+
+
+@lru_cache(maxsize=None)
+def get_constructor(type_: Any) -> Callable[[Union[str, bytes]], Any]:
+    build = get_builder(type_)
+    return lambda data: build(from_json(data))
+
+
+def construct_json(type_: Any, data: Union[str, bytes]) -> Any:
+    """
+    Parse json ``data`` as ``type_`` without validating it, for payloads of trusted services.
+    """
+    return get_constructor(type_)(data)
+'''
+
+MSGSPEC_DECODING = '''
+
+JSON_ENCODER = msgspec.json.Encoder()
+
+
+@lru_cache(maxsize=None)
+def get_decoder(type_: Any) -> msgspec.json.Decoder:
+    return msgspec.json.Decoder(type_)
+
+
+def validate_json(type_: Any, data: Union[str, bytes]) -> Any:
+    """
+    Parse and validate json ``data`` as ``type_`` in one pass with a cached ``Decoder``.
+    """
+    return get_decoder(type_).decode(data)
+
+
+def dump_json(type_: Any, obj: Any, **options: Any) -> bytes:
+    """
+    Serialize ``obj`` to json bytes, struct fields left at their default are omitted.
+    """
+    return JSON_ENCODER.encode(obj)
+
+
+def dump_params(params: Any) -> dict:
+    return msgspec.to_builtins(params)
+
+
+def get_validator(type_: Any) -> Callable[[Union[str, bytes]], Any]:
+    return get_decoder(type_).decode
+
+
+def copy_params(params: Any, **update: Any) -> Any:
+    return msgspec.structs.replace(params, **update)
+'''
+
+JSON_ARRAY_PARSER = '''
+
+class JsonArrayParser:
+    """
+    Splits a json array that arrives in chunks into the raw json of its items.
+
+    Only the item that is currently received is buffered, so the memory stays flat no
+    matter how long the array is.
+    """
+
+    TOKENS = re.compile(rb'[][{}",\\\\]')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        items = []
+        pos = mark = 0
+        if self.escape and chunk:
+            self.escape = False
+            pos = 1
+        while (match := self.TOKENS.search(chunk, pos)) is not None:
+            token, pos = match.group(), match.end()
+            if self.in_string:
+                if token == b"\\\\":
+                    if pos == len(chunk):
+                        self.escape = True
+                    pos += 1
+                elif token == b'"':
+                    self.in_string = False
+            elif token == b'"':
+                self.in_string = True
+            elif token in (b"[", b"{"):
+                self.depth += 1
+                if self.depth == 1:
+                    mark = pos
+            elif token in (b"]", b"}"):
+                self.depth -= 1
+                if self.depth == 0:
+                    self.emit(chunk[mark : pos - 1], items)
+            elif token == b"," and self.depth == 1:
+                self.emit(chunk[mark : pos - 1], items)
+                mark = pos
+        if self.depth > 0:
+            self.buffer += chunk[mark:]
+        return items
+
+    def emit(self, data: bytes, items: list[bytes]):
+        self.buffer += data
+        if item := bytes(self.buffer).strip():
+            items.append(item)
+        self.buffer.clear()
+
+
+def next_page_params(params: Any, pagination: str, count: int) -> Any:
+    """
+    Return the query params of the page after one with ``count`` items or None if it was
+    the last page. ``offset`` pagination stops at a page smaller than ``limit``, ``page``
+    pagination (starting at 1) at the first empty page.
+    """
+    if not count:
+        return None
+    if pagination == "offset":
+        limit = getattr(params, "limit", None)
+        if limit is not None and count < limit:
+            return None
+        return copy_params(params, offset=(params.offset or 0) + count)
+    page = params.page if params.page is not None else 1
+    return copy_params(params, page=page + 1)
+'''
+
+SYNC_STREAMING = '''
+
+def iter_json(type_: Any, chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Yield the items of a json array received in ``chunks`` validated as ``type_``.
+    """
+    validate = get_validator(type_)
+    parser = JsonArrayParser()
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield validate(item)
+
+
+def iter_pages(fetch_page: Callable[[Any], Iterator[Any]], params: Any, pagination: str) -> Iterator[Any]:
+    """
+    Yield the items of all pages, ``fetch_page`` streams the items for the given params.
+    """
+    while params is not None:
+        count = 0
+        for obj in fetch_page(params):
+            count += 1
+            yield obj
+        params = next_page_params(params, pagination, count)
+'''
+
+ASYNC_STREAMING = '''
+
+async def aiter_json(type_: Any, chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Yield the items of a json array received in ``chunks`` validated as ``type_``.
+    """
+    validate = get_validator(type_)
+    parser = JsonArrayParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield validate(item)
+
+
+async def aiter_pages(
+    fetch_page: Callable[[Any], AsyncIterator[Any]], params: Any, pagination: str
+) -> AsyncIterator[Any]:
+    """
+    Yield the items of all pages, ``fetch_page`` streams the items for the given params.
+    """
+    while params is not None:
+        count = 0
+        async for obj in fetch_page(params):
+            count += 1
+            yield obj
+        params = next_page_params(params, pagination, count)
+'''
+
+BATCH_RESULT = '''
+
+class BatchResult:
+    """
+    The outcome of one call of a batch, either its ``value`` or the raised ``error``.
+    """
+
+    __slots__ = ("index", "call", "value", "error")
+
+    def __init__(self, index: int, call: Any, value: Any = None, error: Optional[Exception] = None):
+        self.index = index
+        self.call = call
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        outcome = f"error={self.error!r}" if self.error is not None else f"value={self.value!r}"
+        return f"BatchResult(index={self.index}, {outcome})"
+
+
+def split_call(call: Any) -> tuple[tuple, dict]:
+    """
+    A call of a batch is a dict of keyword arguments, a tuple of positional arguments or
+    a single positional argument.
+    """
+    if isinstance(call, dict):
+        return (), call
+    if isinstance(call, tuple):
+        return call, {}
+    return (call,), {}
+'''
+
+ASYNC_BATCH = '''
+
+async def run_many(
+    func: Callable[..., Any],
+    calls: Iterable[Any],
+    max_concurrency: int = 10,
+    ordered: bool = True,
+    **kwargs: Any,
+) -> AsyncIterator[BatchResult]:
+    """
+    Await ``func`` for every call with at most ``max_concurrency`` calls in flight.
+
+    The results are yielded in the order of ``calls`` or, with ``ordered=False``, as they
+    complete. An error of a call is captured in its result and does not abort the batch.
+    """
+    queue = asyncio.Queue()
+    pending_calls = enumerate(calls)
+    max_concurrency = max(max_concurrency, 1)
+    # calls are only started within a window of the yielded results, so a slow call does
+    # not let the results behind it pile up
+    window = max_concurrency * 2
+    progress = asyncio.Condition()
+    started = 0
+    yielded = 0
+
+    async def worker():
+        nonlocal started
+        try:
+            while True:
+                async with progress:
+                    await progress.wait_for(lambda: started < yielded + window)
+                # the workers share one iterator, so at most max_concurrency calls are in flight
+                if (item := next(pending_calls, None)) is None:
+                    break
+                started += 1
+                index, call = item
+                args, call_kwargs = split_call(call)
+                try:
+                    result = BatchResult(index, call, value=await func(*args, **call_kwargs, **kwargs))
+                except Exception as error:
+                    result = BatchResult(index, call, error=error)
+                await queue.put(result)
+        finally:
+            queue.put_nowait(None)
+
+    async def advance():
+        nonlocal yielded
+        yielded += 1
+        async with progress:
+            progress.notify_all()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+    finished_workers = 0
+    completed = {}
+    next_index = 0
+    try:
+        while finished_workers < len(workers):
+            result = await queue.get()
+            if result is None:
+                finished_workers += 1
+            elif not ordered:
+                yield result
+                await advance()
+            else:
+                completed[result.index] = result
+                while next_index in completed:
+                    yield completed.pop(next_index)
+                    next_index += 1
+                    await advance()
+    finally:
+        for task in workers:
+            task.cancel()
+'''
+
+SYNC_BATCH = '''
+
+def run_many(
+    func: Callable[..., Any],
+    calls: Iterable[Any],
+    max_workers: int = 10,
+    ordered: bool = True,
+    **kwargs: Any,
+) -> Iterator[BatchResult]:
+    """
+    Call ``func`` for every call in a pool of ``max_workers`` threads, which share the
+    pooled session.
+
+    The results are yielded in the order of ``calls`` or, with ``ordered=False``, as they
+    complete. An error of a call is captured in its result and does not abort the batch.
+    """
+
+    def call_func(index: int, call: Any) -> BatchResult:
+        args, call_kwargs = split_call(call)
+        try:
+            return BatchResult(index, call, value=func(*args, **call_kwargs, **kwargs))
+        except Exception as error:
+            return BatchResult(index, call, error=error)
+
+    max_workers = max(max_workers, 1)
+    pending_calls = enumerate(calls)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # only a window of calls is submitted, so large batches are not held in memory
+        futures = deque(
+            executor.submit(call_func, *item) for item in islice(pending_calls, max_workers * 2)
+        )
+        try:
+            while futures:
+                if ordered:
+                    done = [futures.popleft()]
+                else:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        futures.remove(future)
+                for future in done:
+                    if (item := next(pending_calls, None)) is not None:
+                        futures.append(executor.submit(call_func, *item))
+                    yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+'''
+
+RESPONSE_CACHE = '''
+
+class CacheEntry:
+    """
+    A decoded response together with its validators and the time it expires.
+    """
+
+    __slots__ = ("value", "etag", "last_modified", "expires_at")
+
+    def __init__(
+        self,
+        value: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        expires_at: float = 0.0,
+    ):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def __getstate__(self):
+        return self.value, self.etag, self.last_modified, self.expires_at
+
+    def __setstate__(self, state):
+        self.value, self.etag, self.last_modified, self.expires_at = state
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class MemoryCache:
+    """
+    In-memory backend keeping the ``maxsize`` least recently used entries.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self.lock:
+            if (entry := self.entries.get(key)) is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SqliteCache:
+    """
+    On-disk backend in a sqlite database, keeping the ``maxsize`` most recently used
+    entries. Cached values are pickled.
+
+    The number of entries is counted on open and kept up to date by the writes of this
+    backend, the least recently used entries are only pruned once it exceeds ``maxsize``.
+    """
+
+    def __init__(self, path: Union[str, Path], maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, entry BLOB NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self.size = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT entry FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return pickle.loads(row[0])
+
+    def set(self, key: str, entry: CacheEntry):
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock, self.connection:
+            exists = self.connection.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, entry, accessed) VALUES (?, ?, ?)",
+                (key, data, time.time()),
+            )
+            if exists is None:
+                self.size += 1
+            if self.size > self.maxsize:
+                # the oldest entries are read from the index on accessed, without a sort
+                self.size -= self.connection.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (self.size - self.maxsize,),
+                ).rowcount
+
+    def delete(self, key: str):
+        with self.lock, self.connection:
+            self.size -= self.connection.execute(
+                "DELETE FROM responses WHERE key = ?", (key,)
+            ).rowcount
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM responses")
+            self.size = 0
+
+    def close(self):
+        self.connection.close()
+
+
+class ResponseCache:
+    """
+    Caches the decoded responses of GET requests.
+
+    Entries are keyed on the method, the url, the query params and the ``vary_headers``
+    of the request. They are fresh for ``ttl`` seconds or the ``max-age`` of the response,
+    afterwards they are revalidated with ``If-None-Match``/``If-Modified-Since`` and a
+    ``304 Not Modified`` reuses the already decoded value. Cached values are shared
+    between calls, so do not mutate them.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[Any] = None,
+        ttl: float = 60.0,
+        vary_headers: Iterable[str] = ("Accept", "Authorization"),
+    ):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+        self.vary_headers = {name.lower() for name in vary_headers}
+
+    def make_key(
+        self,
+        method: str,
+        url: str,
+        params: Optional[dict],
+        headers: dict,
+        validate: bool = True,
+    ) -> str:
+        vary = sorted(
+            (name.lower(), str(val))
+            for name, val in headers.items()
+            if name.lower() in self.vary_headers
+        )
+        fields = [method.upper(), url, sorted((params or {}).items()), vary]
+        if not validate:
+            # responses built without validation are not handed to validating calls
+            fields.append("unvalidated")
+        data = json.dumps(fields, default=str)
+        # keys can contain credentials, which are not stored in the clear
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def expires_at(self, response_headers: Any) -> Optional[float]:
+        """
+        The expiry time for a response or None if it must not be stored.
+        """
+        cache_control = response_headers.get("Cache-Control", "").lower()
+        directives = [obj.strip() for obj in cache_control.split(",")]
+        if "no-store" in directives:
+            return None
+        if "no-cache" in directives:
+            return 0.0
+        for directive in directives:
+            if directive.startswith("max-age="):
+                try:
+                    return time.time() + int(directive[8:])
+                except ValueError:
+                    break
+        return time.time() + self.ttl
+
+    def store(self, key: str, value: Any, response_headers: Any):
+        if (expires_at := self.expires_at(response_headers)) is None:
+            return
+        entry = CacheEntry(
+            value,
+            etag=response_headers.get("ETag"),
+            last_modified=response_headers.get("Last-Modified"),
+            expires_at=expires_at,
+        )
+        self.backend.set(key, entry)
+
+    def revalidated(self, key: str, entry: CacheEntry, response_headers: Any) -> Any:
+        if (expires_at := self.expires_at(response_headers)) is None:
+            self.backend.delete(key)
+        else:
+            entry.expires_at = expires_at
+            entry.etag = response_headers.get("ETag", entry.etag)
+            self.backend.set(key, entry)
+        return entry.value
+
+    def clear(self):
+        self.backend.clear()
+
+
+_cache: Optional[ResponseCache] = ResponseCache()
+
+
+def configure_cache(cache: Optional[ResponseCache] = None, **options: Any) -> Optional[ResponseCache]:
+    """
+    Replace the response cache used by all GET functions.
+
+    Either with the given ``cache`` or with a new one created from ``options`` (see
+    ``ResponseCache``). ``configure_cache(None)`` without options disables caching.
+    """
+    global _cache
+    _cache = cache if cache is not None or not options else ResponseCache(**options)
+    return _cache
+
+
+def get_cache() -> Optional[ResponseCache]:
+    return _cache
+'''
+
+SYNC_CACHED = '''
+
+def send_cached(
+    method: str,
+    url: str,
+    decode: Callable[[bytes], Any],
+    *,
+    headers: Optional[dict] = None,
+    validate: bool = True,
+    **kwargs: Any,
+) -> Any:
+    """
+    Send the request through the response cache and return the decoded response or None
+    if it failed. ``validate=False`` marks a ``decode`` that skips validation, its responses
+    are cached apart from validated ones.
+    """
+    headers = dict(headers or {})
+    if (cache := get_cache()) is None:
+        response = send_request(method, url, headers=headers, **kwargs)
+        return decode(response.content) if response.ok else None
+
+    key = cache.make_key(method, url, kwargs.get("params"), headers, validate)
+    if (entry := cache.backend.get(key)) is not None:
+        if entry.is_fresh:
+            return entry.value
+        headers.update(entry.conditional_headers())
+
+    response = send_request(method, url, headers=headers, **kwargs)
+    if response.status_code == 304 and entry is not None:
+        return cache.revalidated(key, entry, response.headers)
+    if not response.ok:
+        return None
+    value = decode(response.content)
+    cache.store(key, value, response.headers)
+    return value
+'''
+
+ASYNC_CACHED = '''
+
+async def run_cache(cache: ResponseCache, func: Callable, *args: Any) -> Any:
+    """
+    Call ``func`` of the ``cache``, in a thread unless the backend is in memory, so the disk
+    I/O of e.g. ``SqliteCache`` does not block the event loop.
+    """
+    if isinstance(cache.backend, MemoryCache):
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+async def send_cached(
+    method: str,
+    url: str,
+    decode: Callable[[bytes], Any],
+    *,
+    headers: Optional[dict] = None,
+    validate: bool = True,
+    **kwargs: Any,
+) -> Any:
+    """
+    Send the request through the response cache and return the decoded response or None
+    if it failed. ``validate=False`` marks a ``decode`` that skips validation, its responses
+    are cached apart from validated ones.
+    """
+    headers = dict(headers or {})
+    if (cache := get_cache()) is None:
+        async with send_request(method, url, headers=headers, **kwargs) as resp:
+            return decode(await resp.read()) if resp.ok else None
+
+    key = cache.make_key(method, url, kwargs.get("params"), headers, validate)
+    if (entry := await run_cache(cache, cache.backend.get, key)) is not None:
+        if entry.is_fresh:
+            return entry.value
+        headers.update(entry.conditional_headers())
+
+    async with send_request(method, url, headers=headers, **kwargs) as resp:
+        not_modified = resp.status == 304 and entry is not None
+        if not (not_modified or resp.ok):
+            return None
+        value = None if not_modified else decode(await resp.read())
+    # the connection is released before the cache is written
+    if not_modified:
+        return await run_cache(cache, cache.revalidated, key, entry, resp.headers)
+    await run_cache(cache, cache.store, key, value, resp.headers)
+    return value
+'''
+
+SINGLE_FLIGHT = Template(
+    '''
+
+_in_flight: dict = {}
+
+
+def make_flight_key(method: str, url: str, headers: dict, validate: bool, kwargs: dict) -> tuple:
+    options = {key: val for key, val in kwargs.items() if key != "session"}
+    data = json.dumps([method.upper(), url, headers, options], sort_keys=True, default=repr)
+    return asyncio.get_running_loop(), id(kwargs.get("session")), validate, data
+
+
+def forget_flight(key: tuple, task: asyncio.Task):
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    # the error is raised in every waiting call, this only marks it as retrieved
+    if not task.cancelled():
+        task.exception()
+
+
+async def send_decoded(method: str, url: str, decode: Callable[[bytes], Any], **kwargs: Any) -> Any:
+    async with send_request(method, url, **kwargs) as resp:
+        return decode(await resp.read()) if resp.ok else None
+
+
+async def send_shared(
+    method: str,
+    url: str,
+    decode: Callable[[bytes], Any],
+    *,
+    headers: Optional[dict] = None,
+    validate: bool = True,
+    **kwargs: Any,
+) -> Any:
+    """
+    Send the request unless an identical one is already in flight and share its decoded
+    result, which must not be mutated therefore. ``validate=False`` marks a ``decode`` that
+    skips validation, its results are only shared with calls doing the same.
+
+    The shared request runs in its own task, so cancelling one of the waiting calls does
+    not cancel it for the others.
+    """
+    headers = dict(headers or {})
+    key = make_flight_key(method, url, headers, validate, kwargs)
+    if (task := _in_flight.get(key)) is None:
+        task = asyncio.ensure_future($fetch(method, url, decode, headers=headers, **kwargs))
+        _in_flight[key] = task
+        task.add_done_callback(partial(forget_flight, key))
+    return await asyncio.shield(task)
+'''
+)
+
+
+class Runtime:
+    """
+    Generates the ``runtime.py`` of a client, which holds the connection handling
+    shared by all api modules.
+    """
+
+    __slots__ = (
+        "data",
+        "runtime_imports",
+        "client_kind",
+        "pool_connections",
+        "pool_maxsize",
+        "limit",
+        "limit_per_host",
+        "ttl_dns_cache",
+        "streaming",
+        "sync_concurrency",
+        "response_cache",
+        "single_flight",
+        "accept_encoding",
+        "request_encoding",
+        "compress_threshold",
+        "max_retries",
+        "model_backend",
+    )
+
+    def __init__(
+        self,
+        client_kind: Literal["sync", "async"] = "sync",
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        ttl_dns_cache: int = 10,
+        streaming: bool = False,
+        sync_concurrency: bool = False,
+        response_cache: bool = False,
+        single_flight: bool = False,
+        accept_encoding: str | None = None,
+        request_encoding: str | None = None,
+        compress_threshold: int = 1024,
+        max_retries: int = 0,
+        model_backend: str = "pydantic",
+    ):
+        self.data = []
+        self.runtime_imports = set()
+        self.model_backend = model_backend
+        self.client_kind = client_kind
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.streaming = streaming
+        self.sync_concurrency = sync_concurrency
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.accept_encoding = accept_encoding
+        self.request_encoding = request_encoding
+        self.compress_threshold = compress_threshold
+        self.max_retries = max_retries
+
+    def generate_base_imports(self):
+        self.runtime_imports.add("from functools import lru_cache")
+        self.runtime_imports.add("from typing import Any, Callable, Iterable, Optional, Union")
+        if self.model_backend == "msgspec":
+            self.runtime_imports.add("import msgspec")
+        else:
+            self.runtime_imports.add("from enum import Enum")
+            self.runtime_imports.add("from typing import get_args, get_origin")
+            self.runtime_imports.add("from pydantic import BaseModel, TypeAdapter")
+            self.runtime_imports.add("from pydantic_core import from_json")
+        self.runtime_imports.add("import random")
+        self.runtime_imports.add("import threading")
+        self.runtime_imports.add("import time")
+        self.runtime_imports.add("from datetime import datetime, timezone")
+        self.runtime_imports.add("from email.utils import parsedate_to_datetime")
+        self.runtime_imports.add("from urllib.parse import urlsplit")
+        self.runtime_imports.add("import gzip")
+        self.runtime_imports.add("import zlib")
+        if self.client_kind == "sync":
+            self.runtime_imports.add("import requests")
+            self.runtime_imports.add("from requests.adapters import HTTPAdapter")
+            self.runtime_imports.add(
+                "from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ACCEPT_ENCODING"
+            )
+            if self.sync_concurrency:
+                self.runtime_imports.add("from collections import deque")
+                self.runtime_imports.add(
+                    "from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait"
+                )
+                self.runtime_imports.add("from itertools import islice")
+            if self.sync_concurrency or self.streaming:
+                self.runtime_imports.add("from typing import Iterator")
+        else:
+            self.runtime_imports.add("import asyncio")
+            self.runtime_imports.add("import aiohttp")
+            self.runtime_imports.add("from typing import AsyncIterator")
+            if self.single_flight:
+                self.runtime_imports.add("from functools import partial")
+            if self.streaming:
+                self.runtime_imports.add("from typing import AsyncIterable")
+        if self.response_cache:
+            self.runtime_imports.add("import hashlib")
+            self.runtime_imports.add("import pickle")
+            self.runtime_imports.add("import sqlite3")
+            self.runtime_imports.add("from collections import OrderedDict")
+            self.runtime_imports.add("from pathlib import Path")
+        if self.response_cache or (self.single_flight and self.client_kind == "async"):
+            self.runtime_imports.add("import json")
+        if self.streaming:
+            self.runtime_imports.add("import re")
+
+    def generate_runtime(self):
+        self.generate_base_imports()
+        if self.client_kind == "sync":
+            self.data.append(
+                SYNC_SESSION.substitute(
+                    pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+                )
+            )
+        else:
+            self.data.append(
+                ASYNC_SESSION.substitute(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                )
+            )
+
+        # retries are opt-in, a client without them never sends a request twice
+        retry_policy = f"RetryPolicy(max_retries={self.max_retries})" if self.max_retries else None
+        self.data.append(RATE_LIMITS.substitute(retry_policy=retry_policy))
+        self.data.append(
+            COMPRESSION.substitute(
+                accept_encoding=repr(self.accept_encoding),
+                request_encoding=repr(self.request_encoding),
+                compress_threshold=self.compress_threshold,
+            )
+        )
+        self.data.append(SYNC_DECODABLE if self.client_kind == "sync" else ASYNC_DECODABLE)
+        self.data.append(MSGSPEC_DECODING if self.model_backend == "msgspec" else DECODING)
+        if self.client_kind == "async":
+            self.data.append(BATCH_RESULT)
+            self.data.append(ASYNC_BATCH)
+        elif self.sync_concurrency:
+            self.data.append(BATCH_RESULT)
+            self.data.append(SYNC_BATCH)
+        if self.response_cache:
+            self.data.append(RESPONSE_CACHE)
+            self.data.append(SYNC_CACHED if self.client_kind == "sync" else ASYNC_CACHED)
+        if self.single_flight and self.client_kind == "async":
+            fetch = "send_cached" if self.response_cache else "send_decoded"
+            self.data.append(SINGLE_FLIGHT.substitute(fetch=fetch))
+        if self.streaming:
+            self.data.append(JSON_ARRAY_PARSER)
+            self.data.append(SYNC_STREAMING if self.client_kind == "sync" else ASYNC_STREAMING)
+
+    def render(self) -> str:
+        return "\n".join([*sorted(self.runtime_imports), "\n", *self.data])
+
+    def write_runtime(self, folder_path: Path, formatter: Formatter | None = None):
+        if formatter is None:
+            formatter = Formatter(folder_path)
+        formatter.write(folder_path / Path("runtime.py"), self.render())
@@ -1,18 +1,76 @@
-from operator import itemgetter
+import re
 from pathlib import Path
-from string import Template
-
-import black
-import isort
 
+from openapi_fastapi_client.codegen import (
+    Bracket,
+    Class,
+    Docstring,
+    Imports,
+    Module,
+    string_literal,
+)
+from openapi_fastapi_client.formatting import Formatter
 from openapi_fastapi_client.helpers import (
     STR_FORMAT,
     TYPE_CONVERTION,
+    create_import,
     create_validator,
     function_like_name_to_class_name,
+    get_class_name,
+    get_schema_module_name,
     number_constraints,
     string_constraints,
+    strongly_connected_components,
 )
+from openapi_fastapi_client.refs import RefResolver
+
+SCHEMA_LAYOUTS = ("single", "model", "tag")
+MODEL_BACKENDS = ("pydantic", "msgspec")
+# msgspec structs take keyword arguments only, so fields with defaults may come first
+STRUCT_BASES = ["Struct", "kw_only=True", "omit_defaults=True"]
+# the shared base of the models with a deferred build
+DEFERRED_BASE = "DeferredModel"
+
+FACADE_FUNCTIONS = """def __getattr__(name: str):
+    if (module_name := _MODULES.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if __package__:
+        module = importlib.import_module(f".{module_name}", __package__)
+    else:
+        module = importlib.import_module(module_name)
+    globals()[name] = value = getattr(module, name)
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_MODULES})"""
+
+WARMUP_FUNCTIONS = """def _build_models(names: tuple[str, ...]):
+    module = sys.modules[__name__]
+    for name in names:
+        getattr(module, name).model_rebuild()
+
+
+def warmup(*names: str) -> threading.Thread:
+    \"\"\"
+    Build the validators of the models ``names``, or of all models, in a background thread.
+
+    Join the returned thread to wait for them.
+    \"\"\"
+    thread = threading.Thread(
+        target=_build_models,
+        args=(names or _DEFERRED_MODELS,),
+        name="schema-warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread"""
+
+
+def get_model_bases(backend: str = "pydantic", defer_build: bool = False) -> list[str]:
+    if backend == "msgspec":
+        return STRUCT_BASES
+    return [DEFERRED_BASE if defer_build else "BaseModel"]
 
 
 class Schema:
@@ -23,11 +81,26 @@ class Schema:
         "enums",
         "query_param_schemas",
         "referenced_class",
+        "resolver",
+        "backend",
+        "defer_build",
     )
 
-    def __init__(self, components: dict):
+    def __init__(
+        self,
+        components: dict,
+        resolver: RefResolver | None = None,
+        backend: str = "pydantic",
+        defer_build: bool = False,
+    ):
         self.data = []
+        self.backend = backend
+        # structs are cheap to define, only pydantic models build their validators on import
+        self.defer_build = defer_build and backend == "pydantic"
         self.components = components
+        if resolver is None:
+            resolver = RefResolver({"components": {"schemas": components}})
+        self.resolver = resolver
         self.schema_imports = set()
         self.enums = {}
         self.query_param_schemas = []
@@ -36,7 +109,20 @@ class Schema:
     def generate_base_imports(self):
         self.schema_imports.add("from datetime import date, datetime")
         self.schema_imports.add("from typing import Optional")
-        self.schema_imports.add("from pydantic import BaseModel")
+        if self.backend == "msgspec":
+            self.schema_imports.add("from msgspec import Struct")
+        else:
+            self.schema_imports.add("from pydantic import BaseModel")
+        if self.defer_build:
+            self.schema_imports.add("from pydantic import ConfigDict")
+
+    def constrained_type(self, type_hint: str, constraint: str, params: str) -> str:
+        if self.backend == "msgspec":
+            self.schema_imports.add("from typing import Annotated")
+            self.schema_imports.add("from msgspec import Meta")
+            return f"Annotated[{type_hint}, Meta({params})]"
+        self.schema_imports.add(f"from pydantic import {constraint}")
+        return f"{constraint}({params})"
 
     def create_enum(self, attr_name: str, enum_values: list):
         enum_name = f"{function_like_name_to_class_name(attr_name)}"
@@ -46,17 +132,22 @@ class Schema:
             self.schema_imports.add("from enum import Enum")
             self.enums[enum_name] = {
                 "class_name": enum_name,
-                "attributes": [f"{obj.upper().replace(' ', '_')} = '{obj}'" for obj in enum_values],
+                "attributes": [
+                    f"{obj.upper().replace(' ', '_')} = {string_literal(obj)}"
+                    for obj in enum_values
+                ],
             }
             return enum_name
 
     def create_attribute(self, class_name: str, component: dict):
+        # references of schemas of other files are relative to their file
+        base_file = self.resolver.get_schema_file(class_name)
         class_name = function_like_name_to_class_name(class_name)
         class_info = {
             "class_name": class_name,
             "attributes": [],
             "validators": [],
-            "index": 0 if class_name in self.referenced_class else 10,
+            "references": set(),
         }
         if "properties" not in component and "enum" in component:
             self.create_enum(component["title"], component["enum"])
@@ -74,55 +165,63 @@ class Schema:
             match type_data:
                 case "string":
                     if type_info.get("maxLength") or type_info.get("minLength"):
-                        self.schema_imports.add("from pydantic import constr")
                         params = string_constraints(type_info)
-                        type_hint = f"constr({params})"
+                        type_hint = self.constrained_type("str", "constr", params)
                     else:
                         if format_ := type_info.get("format"):
                             type_hint = STR_FORMAT.get(format_, "str")
                         elif enum_ := type_info.get("enum"):
                             enum_name = self.create_enum(f"{class_name}_{name}", enum_)
+                            class_info["references"].add(enum_name)
                             type_hint = enum_name
                         else:
                             type_hint = "str"
                 case "integer":
                     if type_info.get("minimum") or type_info.get("maximum"):
-                        self.schema_imports.add("from pydantic import conint")
                         params = number_constraints(type_info)
-                        type_hint = f"conint({params})"
+                        type_hint = self.constrained_type("int", "conint", params)
                     else:
                         type_hint = "int"
                 case "number":
                     if type_info.get("minimum") or type_info.get("maximum"):
-                        self.schema_imports.add("from pydantic import confloat")
                         params = number_constraints(type_info)
-                        type_hint = f"confloat({params})"
+                        type_hint = self.constrained_type("float", "confloat", params)
                     else:
                         type_hint = "float"
                 case "array":
                     if reference := type_info["items"].get("$ref"):
-                        ref = function_like_name_to_class_name(reference.split("/")[-1])
+                        ref = function_like_name_to_class_name(
+                            self.resolver.get_schema_name(reference, base_file)
+                        )
                         self.referenced_class.add(ref)
-                        class_info["index"] = class_info["index"] + 1
+                        class_info["references"].add(ref)
                         type_hint = f"list[{ref}]"
                     else:
                         type_hint = "list"
                 case "boolean":
                     type_hint = "bool"
                 case "reference":
-                    ref = function_like_name_to_class_name(type_info["$ref"].split("/")[-1])
+                    ref = function_like_name_to_class_name(
+                        self.resolver.get_schema_name(type_info["$ref"], base_file)
+                    )
                     self.referenced_class.add(ref)
-                    class_info["index"] = class_info["index"] + 1
+                    class_info["references"].add(ref)
                     type_hint = ref
                 case [{"$ref": str() as refer}]:
-                    ref = refer.split("/")[-1]
+                    ref = self.resolver.get_schema_name(refer, base_file)
                     self.referenced_class.add(ref)
-                    class_info["index"] = class_info["index"] + 1
+                    class_info["references"].add(ref)
                     type_hint = ref
                 case _:
                     type_hint = None
 
-            if is_optional and type_hint is not None:
+            if is_optional and type_hint is not None and self.backend == "msgspec":
+                # msgspec does not check defaults, a missing field is None but an explicit
+                # null is only accepted if the field is nullable, like the validators below
+                if type_info.get("nullable", False):
+                    type_hint = f"Optional[{type_hint}]"
+                class_info["attributes"].append(f"{name}{delimiter}{type_hint} = None")
+            elif is_optional and type_hint is not None:
                 class_info["attributes"].append(f"{name}{delimiter}Optional[{type_hint}] = None")
                 if not type_info.get("nullable", False):
                     self.schema_imports.add("from pydantic import field_validator")
@@ -130,7 +229,7 @@ class Schema:
                         field_type = TYPE_CONVERTION[type_info["type"]]
                     except KeyError:
                         field_type = type_hint
-                    class_info["validators"].append(create_validator(name, field_type))
+                    class_info["validators"].append((name, field_type))
             elif not is_optional and type_hint is not None:
                 class_info["attributes"].append(f"{name}{delimiter}{type_hint}")
         return class_info
@@ -141,40 +240,223 @@ class Schema:
             data = self.create_attribute(key, val)
             if data:
                 self.data.append(data)
-        self.data.sort(key=itemgetter("index"))
 
-    def create_enum_class(self, data: dict):
-        params = "\n    ".join(data["attributes"])
-        return Template(
-            """class $class_name(Enum):
-    $params
+    def create_enum_class(self, data: dict) -> str:
+        return "\n".join(Class(data["class_name"], ["Enum"], data["attributes"]).render())
+
+    def create_schema_class(self, data: dict, forward_refs: set[str] = frozenset()) -> Class:
+        attributes = data["attributes"]
+        validators = data["validators"]
+        if forward_refs:
+            # classes defined further down are referenced by name and resolved by model_rebuild
+            pattern = re.compile(rf"\b({'|'.join(sorted(forward_refs))})\b")
+            attributes = [pattern.sub(r'"\1"', obj) for obj in attributes]
+            validators = [(name, pattern.sub(r'"\1"', obj)) for name, obj in validators]
+        return Class(
+            data["class_name"],
+            get_model_bases(self.backend, self.defer_build),
+            [*attributes, *(create_validator(*obj) for obj in validators)],
+        )
+
+    def get_classes(self, additional_data: list[str] = None) -> dict[str, str | dict]:
+        """
+        Query param classes and enums are rendered already, models stay data until their
+        forward references are known.
+        """
+        classes = {get_class_name(obj): obj for obj in additional_data or []}
+        for obj in self.enums.values():
+            classes[obj["class_name"]] = self.create_enum_class(obj)
+        for obj in self.data:
+            classes[obj["class_name"]] = obj
+        return classes
+
+    def get_dependency_graph(self, classes: dict[str, str | dict]) -> dict[str, set[str]]:
+        graph = {}
+        for class_name, obj in classes.items():
+            references = obj["references"] if isinstance(obj, dict) else set()
+            graph[class_name] = {ref for ref in references if ref in classes}
+        return graph
+
+    def get_chunks(
+        self,
+        components: list[list[str]],
+        graph: dict[str, set[str]],
+        layout: str,
+        tag_schemas: dict[str, set[str]] | None = None,
+    ) -> dict[str, list[str]]:
+        """
+        Group the classes into the modules of the ``layout``.
+
+        ``model`` puts each strongly connected component into its own module, ``tag`` the
+        classes used by a single tag into ``schema_<tag>.py`` and the ones used by several
+        or no tags into ``schema_shared.py``. Neither leads to cyclic imports.
         """
-        ).substitute(class_name=data["class_name"], params=params)
-
-    def create_schema_class(self, data: dict):
-        params = "\n    ".join(data["attributes"])
-        validators = "\n".join(data["validators"])
-        return Template(
-            """class $class_name(BaseModel):
-    $params
-    
-    $validators
+        if layout == "single":
+            return {"schema.py": [obj for component in components for obj in component]}
+
+        if layout == "model":
+            return {get_schema_module_name(component[0]): component for component in components}
+
+        users = {class_name: set() for class_name in graph}
+        for tag, names in (tag_schemas or {}).items():
+            for name in names:
+                if name in users:
+                    users[name].add(tag)
+        # dependents come before their dependencies in the reversed order
+        for component in reversed(components):
+            tags = set().union(*(users[obj] for obj in component))
+            for obj in component:
+                users[obj] = tags
+                for dependency in graph[obj]:
+                    users[dependency].update(tags)
+
+        chunks = {}
+        for component in components:
+            tags = users[component[0]]
+            module_name = f"schema_{min(tags).lower()}.py" if len(tags) == 1 else "schema_shared.py"
+            chunks.setdefault(module_name, []).extend(component)
+        return chunks
+
+    def get_imports(self) -> Imports:
+        imports = Imports()
+        for obj in self.schema_imports:
+            module, _, names = obj.removeprefix("from ").partition(" import ")
+            imports.add(module, *names.split(", "))
+        return imports
+
+    def get_deferred_models(self, class_names: list[str]) -> list[str]:
+        """
+        The models among ``class_names`` with a deferred build, everything but the enums.
+        """
+        if not self.defer_build:
+            return []
+        return [obj for obj in class_names if obj not in self.enums]
+
+    def create_deferred_base(self) -> Class:
+        return Class(DEFERRED_BASE, ["BaseModel"], ["model_config = ConfigDict(defer_build=True)"])
+
+    def create_warmup(self, imports: Imports, deferred_models: list[str]) -> list:
+        imports.add("sys")
+        imports.add("threading")
+        literals = [string_literal(obj) for obj in deferred_models]
+        if len(literals) == 1:
+            model_names = f"_DEFERRED_MODELS = ({literals[0]},)"
+        else:
+            model_names = "\n".join(Bracket("_DEFERRED_MODELS = ", literals).render())
+        return [model_names, WARMUP_FUNCTIONS]
+
+    def render_chunk(
+        self,
+        class_names: list[str],
+        classes: dict[str, str | dict],
+        graph: dict[str, set[str]],
+        split: bool,
+    ) -> str:
+        data = [self.get_imports()]
+        chunk = set(class_names)
+        references = sorted(set().union(*(graph[obj] for obj in class_names)) - chunk)
+        deferred_models = self.get_deferred_models(class_names)
+        if split and deferred_models:
+            # the shared base lives in the facade
+            references.append(DEFERRED_BASE)
+        if split and references:
+            data.append(create_import("schema", references))
+        if not split and deferred_models:
+            data.append(self.create_deferred_base())
+
+        defined = set()
+        rebuild = []
+        for class_name in class_names:
+            obj = classes[class_name]
+            if isinstance(obj, str):
+                data.append(obj)
+            else:
+                forward_refs = {
+                    ref for ref in graph[class_name] if ref in chunk and ref not in defined
+                }
+                data.append(self.create_schema_class(obj, forward_refs))
+                # structs and deferred models resolve their forward references on first use
+                if forward_refs and self.backend != "msgspec" and not self.defer_build:
+                    rebuild.append(class_name)
+            defined.add(class_name)
+        if rebuild:
+            data.append("\n".join(f"{class_name}.model_rebuild()" for class_name in rebuild))
+        if not split and deferred_models:
+            data.extend(self.create_warmup(data[0], deferred_models))
+        return Module(data).render()
+
+    def render_facade(self, modules: dict[str, str]) -> str:
+        module_names = Bracket(
+            "_MODULES = ",
+            [
+                f"{string_literal(class_name)}: {string_literal(module_name.removesuffix('.py'))}"
+                for class_name, module_name in modules.items()
+            ],
+            brackets="{}",
+        )
+        imports = Imports({"importlib": set()})
+        data = [
+            Docstring("The models live in further modules, which are imported on first access."),
+            imports,
+            "\n".join(module_names.render()),
+            "__all__ = list(_MODULES)",
+            FACADE_FUNCTIONS,
+        ]
+        if deferred_models := self.get_deferred_models(list(modules)):
+            imports.add("pydantic", "BaseModel", "ConfigDict")
+            data.insert(2, self.create_deferred_base())
+            data.extend(self.create_warmup(imports, deferred_models))
+        return Module(data).render()
+
+    def render_modules(
+        self,
+        additional_data: list[str] = None,
+        layout: str = "single",
+        tag_schemas: dict[str, set[str]] | None = None,
+    ) -> dict[str, str]:
+        """
+        Render the classes in the order of their ``$ref`` dependencies.
+
+        Classes referencing each other in a cycle use forward references and are rebuilt
+        once all of them are defined. Models with a deferred build are instead rebuilt on
+        first use or by the generated ``warmup()``. With a ``model`` or ``tag`` layout the classes are
+        split into several modules and ``schema.py`` becomes a facade importing them
+        lazily. The modules import the classes of the other modules through the facade.
+        """
+        classes = self.get_classes(additional_data)
+        graph = self.get_dependency_graph(classes)
+        components = strongly_connected_components(graph)
+        chunks = self.get_chunks(components, graph, layout, tag_schemas)
+        split = layout != "single"
+
+        modules = {}
+        rendered = {}
+        for module_name, class_names in chunks.items():
+            rendered[module_name] = self.render_chunk(class_names, classes, graph, split)
+            modules.update(dict.fromkeys(class_names, module_name))
+        if split:
+            rendered["schema.py"] = self.render_facade(modules)
+        return rendered
+
+    def render(self, additional_data: list[str] = None) -> str:
+        return self.render_modules(additional_data)["schema.py"]
+
+    def write_to_file(
+        self,
+        folder_path: Path,
+        additional_data: list[str] = None,
+        formatter: Formatter | None = None,
+        layout: str = "single",
+        tag_schemas: dict[str, set[str]] | None = None,
+    ) -> list[str]:
+        """
+        Write the ``schema.py`` and the further modules of the ``layout``.
+
+        Returns the names of the further modules.
         """
-        ).substitute(class_name=data["class_name"], params=params, validators=validators)
-
-    def write_to_file(self, folder_path: Path, additional_data: list[str] = None):
-        data = []
-        data.extend(self.schema_imports)
-        data.append("\n")
-        if additional_data:
-            data.extend(additional_data)
-            data.append("\n")
-        data.extend([self.create_enum_class(obj) for obj in self.enums.values()])
-        data.append("\n")
-        data.extend([self.create_schema_class(obj) for obj in self.data])
-        text = black.format_str("\n".join(data), mode=black.Mode())
-
-        schema_file = folder_path / Path("schema.py")
-        with schema_file as file:
-            file.write_text(text)
-            isort.api.sort_file(file)
+        if formatter is None:
+            formatter = Formatter(folder_path)
+        modules = self.render_modules(additional_data, layout, tag_schemas)
+        for module_name, text in modules.items():
+            formatter.write(folder_path / Path(module_name), text, preformatted=True)
+        return sorted(set(modules) - {"schema.py"})
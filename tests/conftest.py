@@ -1,8 +1,15 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from string import Template
+from urllib.parse import urlsplit
 
 import pytest
 import yaml
+from typer.testing import CliRunner
+
+from openapi_fastapi_client.main import app
 
 BASE_TEST_DIR = Path(__file__).parent
 
@@ -40,6 +47,8 @@ def test_folder():
     file = test_dir / Path("__init__.py")
     file.write_text("\n")
     yield test_dir
+    for name in [obj for obj in sys.modules if obj.startswith("tests.pet_test_store")]:
+        sys.modules.pop(name)
     for file in test_dir.glob("*"):
         if file.is_file():
             file.unlink()
@@ -70,3 +79,100 @@ def create_dummy_schema_cls(test_folder):
     classes = [cls_template.substitute(cls_name=obj) for obj in cls_names]
     file = test_folder / Path("schema.py")
     file.write_text("\n\n".join(classes))
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch) -> Path:
+    cache_dir = tmp_path / Path("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_dir))
+    return cache_dir
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def do_PUT(self):
+        self.handle_request()
+
+    def do_DELETE(self):
+        self.handle_request()
+
+    def handle_request(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = {
+            "method": self.command,
+            "path": self.path,
+            "headers": dict(self.headers),
+            "body": body,
+            "client_port": self.client_address[1],
+        }
+        self.server.requests.append(request)
+
+        route = self.server.routes.get((self.command, urlsplit(self.path).path), (200, {}, b"{}"))
+        status, headers, payload = route(request) if callable(route) else route
+        self.send_response(status)
+        headers = {"Content-Type": "application/json", **headers}
+        for key, val in headers.items():
+            self.send_header(key, val)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="function")
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    server.requests = []
+    server.routes = {}
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="function")
+def generated_client(openapi_file, http_server, tmp_path):
+    """
+    Factory generating the petstore client, or the client of the given ``spec`` text, with
+    the given cli options against the ``http_server``, the generated modules are importable
+    while the test runs.
+    """
+    module_names = ("runtime", "schema", "pet", "store", "user")
+    folders = []
+
+    def generate_client(*options: str, spec: str | None = None) -> Path:
+        spec_file = tmp_path / Path("openapi.yaml")
+        spec_file.write_text(
+            (spec or openapi_file.read_text()).replace(
+                "https://petstore3.swagger.io/api/v3", f"{http_server.url}/api/v3"
+            )
+        )
+        folder = tmp_path / Path(f"client_{len(folders)}")
+        result = CliRunner().invoke(app, [str(spec_file), str(folder), *options])
+        assert result.exit_code == 0, result.output
+
+        for name in module_names:
+            sys.modules.pop(name, None)
+        if folders:
+            sys.path.remove(str(folders[-1]))
+        sys.path.insert(0, str(folder))
+        folders.append(folder)
+        return folder
+
+    yield generate_client
+
+    for name in module_names:
+        sys.modules.pop(name, None)
+    if folders:
+        sys.path.remove(str(folders[-1]))
@@ -1,8 +1,10 @@
+import copy
 from pathlib import Path
 
 import pytest
 
 from openapi_fastapi_client.api import Api
+from openapi_fastapi_client.runtime import Runtime
 
 
 def test_create_api_instance(openapi_paths):
@@ -28,20 +30,74 @@ def test_base_imports(example_api, client_kind):
     else:
         assert example_api.generate_base_imports() is None
 
+    lines = example_api.render().splitlines()
     if client_kind is None or client_kind == "sync":
         # default is synchronous
-        assert "import requests" in example_api.data
+        assert "import requests" in lines
+        assert "from typing import Any, Optional" in lines
     else:
-        assert "import aiohttp" in example_api.data
+        assert "import aiohttp" in lines
+        assert "from typing import Any, AsyncIterator, Iterable, Optional" in lines
 
-    assert "from typing import Any, Optional" in example_api.data
-    assert "BASE_URL = 'http://localhost:8080'" in example_api.data
+    assert 'BASE_URL = "http://localhost:8080"' in lines
 
 
 @pytest.mark.parametrize("client_kind", ("sync", "async"))
 def test_create_valid_api_file(example_api, test_folder, create_dummy_schema_cls, client_kind):
+    runtime = Runtime(client_kind)
+    runtime.generate_runtime()
+    runtime.write_runtime(test_folder)
     example_api.generate_apis(".pet_test_store.schema", client_kind=client_kind)
     example_api.write_api(test_folder)
     assert (test_folder / Path("pet.py")).exists()
     with (test_folder / Path("pet.py")).open("r") as file:
         exec(file.read(), globals(), {})
+
+
+@pytest.mark.parametrize("client_kind", ("sync", "async"))
+def test_streaming_functions_for_list_responses(client_kind):
+    operation = {
+        "tags": ["pet"],
+        "operationId": "listPets",
+        "parameters": [
+            {"name": name, "in": "query", "required": False, "schema": {"type": "integer"}}
+            for name in ("offset", "limit")
+        ],
+        "responses": {
+            "200": {
+                "description": "ok",
+                "content": {
+                    "application/json": {
+                        "schema": {"type": "array", "items": {"$ref": "#/components/schemas/Pet"}}
+                    }
+                },
+            }
+        },
+    }
+    api = Api({"/pets": {"get": operation}}, "http://localhost:8080", "pet")
+    api.generate_apis("schema", client_kind=client_kind, streaming=True)
+    code = api.render()
+
+    compile(code, "pet.py", "exec")
+    assert "def pet_get_list_pets_iter(" in code
+    assert "def pet_get_list_pets_paginate(" in code
+    assert '"offset"' in code
+
+    api = Api({"/pets": {"get": operation}}, "http://localhost:8080", "pet")
+    api.generate_apis("schema", client_kind=client_kind)
+    assert "_iter(" not in api.render()
+
+
+def test_operation_encodings_are_passed_to_requests(openapi_paths):
+    paths = copy.deepcopy(openapi_paths)
+    paths["/pet"]["post"]["x-request-encoding"] = "br"
+    paths["/pet"]["post"]["x-accept-encoding"] = "zstd"
+    api = Api(paths, "http://localhost:8080", "pet")
+    api.generate_apis("schema")
+    code = api.render()
+
+    add_pet = code[code.index("def pet_post_add_pet(") :]
+    add_pet = add_pet[: add_pet.index("\ndef ")]
+    assert 'content_encoding="br"' in add_pet
+    assert 'accept_encoding="zstd"' in add_pet
+    assert code.count("content_encoding=") == 1
@@ -0,0 +1,56 @@
+import json
+
+from typer.testing import CliRunner
+
+from benchmarks.run import PHASES, app, run_benchmark
+from benchmarks.synthetic import create_spec
+
+
+def test_create_synthetic_spec():
+    spec = create_spec(100, enum_size=200)
+
+    assert sum(len(val) for val in spec["paths"].values()) == 100
+    assert len(spec["components"]["schemas"]) == 100
+    assert len(spec["tags"]) == 5
+    assert len(spec["components"]["schemas"]["Model0"]["properties"]["status"]["enum"]) == 200
+    assert "parent" in spec["components"]["schemas"]["Model9"]["properties"]
+    assert "parent" not in spec["components"]["schemas"]["Model10"]["properties"]
+
+
+def test_run_benchmark(tmp_path):
+    result = run_benchmark(20, tmp_path)
+
+    assert result["operations"] == 20
+    assert set(result["phases"]) == set(PHASES)
+    for phase in result["phases"].values():
+        assert phase["seconds"] >= 0
+        assert phase["peak_rss"] > 0
+    assert (tmp_path / "client_20" / "schema.py").exists()
+
+
+def test_run_benchmark_with_import_time(tmp_path):
+    result = run_benchmark(10, tmp_path, import_time=True)
+
+    for name in ("import", "import_deferred"):
+        assert result["phases"][name]["seconds"] > 0
+        assert result["phases"][name]["peak_rss"] > 0
+    assert "defer_build=True" in (tmp_path / "import_deferred_10" / "schema.py").read_text()
+
+
+def test_compare_benchmark_with_baseline(tmp_path):
+    runner = CliRunner()
+    output = tmp_path / "bench.json"
+    result = runner.invoke(app, ["--size", "10", "--output", str(output)])
+    assert result.exit_code == 0, result.output
+    assert json.loads(output.read_text())["results"][0]["size"] == 10
+
+    baseline = json.loads(output.read_text())
+    for phase in baseline["results"][0]["phases"].values():
+        phase["seconds"] = 1e-12
+    (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+    result = runner.invoke(
+        app,
+        ["--size", "10", "--output", str(output), "--baseline", str(tmp_path / "baseline.json")],
+    )
+    assert result.exit_code == 1
+    assert "REGRESSION" in result.output
@@ -0,0 +1,58 @@
+import black
+import pytest
+
+from openapi_fastapi_client.codegen import Block, Bracket, Class, Function, Imports, Module
+
+LONG = "a_rather_long_name_to_force_wrapping"
+
+
+def format_black(text: str) -> str:
+    return black.format_str(text, mode=black.Mode())
+
+
+@pytest.mark.parametrize(
+    "node",
+    (
+        Bracket("result = call", ["1", "2"]),
+        Bracket("result = call", [f"{LONG}_{idx}" for idx in range(2)]),
+        Bracket("result = call", [f"{LONG}_{idx}" for idx in range(4)]),
+        Bracket("headers = ", ['"a": 1', '"b": 2'], brackets="{}"),
+        Bracket("headers = ", [f'"{LONG}_{idx}": 1' for idx in range(2)], brackets="{}"),
+        Bracket("values = ", [f"{LONG}_{idx}" for idx in range(2)], brackets="[]"),
+        Bracket("call", [Bracket("get_type_adapter", [f"list[{LONG * 2}]"], ".validate_json")]),
+        Block(
+            Bracket("with send_request", [f"{LONG}_{idx}" for idx in range(3)], " as r:"), ["pass"]
+        ),
+        Function("func", [f"{LONG}: int"], ["pass"], returns=f"{LONG}_returned_type"),
+        Function("func", ["a", "b"], [Bracket(f"return {LONG * 2}.validate", ["data"])]),
+        Class(f"{LONG * 2}Query", ["BaseModel"], ["a: int"]),
+        Imports({"typing": {f"{LONG}_{idx}" for idx in range(3)}, "os": set()}),
+    ),
+)
+def test_nodes_render_like_black(node):
+    text = Module([node]).render()
+
+    assert format_black(text) == text
+
+
+def test_module_separates_definitions_like_black():
+    text = Module(
+        [
+            Imports({"typing": {"Any"}}),
+            'BASE_URL = "http://localhost"',
+            Class("Pet", ["BaseModel"], []),
+            Function("get", [], ["return None"], returns="Any", docstring="Get it."),
+            "Pet.model_rebuild()",
+        ]
+    ).render()
+
+    assert "class Pet(BaseModel):\n    pass\n" in text
+    assert format_black(text) == text
+
+
+def test_imports_are_sorted_like_isort():
+    text = Module([Imports({"typing": {"Any"}, "threading": set(), "pydantic": {"BaseModel"}})])
+
+    assert text.render() == (
+        "import threading\nfrom typing import Any\n\nfrom pydantic import BaseModel\n"
+    )
@@ -0,0 +1,59 @@
+import black
+import pytest
+
+from openapi_fastapi_client.formatting import Formatter
+
+UNFORMATTED = "import sys\nimport os\ndef foo( a,b ):\n  return {'a':a,'b':b}\n"
+
+
+def test_format_code_in_memory(tmp_path):
+    formatter = Formatter(tmp_path)
+    text = formatter.format_str(UNFORMATTED)
+
+    assert text.startswith("import os\nimport sys\n")
+    assert 'def foo(a, b):\n    return {"a": a, "b": b}\n' in text
+
+
+def test_formatted_code_is_cached(tmp_path, monkeypatch):
+    formatter = Formatter(tmp_path, cache_dir=tmp_path / "cache")
+    text = formatter.format_str(UNFORMATTED)
+    assert formatter.get_cache_file(UNFORMATTED).read_text() == text
+
+    def fail(*args, **kwargs):
+        raise AssertionError("black should not run for cached code")
+
+    monkeypatch.setattr(black, "format_str", fail)
+    assert Formatter(tmp_path, cache_dir=tmp_path / "cache").format_str(UNFORMATTED) == text
+
+
+def test_disabled_formatter_writes_code_unchanged(tmp_path):
+    formatter = Formatter(tmp_path, enabled=False)
+    formatter.write(tmp_path / "example.py", UNFORMATTED)
+
+    assert (tmp_path / "example.py").read_text() == UNFORMATTED
+
+
+def test_preformatted_code_is_written_without_black(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("black should not run for preformatted code")
+
+    monkeypatch.setattr(black, "format_str", fail)
+    Formatter(tmp_path).write(tmp_path / "example.py", UNFORMATTED, preformatted=True)
+
+    assert (tmp_path / "example.py").read_text() == UNFORMATTED
+
+
+def test_verify_rejects_preformatted_code_black_would_change(tmp_path):
+    formatter = Formatter(tmp_path, verify=True)
+    formatter.write(tmp_path / "example.py", "import os\n", preformatted=True)
+
+    with pytest.raises(ValueError, match="not formatted like black"):
+        formatter.write(tmp_path / "example.py", UNFORMATTED, preformatted=True)
+
+
+def test_preformatted_code_follows_the_isort_settings_of_the_folder(tmp_path):
+    (tmp_path / "pyproject.toml").write_text("[tool.isort]\nforce_single_line = true\n")
+    text = "from os import path, sep\n"
+    Formatter(tmp_path).write(tmp_path / "example.py", text, preformatted=True)
+
+    assert (tmp_path / "example.py").read_text() == "from os import path\nfrom os import sep\n"
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+import yaml
+
+from openapi_fastapi_client import loader as loader_module
+from openapi_fastapi_client.loader import SpecLoader, is_json, parse_spec
+
+
+def test_parse_json_and_yaml():
+    assert is_json(b'  \n{"openapi": "3.0.0"}')
+    assert not is_json(b"openapi: 3.0.0")
+    assert parse_spec(b'{"paths": {"/pet": {}}}') == {"paths": {"/pet": {}}}
+    # yaml keys are normalized to the str keys of json
+    assert parse_spec(b"responses:\n  200:\n    description: ok\n") == {
+        "responses": {"200": {"description": "ok"}}
+    }
+    assert parse_spec(b'{"responses": {"200": {}}}') == parse_spec(b"responses:\n  200: {}\n")
+
+
+def test_parse_yaml_safely():
+    with pytest.raises(yaml.constructor.ConstructorError):
+        parse_spec(b"value: !!python/object/apply:os.system ['true']\n")
+
+
+def test_loader_caches_parsed_specs(tmp_path, monkeypatch):
+    spec_file = tmp_path / "openapi.json"
+    spec_file.write_text(json.dumps({"paths": {}}))
+    loader = SpecLoader(tmp_path / "cache")
+    assert loader.load(spec_file) == {"paths": {}}
+
+    def fail(text):
+        raise AssertionError("parsed again")
+
+    monkeypatch.setattr(loader_module, "parse_spec", fail)
+    assert SpecLoader(tmp_path / "cache").load(spec_file) == {"paths": {}}
+
+    spec_file.write_text(json.dumps({"paths": {"/pet": {}}}))
+    with pytest.raises(AssertionError):
+        loader.load(spec_file)
+
+
+@pytest.mark.parametrize(
+    "content",
+    (
+        b"",
+        b"\x80\x05K",
+        b"\x80\xff.",
+        b"cno_such_module\nThing\n)R.",
+        b"cjson\nno_such_name\n)R.",
+        b"cbuiltins\nlen\n)R.",
+    ),
+)
+def test_loader_discards_broken_cache_files(tmp_path, content):
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text("responses:\n  200:\n    description: ok\n")
+    loader = SpecLoader(tmp_path / "cache")
+    cache_file = loader.get_cache_file(spec_file.read_bytes())
+    cache_file.parent.mkdir(parents=True)
+    cache_file.write_bytes(content)
+
+    assert loader.load(spec_file) == {"responses": {"200": {"description": "ok"}}}
+    assert cache_file.read_bytes() != content
+    assert loader.load(spec_file) == SpecLoader().load(spec_file)
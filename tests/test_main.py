@@ -0,0 +1,334 @@
+import importlib
+import json
+import re
+import sys
+
+import black
+import pytest
+import yaml
+from typer.testing import CliRunner
+
+from openapi_fastapi_client import manifest
+from openapi_fastapi_client.main import app
+
+runner = CliRunner()
+
+
+def read_output(folder) -> dict:
+    return {file.name: file.read_text() for file in sorted(folder.glob("*.py"))}
+
+
+@pytest.fixture
+def import_package(tmp_path):
+    sys.path.insert(0, str(tmp_path))
+    yield lambda name: importlib.import_module(name)
+    sys.path.remove(str(tmp_path))
+    for name in [obj for obj in sys.modules if obj.startswith("lazy_client")]:
+        sys.modules.pop(name)
+
+
+def test_generate_client(openapi_file, tmp_path):
+    result = runner.invoke(app, [str(openapi_file), str(tmp_path / "client")])
+
+    assert result.exit_code == 0, result.output
+    assert set(read_output(tmp_path / "client")) == {
+        "__init__.py",
+        "pet.py",
+        "runtime.py",
+        "schema.py",
+        "store.py",
+        "user.py",
+    }
+
+
+def test_parallel_generation_is_deterministic(openapi_file, tmp_path):
+    result = runner.invoke(app, [str(openapi_file), str(tmp_path / "serial")])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, [str(openapi_file), str(tmp_path / "parallel"), "--jobs", "3"])
+    assert result.exit_code == 0, result.output
+
+    assert read_output(tmp_path / "serial") == read_output(tmp_path / "parallel")
+
+
+def test_regeneration_keeps_unchanged_modules(openapi_file, tmp_path):
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(openapi_file.read_text())
+    output = tmp_path / "client"
+    assert runner.invoke(app, [str(spec_file), str(output)]).exit_code == 0
+    assert (output / ".openapi-fastapi-client.json").exists()
+    mtimes = {file.name: file.stat().st_mtime_ns for file in output.glob("*.py")}
+
+    spec_file.write_text(
+        openapi_file.read_text().replace("operationId: getOrderById", "operationId: getOrder")
+    )
+    assert runner.invoke(app, [str(spec_file), str(output)]).exit_code == 0
+
+    new_mtimes = {file.name: file.stat().st_mtime_ns for file in output.glob("*.py")}
+    assert new_mtimes["store.py"] != mtimes["store.py"]
+    assert "def store_get_get_order(" in (output / "store.py").read_text()
+    for name in ("pet.py", "user.py", "schema.py", "__init__.py"):
+        assert new_mtimes[name] == mtimes[name]
+
+
+def test_regeneration_with_force_rewrites_all_modules(openapi_file, tmp_path):
+    output = tmp_path / "client"
+    assert runner.invoke(app, [str(openapi_file), str(output)]).exit_code == 0
+    (output / "pet.py").write_text("\n")
+
+    assert runner.invoke(app, [str(openapi_file), str(output)]).exit_code == 0
+    assert (output / "pet.py").read_text() == "\n"
+
+    assert runner.invoke(app, [str(openapi_file), str(output), "--force"]).exit_code == 0
+    assert "def pet_put_update_pet(" in (output / "pet.py").read_text()
+
+
+def test_changed_generator_rewrites_all_modules(openapi_file, tmp_path, monkeypatch):
+    output = tmp_path / "client"
+    assert runner.invoke(app, [str(openapi_file), str(output)]).exit_code == 0
+    (output / "pet.py").write_text("\n")
+
+    monkeypatch.setattr(manifest, "get_generator_version", lambda: "0.0.0+changed")
+    assert runner.invoke(app, [str(openapi_file), str(output)]).exit_code == 0
+    assert "def pet_put_update_pet(" in (output / "pet.py").read_text()
+
+
+def test_generate_client_without_formatting(openapi_file, tmp_path):
+    result = runner.invoke(app, [str(openapi_file), str(tmp_path / "client"), "--no-format"])
+    assert result.exit_code == 0, result.output
+
+    for name, text in read_output(tmp_path / "client").items():
+        compile(text, name, "exec")
+
+
+@pytest.mark.parametrize(
+    "options",
+    (
+        [],
+        ["--async", "--streaming", "--response-cache", "--single-flight"],
+        ["--sync-concurrency", "--streaming", "--schema-layout", "model"],
+        ["--async", "--schema-layout", "tag"],
+        ["--model-backend", "msgspec", "--streaming", "--response-cache"],
+        ["--streaming", "--async", "--single-flight"],
+        ["--defer-build", "--schema-layout", "model"],
+        ["--defer-build", "--async", "--streaming"],
+    ),
+)
+@pytest.mark.parametrize("long_names", (False, True))
+def test_generated_modules_are_formatted_like_black(openapi_file, tmp_path, options, long_names):
+    spec = openapi_file.read_text()
+    if long_names:
+        # wrapped signatures, calls and class headers
+        for name in ("Pet", "Order", "User"):
+            spec = re.sub(rf"\b{name}\b", f"{name}WithAVeryLongDescriptiveNameForWrapping", spec)
+        spec = re.sub(
+            r"operationId: (\w+)", r"operationId: \1AndAVeryLongOperationIdentifier", spec
+        )
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(spec)
+    output = tmp_path / "client"
+    result = runner.invoke(app, [str(spec_file), str(output), "--verify-format", *options])
+    assert result.exit_code == 0, result.output
+
+    for name, text in read_output(output).items():
+        if name != "runtime.py":
+            assert black.format_str(text, mode=black.Mode()) == text, name
+
+
+def test_generate_client_with_profile(openapi_file, tmp_path):
+    trace_file = tmp_path / "trace.json"
+    result = runner.invoke(
+        app,
+        [
+            str(openapi_file),
+            str(tmp_path / "client"),
+            "--profile",
+            "--profile-output",
+            str(trace_file),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "yaml_load" in result.output
+    assert trace_file.exists()
+
+
+def test_package_imports_modules_lazily(openapi_file, tmp_path, import_package):
+    result = runner.invoke(app, [str(openapi_file), str(tmp_path / "lazy_client")])
+    assert result.exit_code == 0, result.output
+
+    package = import_package("lazy_client")
+    assert "lazy_client.pet" not in sys.modules
+    assert {"pet", "runtime", "schema", "store", "user"} <= set(dir(package))
+
+    assert callable(package.pet.pet_put_update_pet)
+    assert "lazy_client.pet" in sys.modules
+    assert "lazy_client.user" not in sys.modules
+    with pytest.raises(AttributeError):
+        package.missing
+
+
+def test_split_schema_imports_models_lazily(openapi_file, tmp_path, import_package):
+    output = tmp_path / "lazy_client"
+    result = runner.invoke(app, [str(openapi_file), str(output), "--schema-layout", "model"])
+    assert result.exit_code == 0, result.output
+    assert {"schema_pet.py", "schema_tag.py", "schema_user.py"} <= set(read_output(output))
+
+    package = import_package("lazy_client")
+    tag = package.schema.Tag(id=1, name="dogs")
+    assert package.schema.Pet.model_fields["tags"].annotation == list[type(tag)]
+    assert "lazy_client.schema_user" not in sys.modules
+
+    result = runner.invoke(app, [str(openapi_file), str(output)])
+    assert result.exit_code == 0, result.output
+    assert not list(output.glob("schema_*.py"))
+
+
+def test_split_schema_defers_model_builds(openapi_file, tmp_path, import_package):
+    output = tmp_path / "deferred_client"
+    result = runner.invoke(
+        app, [str(openapi_file), str(output), "--schema-layout", "model", "--defer-build"]
+    )
+    assert result.exit_code == 0, result.output
+
+    package = import_package("deferred_client")
+    assert not package.schema.Pet.__pydantic_complete__
+    assert "deferred_client.schema_user" not in sys.modules
+
+    package.schema.warmup("Pet").join()
+    assert package.schema.Pet.__pydantic_complete__
+    assert package.schema.Tag(id=1, name="dogs").name == "dogs"
+
+
+def test_custom_package_init_is_kept(openapi_file, tmp_path):
+    output = tmp_path / "client"
+    output.mkdir()
+    (output / "__init__.py").write_text("from .pet import *\n")
+
+    assert runner.invoke(app, [str(openapi_file), str(output)]).exit_code == 0
+    assert (output / "__init__.py").read_text() == "from .pet import *\n"
+
+
+def test_tag_schema_layout(openapi_file, tmp_path, import_package):
+    output = tmp_path / "lazy_client"
+    result = runner.invoke(app, [str(openapi_file), str(output), "--schema-layout", "tag"])
+    assert result.exit_code == 0, result.output
+    assert {"schema_pet.py", "schema_store.py", "schema_user.py", "schema_shared.py"} <= set(
+        read_output(output)
+    )
+    assert "class Tag(BaseModel)" in (output / "schema_pet.py").read_text()
+    assert "class PetGetFindPetsByStatusQuery(" in (output / "schema_pet.py").read_text()
+
+    package = import_package("lazy_client")
+    assert package.pet.Pet is package.schema.Pet
+    assert "lazy_client.schema_store" not in sys.modules
+
+
+def test_regeneration_keeps_unchanged_schema_modules(openapi_file, tmp_path):
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(openapi_file.read_text())
+    output = tmp_path / "client"
+    options = [str(spec_file), str(output), "--schema-layout", "model"]
+    assert runner.invoke(app, options).exit_code == 0
+    mtimes = {file.name: file.stat().st_mtime_ns for file in output.glob("schema*.py")}
+
+    spec_file.write_text(
+        openapi_file.read_text().replace(
+            "example: Dogs", "example: Dogs\n        rank:\n          type: integer"
+        )
+    )
+    assert runner.invoke(app, options).exit_code == 0
+
+    new_mtimes = {file.name: file.stat().st_mtime_ns for file in output.glob("schema*.py")}
+    changed = {name for name in mtimes if new_mtimes[name] != mtimes[name]}
+    assert changed == {"schema.py", "schema_category.py"}
+    assert "rank" in (output / "schema_category.py").read_text()
+
+
+def test_generate_client_with_references_to_other_files(openapi_file, tmp_path):
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(
+        openapi_file.read_text().replace(
+            "'#/components/schemas/ApiResponse'", "'models.yaml#/Upload'"
+        )
+    )
+    (tmp_path / "models.yaml").write_text(
+        "Upload:\n  type: object\n  properties:\n    code:\n      type: integer\n"
+    )
+    result = runner.invoke(app, [str(spec_file), str(tmp_path / "client")])
+    assert result.exit_code == 0, result.output
+
+    output = read_output(tmp_path / "client")
+    assert "class Upload(BaseModel)" in output["schema.py"]
+    assert "Upload.model_validate_json" in output["pet.py"]
+
+
+def test_references_in_other_files_are_relative_to_their_file(openapi_file, tmp_path):
+    spec = openapi_file.read_text()
+    start = spec.index("'200'", spec.index("operationId: findPetsByTags"))
+    end = spec.index("'400'", start)
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(
+        f"{spec[:start]}'200':\n          $ref: 'models/responses.yaml#/Listings'\n"
+        f"        {spec[end:]}"
+    )
+    models = tmp_path / "models"
+    models.mkdir()
+    (models / "responses.yaml").write_text(
+        "Listings:\n  description: listings\n  content:\n    application/json:\n"
+        "      schema:\n        type: array\n        items:\n"
+        "          $ref: 'listing.yaml#/Listing'\n"
+    )
+    (models / "listing.yaml").write_text(
+        "Listing:\n  type: object\n  properties:\n    shelf:\n"
+        "      allOf:\n        - $ref: 'shelf.yaml#/Shelf'\n"
+    )
+    (models / "shelf.yaml").write_text(
+        "Shelf:\n  type: object\n  properties:\n    row:\n      type: integer\n"
+    )
+    result = runner.invoke(app, [str(spec_file), str(tmp_path / "client")])
+    assert result.exit_code == 0, result.output
+
+    output = read_output(tmp_path / "client")
+    assert "class Shelf(BaseModel)" in output["schema.py"]
+    assert "shelf: Shelf" in output["schema.py"]
+    assert "list[Listing]" in output["pet.py"]
+
+
+def test_external_schemas_clashing_with_components_are_rejected(openapi_file, tmp_path):
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(
+        openapi_file.read_text().replace("'#/components/schemas/ApiResponse'", "'models.yaml#/Tag'")
+    )
+    (tmp_path / "models.yaml").write_text(
+        "Tag:\n  type: object\n  properties:\n    code:\n      type: integer\n"
+    )
+    result = runner.invoke(app, [str(spec_file), str(tmp_path / "client")])
+    assert isinstance(result.exception, ValueError)
+    assert "The schema Tag of models.yaml clashes" in str(result.exception)
+
+
+def test_generate_clients_of_several_files(openapi_file, tmp_path, cache_home):
+    json_file = tmp_path / "petstore.json"
+    json_file.write_text(json.dumps(yaml.safe_load(openapi_file.read_text()), default=str))
+    output = tmp_path / "clients"
+    result = runner.invoke(app, [str(openapi_file), str(json_file), str(output)])
+    assert result.exit_code == 0, result.output
+
+    assert read_output(output / "openapi") == read_output(output / "petstore")
+    assert len(list(cache_home.glob("openapi-fastapi-client/specs/*/*.pickle"))) == 2
+
+
+def test_encoding_options_take_precedence_over_the_spec(openapi_file, tmp_path):
+    spec = yaml.safe_load(openapi_file.read_text())
+    spec_file = tmp_path / "openapi.yaml"
+    spec_file.write_text(yaml.safe_dump({**spec, "x-request-encoding": "gzip"}))
+
+    assert runner.invoke(app, [str(spec_file), str(tmp_path / "spec")]).exit_code == 0
+    runtime = (tmp_path / "spec" / "runtime.py").read_text()
+    assert 'DEFAULT_REQUEST_ENCODING: Optional[str] = "gzip"' in runtime
+
+    output = tmp_path / "option"
+    options = ["--request-encoding", "deflate"]
+    assert runner.invoke(app, [str(spec_file), str(output), *options]).exit_code == 0
+    runtime = (output / "runtime.py").read_text()
+    assert 'DEFAULT_REQUEST_ENCODING: Optional[str] = "deflate"' in runtime
@@ -0,0 +1,88 @@
+from openapi_fastapi_client.api import Api
+from openapi_fastapi_client.operations import OperationIndex
+from openapi_fastapi_client.refs import RefResolver
+
+
+def test_create_operation_index(openapi_paths):
+    index = OperationIndex(openapi_paths)
+
+    assert index.tags == ["pet", "store", "user"]
+    assert len(index.get_operations("pet")) == 8
+    assert index.get_operations("unknown") == []
+
+
+def test_operation_index_resolves_imports_per_tag(openapi_paths):
+    index = OperationIndex(openapi_paths)
+
+    assert index.get_schema_imports("pet") == {"Pet", "ApiResponse"}
+    assert index.get_schema_imports("store") == {"Order"}
+    assert index.get_schema_imports("user") == {"User"}
+
+
+def test_operations_of_same_path_do_not_share_state(openapi_paths):
+    index = OperationIndex(openapi_paths)
+    operations = {obj["function_name"]: obj for obj in index.get_operations("pet")}
+
+    assert operations["pet_post_update_pet_with_form"]["query_params"]
+    assert not operations["pet_delete_delete_pet"]["query_params"]
+    assert operations["pet_delete_delete_pet"]["url"] == "/pet/{pet_id}"
+
+
+def test_api_uses_shared_operation_index(openapi_paths):
+    index = OperationIndex(openapi_paths)
+    apis = [
+        Api(openapi_paths, "http://localhost:8080", tag, operation_index=index)
+        for tag in index.tags
+    ]
+
+    for api in apis:
+        assert api.operation_index is index
+        assert api.paths is index.paths
+        api.generate_apis("schema")
+
+    assert len([obj for api in apis for obj in api.query_param_schemas]) == 5
+
+
+def test_operation_index_resolves_referenced_parts():
+    paths = {
+        "/pets/{petId}": {
+            "parameters": [{"$ref": "#/components/parameters/petId"}],
+            "get": {
+                "tags": ["pet"],
+                "operationId": "getPet",
+                "parameters": [{"$ref": "#/components/parameters/limit"}],
+                "responses": {"200": {"$ref": "#/components/responses/Pet"}},
+            },
+            "put": {
+                "tags": ["pet"],
+                "operationId": "putPet",
+                "requestBody": {"$ref": "#/components/requestBodies/Pet"},
+                "responses": {"200": {"description": "ok"}},
+            },
+        }
+    }
+    pet_content = {"content": {"application/json": {"schema": {"$ref": "#/x/Pet"}}}}
+    document = {
+        "paths": paths,
+        "x": {"Pet": {"type": "object", "properties": {"name": {"type": "string"}}}},
+        "components": {
+            "parameters": {
+                "petId": {"name": "petId", "in": "path", "schema": {"type": "integer"}},
+                "limit": {"name": "limit", "in": "query", "schema": {"type": "integer"}},
+            },
+            "responses": {"Pet": pet_content},
+            "requestBodies": {"Pet": pet_content},
+        },
+    }
+    index = OperationIndex(paths, RefResolver(document))
+    operations = {obj["function_name"]: obj for obj in index.get_operations("pet")}
+
+    get_pet = operations["pet_get_get_pet"]
+    assert get_pet["path_parameters"] == ["pet_id: int"]
+    assert get_pet["query_params"] == ["limit: Optional[int] = None"]
+    assert get_pet["response_obj"] == "Pet"
+    assert get_pet["response_is_model"]
+    put_pet = operations["pet_put_put_pet"]
+    assert put_pet["path_parameters"] == ["pet_id: int"]
+    assert put_pet["request_obj"] == "Pet"
+    assert index.get_schema_imports("pet") == {"Pet"}
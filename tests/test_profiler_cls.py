@@ -0,0 +1,42 @@
+import json
+
+from openapi_fastapi_client.main import generate
+from openapi_fastapi_client.profiling import NULL_PROFILER, Profiler, get_profiler, phase
+
+
+def test_phases_are_only_recorded_with_active_profiler():
+    with phase("outside"):
+        pass
+    assert get_profiler() is NULL_PROFILER
+    assert not NULL_PROFILER.records
+
+    with Profiler() as profiler:
+        assert get_profiler() is profiler
+        with phase("outer", tag="pet"):
+            with phase("inner"):
+                data = [obj for obj in range(10_000)]
+    del data
+
+    assert get_profiler() is NULL_PROFILER
+    records = {record["name"]: record for record in profiler.records}
+    assert set(records) == {"outer", "inner"}
+    assert records["outer"]["args"] == {"tag": "pet"}
+    assert records["outer"]["seconds"] >= records["inner"]["seconds"]
+    assert records["outer"]["peak"] >= records["inner"]["peak"] > 0
+
+
+def test_profile_generation(openapi_file, tmp_path):
+    with Profiler(cprofile=True) as profiler:
+        generate(openapi_file, tmp_path / "client", jobs=2, cache_dir=tmp_path / "cache")
+
+    names = {record["name"] for record in profiler.records}
+    assert {"yaml_load", "schema_build", "generate_apis", "black", "isort", "write"} <= names
+    assert "black" in profiler.summary()
+
+    profiler.write_chrome_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert len(trace["traceEvents"]) == len(profiler.records)
+    assert min(event["ts"] for event in trace["traceEvents"]) == 0
+
+    profiler.dump_stats(tmp_path / "generate.prof")
+    assert (tmp_path / "generate.prof").exists()
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+
+from openapi_fastapi_client.refs import RefCycleError, RefResolver
+
+DOCUMENT = {
+    "components": {
+        "parameters": {
+            "limit": {"name": "limit", "in": "query", "schema": {"type": "integer"}},
+            "alias": {"$ref": "#/components/parameters/limit"},
+            "loop": {"$ref": "#/components/parameters/loop_back"},
+            "loop_back": {"$ref": "#/components/parameters/loop"},
+        },
+        "schemas": {
+            "a/b": {"type": "string"},
+            "Owner": {"$ref": "models.yaml#/Owner"},
+        },
+    }
+}
+
+
+def test_resolve_local_references():
+    resolver = RefResolver(DOCUMENT)
+
+    limit = DOCUMENT["components"]["parameters"]["limit"]
+    assert resolver.deref({"$ref": "#/components/parameters/alias"}) is limit
+    assert resolver.deref({"$ref": "#/components/schemas/a~1b"}) == {"type": "string"}
+    assert resolver.deref(limit) is limit
+    # every reference of the chain is memoized
+    assert (resolver.base_file, "/components/parameters/limit") in resolver.resolved
+
+
+def test_resolve_unknown_and_cyclic_references():
+    resolver = RefResolver(DOCUMENT)
+
+    with pytest.raises(ValueError, match="Unresolvable"):
+        resolver.resolve("#/components/parameters/missing")
+    with pytest.raises(RefCycleError, match="loop_back"):
+        resolver.resolve("#/components/parameters/loop")
+
+
+def test_resolve_references_of_other_files(tmp_path):
+    (tmp_path / "models.yaml").write_text(
+        """Owner:
+  type: object
+  properties:
+    pets:
+      type: array
+      items:
+        $ref: 'pets/pet.yaml'
+"""
+    )
+    (tmp_path / "pets").mkdir()
+    (tmp_path / "pets" / "pet.yaml").write_text("type: object\n")
+    resolver = RefResolver(DOCUMENT, tmp_path / Path("openapi.yaml"))
+
+    resolver.collect_schemas(DOCUMENT["components"]["schemas"])
+
+    assert set(resolver.external_schemas) == {"Owner", "pet"}
+    assert resolver.external_schemas["pet"] == {"type": "object"}
+    assert resolver.get_schema_name("#/components/schemas/Owner") == "Owner"
+    assert len(resolver.documents) == 3
+    assert resolver.get_schema_file("pet") == tmp_path / "pets" / "pet.yaml"
+
+    file, owner = resolver.deref_file({"$ref": "models.yaml#/Owner"})
+    assert file == tmp_path / "models.yaml"
+    assert resolver.deref(owner["properties"]["pets"]["items"], file) == {"type": "object"}
+
+    schemas = resolver.merge_schemas(DOCUMENT["components"]["schemas"])
+    assert schemas["Owner"] is owner and "a/b" in schemas
+
+
+def test_schemas_of_the_same_name_in_other_files_clash(tmp_path):
+    (tmp_path / "pets").mkdir()
+    (tmp_path / "users").mkdir()
+    (tmp_path / "pets" / "errors.yaml").write_text("Error:\n  type: object\n")
+    (tmp_path / "users" / "errors.yaml").write_text("Error:\n  type: string\n")
+    resolver = RefResolver(DOCUMENT, tmp_path / Path("openapi.yaml"))
+
+    assert resolver.get_schema_name("pets/errors.yaml#/Error") == "Error"
+    assert resolver.get_schema_name("./pets/errors.yaml#/Error") == "Error"
+    with pytest.raises(
+        ValueError,
+        match="The schema Error of users/errors.yaml clashes with the schema Error of pets/errors.yaml",
+    ):
+        resolver.get_schema_name("users/errors.yaml#/Error")
@@ -0,0 +1,745 @@
+import asyncio
+import gc
+import gzip
+import importlib
+import json
+import threading
+import time
+from typing import Any, Optional
+
+import aiohttp
+import pytest
+import requests
+from pydantic import BaseModel, ValidationError
+
+from openapi_fastapi_client.runtime import Runtime
+
+PET_JSON = (
+    b'{"id": 1, "name": "doggie", "photoUrls": [], "tags": [{"id": 2, "name": "small"}],'
+    b' "status": "available"}'
+)
+# a session leaking sockets, transports or its connector fails the test that created it
+no_leaks = pytest.mark.filterwarnings(
+    "error::ResourceWarning", "error::pytest.PytestUnraisableExceptionWarning"
+)
+USER_JSON = (
+    b'{"id": 1, "username": "a", "firstName": "", "lastName": "", "email": "", "password": "",'
+    b' "phone": "", "userStatus": 1}'
+)
+
+
+@pytest.mark.parametrize("client_kind", ("sync", "async"))
+def test_create_valid_runtime(client_kind):
+    runtime = Runtime(client_kind)
+    runtime.generate_runtime()
+
+    compile(runtime.render(), "runtime.py", "exec")
+
+
+def test_runtime_imports_only_what_its_options_use():
+    sync_runtime = Runtime("sync", streaming=True, sync_concurrency=True, response_cache=True)
+    async_runtime = Runtime("async", streaming=True, response_cache=True, single_flight=True)
+    for runtime in (sync_runtime, async_runtime):
+        runtime.generate_runtime()
+
+    assert sorted(line for line in sync_runtime.runtime_imports if "typing" in line) == [
+        "from typing import Any, Callable, Iterable, Optional, Union",
+        "from typing import Iterator",
+        "from typing import get_args, get_origin",
+    ]
+    assert "AsyncIterable" not in sync_runtime.render()
+    assert "AsyncIterator" not in sync_runtime.render()
+    assert "from typing import AsyncIterable" in async_runtime.runtime_imports
+    assert "from typing import Iterator" not in async_runtime.runtime_imports
+
+
+def test_sync_client_reuses_connections(generated_client, http_server):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    generated_client()
+    pet = importlib.import_module("pet")
+
+    for _ in range(3):
+        assert pet.pet_get_get_pet_by_id(1).name == "doggie"
+
+    assert len(http_server.requests) == 3
+    assert len({obj["client_port"] for obj in http_server.requests}) == 1
+
+
+def test_sync_client_uses_configured_or_injected_session(generated_client, http_server):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    generated_client()
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+
+    session = runtime.configure_session(pool_maxsize=2)
+    assert runtime.get_session() is session
+    assert session.get_adapter(http_server.url)._pool_maxsize == 2
+
+    injected_session = requests.Session()
+    injected_session.headers["X-Injected"] = "yes"
+    pet.pet_get_get_pet_by_id(1, session=injected_session)
+    assert http_server.requests[-1]["headers"]["X-Injected"] == "yes"
+
+    runtime.close_session()
+    assert runtime.get_session() is not session
+
+
+@no_leaks
+def test_async_client_reuses_session(generated_client, http_server):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    generated_client("--async")
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+
+    async def fetch():
+        async with runtime.configure_client(limit=5, ttl_dns_cache=60) as client:
+            results = [await pet.pet_get_get_pet_by_id(1) for _ in range(3)]
+            assert client.session.connector.limit == 5
+            session = client.session
+        assert session.closed
+        return results
+
+    assert [obj.name for obj in asyncio.run(fetch())] == ["doggie"] * 3
+    assert [obj["method"] for obj in http_server.requests] == ["GET"] * 3
+    assert len({obj["client_port"] for obj in http_server.requests}) == 1
+    gc.collect()
+
+
+@no_leaks
+def test_async_client_closes_session_with_its_loop(generated_client, http_server):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    generated_client("--async")
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+    client = runtime.configure_client()
+
+    async def fetch():
+        await pet.pet_get_get_pet_by_id(1)
+        return client.session
+
+    first, second = asyncio.run(fetch()), asyncio.run(fetch())
+    assert first.closed and second.closed and first is not second
+
+    # a loop closed without closing its async generators leaves the session behind
+    loop = asyncio.new_event_loop()
+    third = loop.run_until_complete(fetch())
+    loop.close()
+    assert asyncio.run(fetch()) is not third and third.closed
+    del first, second, third
+    gc.collect()
+
+
+@no_leaks
+def test_async_client_uses_injected_session(generated_client, http_server):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    generated_client("--async")
+    pet = importlib.import_module("pet")
+
+    async def fetch():
+        async with aiohttp.ClientSession(headers={"X-Injected": "yes"}) as session:
+            await pet.pet_get_get_pet_by_id(1, session=session)
+        # the transports of the closed connector close on the next loop iteration
+        await asyncio.sleep(0)
+
+    asyncio.run(fetch())
+    assert http_server.requests[-1]["headers"]["X-Injected"] == "yes"
+    gc.collect()
+
+
+@pytest.mark.parametrize("options", ((), ("--async",)))
+def test_client_decodes_typed_responses(generated_client, http_server, options):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    http_server.routes[("GET", "/api/v3/pet/findByStatus")] = (200, {}, b"[" + PET_JSON + b"]")
+    http_server.routes[("GET", "/api/v3/store/inventory")] = (200, {}, b'{"available": 3}')
+    generated_client(*options)
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    store = importlib.import_module("store")
+
+    async def fetch():
+        return [
+            await pet.pet_get_get_pet_by_id(1),
+            await pet.pet_get_find_pets_by_status(params=schema.PetGetFindPetsByStatusQuery()),
+            await store.store_get_get_inventory(),
+        ]
+
+    if not options:
+        by_id = pet.pet_get_get_pet_by_id(1)
+        by_status = pet.pet_get_find_pets_by_status(params=schema.PetGetFindPetsByStatusQuery())
+        inventory = store.store_get_get_inventory()
+    else:
+        by_id, by_status, inventory = asyncio.run(fetch())
+
+    assert isinstance(by_id, schema.Pet)
+    assert by_id.tags[0].name == "small"
+    assert by_id.status == schema.PetStatus.AVAILABLE
+    assert by_status == [by_id]
+    assert inventory == {"available": 3}
+
+
+@pytest.mark.parametrize("options", ((), ("--async",), ("--response-cache",)))
+def test_client_decodes_enum_responses(generated_client, http_server, openapi_file, options):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, b'"sold"')
+    spec = openapi_file.read_text()
+    start = spec.index("'200'", spec.index("operationId: getPetById"))
+    end = spec.index("'400'", start)
+    response = "$ref: '#/components/schemas/Availability'"
+    spec = (
+        f"{spec[:start]}'200':\n          description: ok\n          content:\n"
+        f"            application/json:\n              schema:\n                {response}\n"
+        f"        {spec[end:]}"
+    ).replace(
+        "  schemas:\n",
+        "  schemas:\n    Availability:\n      title: Availability\n      type: string\n"
+        "      enum:\n        - available\n        - sold\n",
+        1,
+    )
+    generated_client(*options, spec=spec)
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+
+    async def fetch():
+        return await pet.pet_get_get_pet_by_id(1)
+
+    status = asyncio.run(fetch()) if "--async" in options else pet.pet_get_get_pet_by_id(1)
+    assert status == schema.Availability.SOLD
+
+
+@pytest.mark.parametrize("options", ((), ("--async", "--single-flight"), ("--response-cache",)))
+def test_client_skips_validation_on_request(generated_client, http_server, options):
+    untyped_pet = PET_JSON.replace(b'"id": 1', b'"id": "one"')
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, untyped_pet)
+    http_server.routes[("GET", "/api/v3/pet/findByStatus")] = (200, {}, b"[" + untyped_pet + b"]")
+    generated_client(*options)
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    params = schema.PetGetFindPetsByStatusQuery()
+
+    async def fetch(**kwargs):
+        return [
+            await pet.pet_get_get_pet_by_id(1, **kwargs),
+            await pet.pet_get_find_pets_by_status(params=params, **kwargs),
+        ]
+
+    def call(**kwargs):
+        if "--async" in options:
+            return asyncio.run(fetch(**kwargs))
+        return [
+            pet.pet_get_get_pet_by_id(1, **kwargs),
+            pet.pet_get_find_pets_by_status(params=params, **kwargs),
+        ]
+
+    by_id, by_status = call(validate=False)
+    assert isinstance(by_id, schema.Pet) and by_id.id == "one"
+    assert isinstance(by_id.tags[0], schema.Tag) and by_id.tags[0].name == "small"
+    assert by_id.status == schema.PetStatus.AVAILABLE
+    assert by_status == [by_id]
+    # unvalidated responses are neither cached nor shared for validating calls
+    with pytest.raises(ValidationError):
+        call()
+
+
+@pytest.mark.parametrize("options", ((), ("--async",)))
+def test_client_sends_encoded_bodies(generated_client, http_server, options):
+    http_server.routes[("POST", "/api/v3/user/createWithList")] = (200, {}, USER_JSON)
+    http_server.routes[("GET", "/api/v3/pet/findByStatus")] = (200, {}, b"[]")
+    generated_client(*options)
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    user = importlib.import_module("user")
+    users = [schema.User.model_construct(id=1, username="a"), schema.User.model_construct(id=2)]
+
+    async def send():
+        await user.user_post_create_users_with_list_input(users)
+        await user.user_post_create_user(users[0])
+        await pet.pet_get_find_pets_by_status(
+            params=schema.PetGetFindPetsByStatusQuery(status="sold")
+        )
+
+    if not options:
+        user.user_post_create_users_with_list_input(users)
+        user.user_post_create_user(users[0])
+        pet.pet_get_find_pets_by_status(params=schema.PetGetFindPetsByStatusQuery(status="sold"))
+    else:
+        asyncio.run(send())
+
+    body_request, model_request, query_request = http_server.requests
+    assert body_request["body"] == b'[{"id":1,"username":"a"},{"id":2}]'
+    assert model_request["body"] == b'{"id":1,"username":"a"}'
+    assert body_request["headers"]["Content-Type"] == "application/json"
+    assert query_request["path"] == "/api/v3/pet/findByStatus?status=sold"
+
+
+@pytest.mark.parametrize("options", ((), ("--async", "--streaming")))
+def test_msgspec_client_decodes_and_encodes_structs(generated_client, http_server, options):
+    msgspec = pytest.importorskip("msgspec")
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    http_server.routes[("GET", "/api/v3/pet/findByStatus")] = (200, {}, b"[" + PET_JSON + b"]")
+    http_server.routes[("POST", "/api/v3/user/createWithList")] = (200, {}, USER_JSON)
+    generated_client("--model-backend", "msgspec", *options)
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    user = importlib.import_module("user")
+    params = schema.PetGetFindPetsByStatusQuery(status="sold")
+    users = [msgspec.json.decode(USER_JSON, type=schema.User)]
+
+    async def call():
+        return [
+            await pet.pet_get_get_pet_by_id(1),
+            await pet.pet_get_find_pets_by_status(params=params),
+            [obj async for obj in pet.pet_get_find_pets_by_status_iter(params=params)],
+            await user.user_post_create_users_with_list_input(users),
+        ]
+
+    if "--async" in options:
+        by_id, by_status, streamed, _ = asyncio.run(call())
+    else:
+        by_id = pet.pet_get_get_pet_by_id(1)
+        by_status = streamed = pet.pet_get_find_pets_by_status(params=params)
+        user.user_post_create_users_with_list_input(users)
+
+    assert isinstance(by_id, msgspec.Struct) and isinstance(by_id, schema.Pet)
+    assert by_id.tags[0].name == "small"
+    assert by_id.status == schema.PetStatus.AVAILABLE
+    assert by_status == streamed == [by_id]
+    assert http_server.requests[1]["path"] == "/api/v3/pet/findByStatus?status=sold"
+    sent_users = json.loads(http_server.requests[-1]["body"])
+    assert sent_users == [json.loads(USER_JSON)]
+
+
+def test_runtime_streams_json_arrays():
+    runtime = Runtime(streaming=True)
+    runtime.generate_runtime()
+    namespace = {}
+    exec(runtime.render(), namespace)
+    items = [{"a": 'x\\"],{', "b": [1, {"c": None}]}, 1, "str,]", [], {}]
+    data = json.dumps(items).encode()
+
+    for size in (1, 2, 7, len(data)):
+        chunks = [data[idx : idx + size] for idx in range(0, len(data), size)]
+        assert list(namespace["iter_json"](Any, chunks)) == items
+
+
+def test_runtime_paginates_by_offset_and_page():
+    runtime = Runtime(streaming=True)
+    runtime.generate_runtime()
+    namespace = {}
+    exec(runtime.render(), namespace)
+
+    class Query(BaseModel):
+        offset: Optional[int] = None
+        limit: Optional[int] = None
+        page: Optional[int] = None
+
+    seen = []
+
+    def fetch_offset(params):
+        seen.append(params.model_dump(exclude_unset=True))
+        return iter(range(params.offset or 0, min((params.offset or 0) + params.limit, 5)))
+
+    assert list(namespace["iter_pages"](fetch_offset, Query(limit=2), "offset")) == [0, 1, 2, 3, 4]
+    assert seen == [{"limit": 2}, {"limit": 2, "offset": 2}, {"limit": 2, "offset": 4}]
+
+    def fetch_page(params):
+        return iter([params.page] if params.page < 3 else [])
+
+    assert list(namespace["iter_pages"](fetch_page, Query(page=1), "page")) == [1, 2]
+
+
+@pytest.mark.parametrize("options", (("--streaming",), ("--async", "--streaming")))
+def test_client_streams_list_responses(generated_client, http_server, options):
+    pets = b"[" + b",".join([PET_JSON] * 3) + b"]"
+    http_server.routes[("GET", "/api/v3/pet/findByStatus")] = (200, {}, pets)
+    generated_client(*options)
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    params = schema.PetGetFindPetsByStatusQuery(status="sold")
+
+    async def fetch():
+        return [
+            obj async for obj in pet.pet_get_find_pets_by_status_iter(params=params, chunk_size=7)
+        ]
+
+    if "--async" in options:
+        result = asyncio.run(fetch())
+    else:
+        result = list(pet.pet_get_find_pets_by_status_iter(params=params, chunk_size=7))
+
+    assert len(result) == 3
+    assert all(isinstance(obj, schema.Pet) and obj.name == "doggie" for obj in result)
+    assert http_server.requests[-1]["path"] == "/api/v3/pet/findByStatus?status=sold"
+
+
+@pytest.mark.parametrize("ordered", (True, False))
+def test_async_client_runs_batches(generated_client, http_server, ordered):
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def get_pet(request):
+        with lock:
+            in_flight.append(request["path"])
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(request["path"])
+        return (200, {}, b"{}") if request["path"].endswith("/3") else (200, {}, PET_JSON)
+
+    for pet_id in range(1, 7):
+        http_server.routes[("GET", f"/api/v3/pet/{pet_id}")] = get_pet
+    generated_client("--async")
+    pet = importlib.import_module("pet")
+
+    async def fetch():
+        results = []
+        async for result in pet.pet_get_get_pet_by_id_many(
+            range(1, 7), max_concurrency=2, ordered=ordered
+        ):
+            results.append(result)
+        return results
+
+    results = asyncio.run(fetch())
+
+    if ordered:
+        assert [obj.index for obj in results] == list(range(6))
+    assert sorted(obj.call for obj in results) == list(range(1, 7))
+    assert [obj.call for obj in results if not obj.ok] == [3]
+    assert all(obj.value.name == "doggie" for obj in results if obj.ok)
+    assert max(max_in_flight) == 2
+
+
+@pytest.mark.parametrize("ordered", (True, False))
+def test_async_batches_start_calls_within_a_window(ordered):
+    runtime = Runtime("async")
+    runtime.generate_runtime()
+    namespace = {}
+    exec(runtime.render(), namespace)
+    started = []
+
+    async def fetch(pet_id):
+        started.append(pet_id)
+        # the first call is slow, the results behind it wait for it
+        await asyncio.sleep(0.05 if pet_id == 0 else 0)
+        return pet_id
+
+    async def collect():
+        results = []
+        async for result in namespace["run_many"](fetch, range(100), 2, ordered):
+            # at most twice max_concurrency calls are started ahead of the consumer
+            assert len(started) <= len(results) + 4
+            results.append(result.value)
+        return results
+
+    results = asyncio.run(collect())
+    assert sorted(results) == list(range(100))
+    if ordered:
+        assert results == list(range(100))
+
+
+@pytest.mark.parametrize("ordered", (True, False))
+def test_sync_client_runs_batches_in_threads(generated_client, http_server, ordered):
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def get_pet(request):
+        with lock:
+            in_flight.append(request["path"])
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(request["path"])
+        return (200, {}, b"{}") if request["path"].endswith("/3") else (200, {}, PET_JSON)
+
+    for pet_id in range(1, 7):
+        http_server.routes[("GET", f"/api/v3/pet/{pet_id}")] = get_pet
+    generated_client("--sync-concurrency")
+    pet = importlib.import_module("pet")
+
+    results = list(pet.pet_get_get_pet_by_id_many(range(1, 7), max_workers=2, ordered=ordered))
+
+    if ordered:
+        assert [obj.index for obj in results] == list(range(6))
+    assert sorted(obj.call for obj in results) == list(range(1, 7))
+    assert [obj.call for obj in results if not obj.ok] == [3]
+    assert all(obj.value.name == "doggie" for obj in results if obj.ok)
+    assert max(max_in_flight) == 2
+    assert len({obj["client_port"] for obj in http_server.requests}) <= 2
+
+
+def test_sync_client_without_concurrency_has_no_batches(generated_client):
+    generated_client()
+    pet = importlib.import_module("pet")
+
+    assert not hasattr(pet, "pet_get_get_pet_by_id_many")
+
+
+@pytest.mark.parametrize("options", (("--response-cache",), ("--async", "--response-cache")))
+def test_client_revalidates_cached_responses(generated_client, http_server, options):
+    def get_pet(request):
+        if request["headers"].get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b""
+        return 200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, PET_JSON
+
+    http_server.routes[("GET", "/api/v3/pet/1")] = get_pet
+    http_server.routes[("GET", "/api/v3/pet/2")] = (200, {}, PET_JSON)
+    generated_client(*options)
+    pet = importlib.import_module("pet")
+
+    async def fetch():
+        return [await pet.pet_get_get_pet_by_id(pet_id) for pet_id in (1, 1, 2, 2)]
+
+    if "--async" in options:
+        first, revalidated, second, cached = asyncio.run(fetch())
+    else:
+        first, revalidated, second, cached = [
+            pet.pet_get_get_pet_by_id(pet_id) for pet_id in (1, 1, 2, 2)
+        ]
+
+    assert first.name == "doggie"
+    assert revalidated is first
+    assert cached is second
+    assert [obj["path"] for obj in http_server.requests] == ["/api/v3/pet/1"] * 2 + [
+        "/api/v3/pet/2"
+    ]
+    assert "If-None-Match" not in http_server.requests[0]["headers"]
+    assert http_server.requests[1]["headers"]["If-None-Match"] == '"v1"'
+
+
+def test_async_client_uses_the_disk_cache_off_the_event_loop(
+    generated_client, http_server, tmp_path
+):
+    def get_pet(request):
+        if request["headers"].get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b""
+        return 200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, PET_JSON
+
+    http_server.routes[("GET", "/api/v3/pet/1")] = get_pet
+    generated_client("--async", "--response-cache")
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+    threads = []
+
+    class RecordingCache(runtime.SqliteCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, entry):
+            threads.append(threading.get_ident())
+            super().set(key, entry)
+
+    runtime.configure_cache(backend=RecordingCache(tmp_path / "cache.db"))
+
+    async def fetch():
+        return [await pet.pet_get_get_pet_by_id(1) for _ in range(2)]
+
+    first, revalidated = asyncio.run(fetch())
+    runtime.get_cache().backend.close()
+
+    assert first.name == revalidated.name == "doggie"
+    assert len(http_server.requests) == 2
+    # get and store of the first call, get and revalidate of the second one
+    assert len(threads) == 4 and threading.get_ident() not in threads
+
+
+def test_client_caches_responses_on_disk(generated_client, http_server, tmp_path):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {"Cache-Control": "max-age=60"}, PET_JSON)
+    generated_client("--response-cache")
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+
+    runtime.configure_cache(backend=runtime.SqliteCache(tmp_path / "cache.db", maxsize=1))
+    assert pet.pet_get_get_pet_by_id(1).name == "doggie"
+    runtime.configure_cache(backend=runtime.SqliteCache(tmp_path / "cache.db"))
+    assert pet.pet_get_get_pet_by_id(1).name == "doggie"
+    assert pet.pet_get_get_pet_by_id(1, headers={"Authorization": "other"}).name == "doggie"
+    assert len(http_server.requests) == 2
+
+    runtime.configure_cache(None)
+    pet.pet_get_get_pet_by_id(1)
+    assert len(http_server.requests) == 3
+
+
+def test_sqlite_cache_prunes_least_recently_used_entries(tmp_path):
+    runtime = Runtime(response_cache=True)
+    runtime.generate_runtime()
+    namespace = {}
+    exec(runtime.render(), namespace)
+    cache = namespace["SqliteCache"](tmp_path / "cache.db", maxsize=2)
+
+    for key in ("a", "b", "a", "c"):
+        cache.set(key, key)
+    assert cache.size == 2
+    assert cache.get("a") == "a" and cache.get("b") is None and cache.get("c") == "c"
+    plan = cache.connection.execute(
+        "EXPLAIN QUERY PLAN SELECT key FROM responses ORDER BY accessed LIMIT 1"
+    ).fetchall()
+    assert "responses_accessed" in str(plan)
+
+    cache.delete("a")
+    assert namespace["SqliteCache"](tmp_path / "cache.db", maxsize=2).size == 1
+
+
+@pytest.mark.parametrize("options", (("--single-flight",), ("--single-flight", "--response-cache")))
+def test_async_client_coalesces_identical_calls(generated_client, http_server, options):
+    def get_pet(request):
+        time.sleep(0.1)
+        return (200, {}, b"{}") if request["path"].endswith("/3") else (200, {}, PET_JSON)
+
+    for pet_id in (1, 2, 3):
+        http_server.routes[("GET", f"/api/v3/pet/{pet_id}")] = get_pet
+    generated_client("--async", *options)
+    pet = importlib.import_module("pet")
+
+    async def fetch():
+        calls = [pet.pet_get_get_pet_by_id(pet_id) for pet_id in (1, 1, 1, 2, 3, 3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    first, *others, second, error, other_error = asyncio.run(fetch())
+
+    assert first.name == "doggie"
+    assert all(obj is first for obj in others)
+    assert second is not first
+    assert isinstance(error, ValueError) and other_error is error
+    assert sorted(obj["path"] for obj in http_server.requests) == [
+        "/api/v3/pet/1",
+        "/api/v3/pet/2",
+        "/api/v3/pet/3",
+    ]
+
+
+@pytest.mark.parametrize("options", ((), ("--async",)))
+def test_client_retries_throttled_requests(generated_client, http_server, options):
+    statuses = [429, 503, 200]
+
+    def get_pet(request):
+        status = statuses.pop(0)
+        return status, {"Retry-After": "0"}, PET_JSON if status == 200 else b""
+
+    http_server.routes[("GET", "/api/v3/pet/1")] = get_pet
+    http_server.routes[("POST", "/api/v3/pet")] = (503, {"Retry-After": "0"}, b"")
+    generated_client(*options, "--max-retries", "3")
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    new_pet = schema.Pet.model_validate_json(PET_JSON)
+
+    async def fetch():
+        return await pet.pet_get_get_pet_by_id(1), await pet.pet_post_add_pet(new_pet)
+
+    if options:
+        found, added = asyncio.run(fetch())
+    else:
+        found, added = pet.pet_get_get_pet_by_id(1), pet.pet_post_add_pet(new_pet)
+
+    assert found.name == "doggie"
+    assert added is None
+    assert [obj["method"] for obj in http_server.requests] == ["GET"] * 3 + ["POST"]
+
+
+@pytest.mark.parametrize("options", ((), ("--async",)))
+def test_client_does_not_retry_by_default(generated_client, http_server, options):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (503, {"Retry-After": "0"}, PET_JSON)
+    generated_client(*options)
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+
+    if options:
+        found = asyncio.run(pet.pet_get_get_pet_by_id(1))
+    else:
+        found = pet.pet_get_get_pet_by_id(1)
+
+    assert found is None
+    assert len(http_server.requests) == 1
+    assert runtime._retry_policy is None
+    assert runtime.configure_retries(max_retries=2).max_retries == 2
+
+
+def test_sync_client_rate_limits_per_tag(generated_client, http_server):
+    http_server.routes[("GET", "/api/v3/pet/1")] = (200, {}, PET_JSON)
+    generated_client()
+    runtime = importlib.import_module("runtime")
+    pet = importlib.import_module("pet")
+
+    runtime.configure_rate_limit(20, burst=1, tag="pet")
+    start = time.perf_counter()
+    for _ in range(4):
+        pet.pet_get_get_pet_by_id(1)
+    assert time.perf_counter() - start >= 0.14
+
+    assert runtime.get_buckets(f"{http_server.url}/api/v3/pet/1", "pet")
+    assert not runtime.get_buckets(f"{http_server.url}/api/v3/store/inventory", "store")
+
+    with pytest.raises(ValueError):
+        runtime.configure_rate_limit(1)
+
+
+def test_runtime_retry_policy():
+    runtime = Runtime()
+    runtime.generate_runtime()
+    namespace = {}
+    exec(runtime.render(), namespace)
+    policy = namespace["RetryPolicy"](max_retries=2, max_backoff=10)
+
+    assert policy.should_retry("POST", 429, 0)
+    assert not policy.should_retry("POST", 503, 0)
+    assert policy.should_retry("GET", 503, 1)
+    assert not policy.should_retry("GET", 503, 2)
+    assert not policy.should_retry("GET", 500, 0)
+    assert policy.get_delay(0, "3") == 3
+    assert policy.get_delay(0, "120") == 10
+    assert policy.get_delay(0, "Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert 0 <= policy.get_delay(3) <= 4
+
+
+@pytest.mark.parametrize("options", ((), ("--async",)))
+def test_client_compresses_bodies(generated_client, http_server, options):
+    pets = gzip.compress(b"[" + PET_JSON + b"]")
+    http_server.routes[("GET", "/api/v3/pet/findByStatus")] = (
+        200,
+        {"Content-Encoding": "gzip"},
+        pets,
+    )
+    http_server.routes[("POST", "/api/v3/user/createWithList")] = (200, {}, USER_JSON)
+    generated_client(
+        *options,
+        "--request-encoding",
+        "gzip",
+        "--compress-threshold",
+        "40",
+        "--accept-encoding",
+        "unknown, gzip",
+    )
+    schema = importlib.import_module("schema")
+    pet = importlib.import_module("pet")
+    user = importlib.import_module("user")
+    small, large = [schema.User.model_construct(id=1)], [schema.User.model_construct(id=1)] * 5
+    params = schema.PetGetFindPetsByStatusQuery()
+
+    async def send():
+        return [
+            await user.user_post_create_users_with_list_input(small),
+            await user.user_post_create_users_with_list_input(large),
+            await pet.pet_get_find_pets_by_status(params=params),
+        ]
+
+    if options:
+        *_, found = asyncio.run(send())
+    else:
+        user.user_post_create_users_with_list_input(small)
+        user.user_post_create_users_with_list_input(large)
+        found = pet.pet_get_find_pets_by_status(params=params)
+
+    small_request, large_request, pets_request = http_server.requests
+    assert "Content-Encoding" not in small_request["headers"]
+    assert small_request["body"] == b'[{"id":1}]'
+    assert large_request["headers"]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(large_request["body"]) == b"[" + b",".join([b'{"id":1}'] * 5) + b"]"
+    assert pets_request["headers"]["Accept-Encoding"] == "gzip"
+    assert found[0].name == "doggie"
+
+    # str bodies passed by hand are encoded before they are compressed
+    runtime = importlib.import_module("runtime")
+    kwargs = runtime.prepare_encoding({"data": "é" * 40}, None, None)
+    assert kwargs["headers"]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(kwargs["data"]) == ("é" * 40).encode("utf-8")
@@ -51,6 +51,19 @@ def test_create_working_pydantic_models(openapi_components, test_folder):
         module.ApiResponse(code=123, type="example")
 
 
+def test_optional_fields_of_models_reject_explicit_nulls(openapi_components, test_folder):
+    schema = Schema(openapi_components)
+    schema.generate_schemas()
+    schema.write_to_file(test_folder)
+    module = importlib.import_module(".schema", ".tests." + test_folder.name)
+
+    assert "optional_name" in module.Pet.__pydantic_decorators__.field_validators
+    pet = {"id": 1, "photoUrls": [], "tags": [], "status": "sold"}
+    assert module.Pet.model_validate(pet).name is None
+    with pytest.raises(ValidationError, match="name may not be None"):
+        module.Pet.model_validate({**pet, "name": None})
+
+
 def test_create_unique_enums(openapi_components, test_folder):
     schema = Schema(openapi_components)
     schema.generate_schemas()
@@ -64,3 +77,125 @@ def test_create_unique_enums(openapi_components, test_folder):
     assert module.OrderStatus.PLACED.value == "placed"
     assert module.OrderStatus.APPROVED.value == "approved"
     assert module.OrderStatus.DELIVERED.value == "delivered"
+
+
+CYCLIC_COMPONENTS = {
+    "Node": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "edges": {"type": "array", "items": {"$ref": "#/components/schemas/Edge"}},
+            "children": {"type": "array", "items": {"$ref": "#/components/schemas/Node"}},
+        },
+        "required": ["name"],
+    },
+    "Edge": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "reference", "$ref": "#/components/schemas/Node"},
+        },
+    },
+    "Graph": {
+        "type": "object",
+        "properties": {
+            "nodes": {"type": "array", "items": {"$ref": "#/components/schemas/Node"}},
+        },
+    },
+}
+
+
+def test_create_cyclic_pydantic_models(test_folder):
+    schema = Schema(CYCLIC_COMPONENTS)
+    schema.generate_schemas()
+    text = schema.render()
+
+    assert text.index("class Node(") < text.index("class Graph(")
+    assert "Node.model_rebuild()" in text
+
+    schema.write_to_file(test_folder)
+    module = importlib.import_module(f"tests.{test_folder.name}.schema")
+    node = module.Node.model_validate(
+        {
+            "name": "a",
+            "edges": [{"target": {"name": "b", "edges": [], "children": []}}],
+            "children": [],
+        }
+    )
+    assert node.edges[0].target.name == "b"
+    assert module.Graph(nodes=[node]).nodes[0] is node
+
+
+def test_deferred_models_are_built_on_first_use(test_folder):
+    schema = Schema(CYCLIC_COMPONENTS, defer_build=True)
+    schema.generate_schemas()
+    text = schema.render()
+
+    assert "model_config = ConfigDict(defer_build=True)" in text
+    assert "class Node(DeferredModel):" in text and "Node.model_rebuild()" not in text
+
+    schema.write_to_file(test_folder)
+    module = importlib.import_module(f"tests.{test_folder.name}.schema")
+    assert not module.Node.__pydantic_complete__
+    node = module.Node.model_validate(
+        {
+            "name": "a",
+            "edges": [{"target": {"name": "b", "edges": [], "children": []}}],
+            "children": [],
+        }
+    )
+    assert node.edges[0].target.name == "b"
+
+    module.warmup("Graph").join()
+    assert module.Graph.__pydantic_complete__ and not module.Edge.__pydantic_complete__
+    module.warmup().join()
+    assert all(getattr(module, obj).__pydantic_complete__ for obj in module._DEFERRED_MODELS)
+
+
+def test_model_layout_keeps_cycles_in_one_module(test_folder):
+    schema = Schema(CYCLIC_COMPONENTS)
+    schema.generate_schemas()
+    modules = schema.render_modules(layout="model")
+
+    assert set(modules) == {"schema.py", "schema_node.py", "schema_graph.py"}
+    assert "class Edge(" in modules["schema_node.py"]
+    assert "from .schema import Node" in modules["schema_graph.py"]
+
+
+def test_create_cyclic_msgspec_structs(test_folder):
+    msgspec = pytest.importorskip("msgspec")
+    components = {
+        **CYCLIC_COMPONENTS,
+        "Label": {
+            "type": "object",
+            "properties": {
+                "text": {"type": "string", "maxLength": 3},
+                "weight": {"type": "integer", "minimum": 1},
+                "note": {"type": "string", "nullable": True},
+            },
+            "required": ["weight", "note"],
+        },
+    }
+    schema = Schema(components, backend="msgspec")
+    schema.generate_schemas()
+    text = schema.render()
+
+    assert "class Node(Struct, kw_only=True, omit_defaults=True):" in text
+    assert "text: Annotated[str, Meta(max_length=3)]" in text
+    assert "weight: Annotated[int, Meta(gt=1)] = None" in text
+    assert "note: Optional[str] = None" in text
+    assert "model_rebuild" not in text and "field_validator" not in text
+
+    schema.write_to_file(test_folder)
+    module = importlib.import_module(f"tests.{test_folder.name}.schema")
+    node = msgspec.json.decode(
+        b'{"name": "a", "edges": [{"target": {"name": "b", "edges": [], "children": []}}],'
+        b' "children": []}',
+        type=module.Node,
+    )
+    assert node.edges[0].target.name == "b"
+    assert msgspec.json.decode(b'{"text": "abc", "note": null}', type=module.Label).weight is None
+    # a missing field defaults to None, an explicit null is only valid for nullable fields
+    with pytest.raises(msgspec.ValidationError):
+        msgspec.json.decode(b'{"text": "abc", "weight": null}', type=module.Label)
+    with pytest.raises(msgspec.ValidationError):
+        msgspec.json.decode(b'{"text": "abcd"}', type=module.Label)